@@ -0,0 +1,224 @@
+"""
+Adaptive-concurrency PutRecord engine for SageMaker Feature Store.
+
+Records are written with concurrent `PutRecord` calls from an asyncio event loop. The number
+of in-flight requests is adjusted AIMD-style: the window grows by about one request per
+window of fast successes, and halves on a throttling error or when latency exceeds the target.
+Throttled and transient failures go to a retry queue with jittered exponential backoff.
+Records that still fail after `max_attempts`, or that fail with a non-retryable error, are
+returned in the batch report.
+
+The engine only needs an object with a boto3-style `put_record(FeatureGroupName=..., Record=...)`
+method, so a local stub of the featurestore-runtime API can stand in for AWS. Create the real
+client with botocore retries disabled and a connection pool as large as `max_concurrency`,
+otherwise botocore hides throttling from the engine and caps concurrency at 10 connections:
+
+    client = boto3.client(
+        "sagemaker-featurestore-runtime",
+        config=Config(retries={"total_max_attempts": 1}, max_pool_connections=64),
+    )
+"""
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_CODES = {
+    "ThrottlingException",
+    "Throttling",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+}
+RETRYABLE_CODES = THROTTLING_CODES | {"ServiceUnavailable", "InternalFailure", "InternalServerError"}
+
+
+def error_code(exc):
+    """The AWS error code of a botocore ClientError (or a stub raising the same shape)."""
+    return (getattr(exc, "response", None) or {}).get("Error", {}).get("Code")
+
+
+def to_records(df):
+    """Convert a DataFrame into Feature Store records, skipping missing values."""
+    columns = list(df.columns)
+    missing = df.isna().to_numpy()
+    values = df.astype(str).to_numpy()
+    return [
+        [
+            {"FeatureName": name, "ValueAsString": value}
+            for name, value, is_missing in zip(columns, row, row_missing)
+            if not is_missing
+        ]
+        for row, row_missing in zip(values, missing)
+    ]
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease window on the number of in-flight requests."""
+
+    def __init__(self, initial=4, minimum=1, maximum=64, target_latency=0.25, decrease_factor=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self._last_decrease = 0.0
+
+    @property
+    def window(self):
+        return max(self.minimum, int(self.limit))
+
+    def on_success(self, latency):
+        if latency > self.target_latency:
+            self._decrease(latency)
+        else:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_throttle(self, latency):
+        self._decrease(latency)
+
+    def _decrease(self, latency):
+        # A burst of throttles from one window should only halve the window once.
+        now = time.monotonic()
+        if now - self._last_decrease < latency:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+@dataclass
+class BatchReport:
+    records: int
+    succeeded: int = 0
+    retried: int = 0
+    throttled: int = 0
+    elapsed: float = 0.0
+    window: int = 0
+    latencies: list = field(default_factory=list, repr=False)
+    failed: list = field(default_factory=list, repr=False)
+
+    def percentiles(self, q=(50, 90, 99)):
+        if not self.latencies:
+            return {f"p{p}": None for p in q}
+        return {f"p{p}": float(v) for p, v in zip(q, np.percentile(self.latencies, q))}
+
+    def summary(self):
+        latency_ms = {k: (round(v * 1000, 1) if v is not None else None) for k, v in self.percentiles().items()}
+        return (
+            f"{self.succeeded}/{self.records} records in {self.elapsed:.2f}s "
+            f"({self.succeeded / max(self.elapsed, 1e-9):,.0f} rows/sec), latency ms {latency_ms}, "
+            f"window {self.window}, {self.throttled} throttled, {self.retried} retried, {len(self.failed)} failed"
+        )
+
+
+class AsyncPutRecordEngine:
+    """Writes DataFrame batches to a feature group with an AIMD-controlled concurrency window."""
+
+    def __init__(self, client, feature_group_name, initial_concurrency=4, max_concurrency=64,
+                 target_latency=0.25, max_attempts=5, base_backoff=0.1, max_backoff=5.0):
+        self.client = client
+        self.feature_group_name = feature_group_name
+        self.limiter = AIMDLimiter(initial=initial_concurrency, maximum=max_concurrency, target_latency=target_latency)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="put-record")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+
+    def _put(self, record):
+        self.client.put_record(FeatureGroupName=self.feature_group_name, Record=record)
+
+    async def ingest_batch(self, df):
+        """Write every row of `df`; returns a BatchReport with latencies and failed records."""
+        records = to_records(df)
+        report = BatchReport(records=len(records))
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue()
+        for index, record in enumerate(records):
+            pending.put_nowait((index, record, 0))
+        outstanding = len(records)
+        in_flight = 0
+        slot_freed = asyncio.Condition()
+        done = asyncio.Event()
+        if outstanding == 0:
+            done.set()
+
+        def finish():
+            nonlocal outstanding
+            outstanding -= 1
+            if outstanding == 0:
+                done.set()
+
+        async def worker():
+            nonlocal in_flight
+            while True:
+                index, record, attempt = await pending.get()
+                async with slot_freed:
+                    await slot_freed.wait_for(lambda: in_flight < self.limiter.window)
+                    in_flight += 1
+                start = time.monotonic()
+                code, exc = None, None
+                try:
+                    await loop.run_in_executor(self._executor, self._put, record)
+                except Exception as e:
+                    code = error_code(e) or type(e).__name__
+                    exc = e
+                latency = time.monotonic() - start
+                async with slot_freed:
+                    in_flight -= 1
+                    slot_freed.notify_all()
+
+                if code is None:
+                    self.limiter.on_success(latency)
+                    report.latencies.append(latency)
+                    report.succeeded += 1
+                    finish()
+                    continue
+                if code in THROTTLING_CODES:
+                    report.throttled += 1
+                    self.limiter.on_throttle(latency)
+                if code in RETRYABLE_CODES and attempt + 1 < self.max_attempts:
+                    report.retried += 1
+                    loop.call_later(self._backoff(attempt), pending.put_nowait, (index, record, attempt + 1))
+                else:
+                    report.failed.append({"index": index, "error": code, "message": str(exc)})
+                    finish()
+
+        start = time.monotonic()
+        workers = [asyncio.create_task(worker()) for _ in range(self.limiter.maximum)]
+        try:
+            await done.wait()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        report.elapsed = time.monotonic() - start
+        report.window = self.limiter.window
+        return report
+
+    def ingest(self, df):
+        """Synchronous wrapper: ingest one DataFrame batch and return its report."""
+        report = asyncio.run(self.ingest_batch(df))
+        logger.info(f"⚡ {report.summary()}")
+        return report
+
+
+def failed_rows(df, report):
+    """The rows of `df` that could not be written, with the error that stopped them."""
+    if not report.failed:
+        return df.iloc[:0]
+    failures = pd.DataFrame(report.failed).set_index("index")
+    return df.iloc[failures.index].assign(error=failures["error"].to_numpy())
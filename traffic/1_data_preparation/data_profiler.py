@@ -0,0 +1,287 @@
+"""
+Single-pass, constant-memory data-quality profiler for the ingest stream.
+
+`StreamingProfiler` sees each chunk once and keeps only running aggregates per column:
+- completeness counts
+- min/max, and mean/stddev via Chan's parallel Welford update
+- a KLL quantile sketch for numeric columns
+- a bounded categorical domain for string columns such as `weather_condition`
+
+Its memory use is independent of the number of rows.
+
+From the same pass it can:
+- check each chunk against a baseline `constraints.json` and reject it (`check`)
+- write `statistics.json` / `constraints.json` in the SageMaker Model Monitor baseline format
+  (`write_baseline`), ready to sit in `5_model_monitoring/`
+"""
+
+import json
+import logging
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MONITORING_CONFIG = {
+    "evaluate_constraints": "Enabled",
+    "emit_metrics": "Enabled",
+    "datatype_check_threshold": 1.0,
+    "domain_content_threshold": 1.0,
+    "distribution_constraints": {
+        "perform_comparison": "Enabled",
+        "comparison_threshold": 0.1,
+        "comparison_method": "Robust",
+    },
+}
+
+
+class KLLSketch:
+    """KLL quantile sketch (Karnin, Lang, Liberty) with vectorized bulk updates."""
+
+    def __init__(self, k=200, c=2 / 3, seed=0):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.n += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                leftover, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level] = leftover
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                level = 0  # Adding a level lowers every capacity below it
+                continue
+            level += 1
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs):
+        items, cumulative = self._weighted()
+        if items.size == 0:
+            return [None for _ in qs]
+        ranks = np.asarray(qs) * cumulative[-1]
+        return items[np.minimum(np.searchsorted(cumulative, ranks), items.size - 1)].tolist()
+
+    def cdf(self, points):
+        items, cumulative = self._weighted()
+        if items.size == 0:
+            return np.zeros(len(points))
+        counts = np.concatenate([[0.0], cumulative])[np.searchsorted(items, points, side="right")]
+        return counts / cumulative[-1]
+
+    def to_dict(self):
+        return {
+            "parameters": {"c": self.c, "k": float(self.k)},
+            "data": [level.tolist() for level in self.levels],
+        }
+
+
+class ColumnProfile:
+    """Running statistics for one column."""
+
+    def __init__(self, name, inferred_type, track_domain=False, max_domain_size=1000):
+        self.name = name
+        self.inferred_type = inferred_type
+        self.max_domain_size = max_domain_size
+        self.num_present = 0
+        self.num_missing = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sketch = KLLSketch() if self.is_numeric else None
+        self.domain = {} if track_domain and not self.is_numeric else None
+
+    @property
+    def is_numeric(self):
+        return self.inferred_type in ("Integral", "Fractional")
+
+    def update(self, series):
+        missing = series.isna()
+        present = series[~missing]
+        self.num_missing += int(missing.sum())
+        if present.empty:
+            return
+        if self.is_numeric:
+            values = present.to_numpy(dtype=np.float64)
+            n_a, n_b = self.num_present, values.size
+            mean_b = values.mean()
+            m2_b = float(((values - mean_b) ** 2).sum())
+            delta = mean_b - self.mean
+            n = n_a + n_b
+            self.mean += delta * n_b / n
+            self.m2 += m2_b + delta ** 2 * n_a * n_b / n
+            self.sum += float(values.sum())
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self.sketch.update(values)
+        elif self.domain is not None:
+            for value, count in present.astype(str).value_counts().items():
+                self.domain[value] = self.domain.get(value, 0) + int(count)
+            if len(self.domain) > self.max_domain_size:
+                # Too many distinct values to be a categorical; stop tracking to keep memory constant
+                self.domain = None
+        self.num_present += len(present)
+
+    def _numeric_buckets(self, n_buckets=10):
+        if self.num_present == 0:
+            return []
+        edges = np.linspace(self.min, self.max, n_buckets + 1)
+        cdf = self.sketch.cdf(edges)
+        cdf[0] = 0.0
+        counts = np.diff(cdf) * self.num_present
+        return [
+            {"lower_bound": float(lo), "upper_bound": float(hi), "count": float(count)}
+            for lo, hi, count in zip(edges[:-1], edges[1:], counts)
+        ]
+
+    def statistics(self):
+        common = {"num_present": self.num_present, "num_missing": self.num_missing}
+        if self.is_numeric:
+            empty = self.num_present == 0
+            return {
+                "name": self.name,
+                "inferred_type": self.inferred_type,
+                "numerical_statistics": {
+                    "common": common,
+                    "mean": None if empty else self.mean,
+                    "sum": self.sum,
+                    "std_dev": None if empty else math.sqrt(self.m2 / self.num_present),
+                    "min": None if empty else self.min,
+                    "max": None if empty else self.max,
+                    "distribution": {"kll": {"buckets": self._numeric_buckets(), "sketch": self.sketch.to_dict()}},
+                },
+            }
+        string_statistics = {"common": common}
+        if self.domain is not None:
+            string_statistics["distinct_count"] = float(len(self.domain))
+            string_statistics["distribution"] = {
+                "categorical": {"buckets": [{"value": v, "count": c} for v, c in sorted(self.domain.items())]}
+            }
+        return {"name": self.name, "inferred_type": self.inferred_type, "string_statistics": string_statistics}
+
+    def constraints(self):
+        total = self.num_present + self.num_missing
+        constraint = {
+            "name": self.name,
+            "inferred_type": self.inferred_type,
+            "completeness": self.num_present / total if total else 0.0,
+        }
+        if self.is_numeric:
+            constraint["num_constraints"] = {"is_non_negative": bool(self.num_present and self.min >= 0)}
+        elif self.domain is not None:
+            constraint["string_constraints"] = {"domains": sorted(self.domain)}
+        return constraint
+
+
+def infer_type(series):
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return "Integral"
+    if pd.api.types.is_float_dtype(series):
+        # Integer columns read with missing values come back as float
+        present = series.dropna()
+        return "Integral" if not present.empty and (present % 1 == 0).all() else "Fractional"
+    return "String"
+
+
+def load_constraints(path):
+    """Baseline constraints from `path`, or None if the file is missing or empty."""
+    if not path or not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class StreamingProfiler:
+    """Profiles and validates an ingest stream chunk by chunk."""
+
+    def __init__(self, constraints=None, categorical_columns=("weather_condition",), max_domain_size=1000):
+        self.columns = {}
+        self.item_count = 0
+        self.categorical_columns = set(categorical_columns)
+        self.max_domain_size = max_domain_size
+        self.baseline = {f["name"]: f for f in constraints["features"]} if constraints else {}
+
+    def check(self, chunk):
+        """Violations of this chunk against the baseline constraints (empty list if it is clean)."""
+        violations = []
+        for column in chunk.columns:
+            series = chunk[column]
+            missing = int(series.isna().sum())
+            if missing:
+                violations.append(f"{column}: {missing} missing values")
+            expected = self.baseline.get(column)
+            if expected is None:
+                continue
+            present = series.dropna()
+            actual_type = infer_type(series)
+            if expected["inferred_type"] in ("Integral", "Fractional") and actual_type == "String":
+                violations.append(f"{column}: expected {expected['inferred_type']}, got non-numeric values")
+                continue
+            if expected.get("num_constraints", {}).get("is_non_negative") and (present < 0).any():
+                violations.append(f"{column}: {int((present < 0).sum())} negative values")
+            domain = expected.get("string_constraints", {}).get("domains")
+            if domain is not None:
+                unknown = sorted(set(present.astype(str).unique()) - set(domain))
+                if unknown:
+                    violations.append(f"{column}: values outside baseline domain {unknown}")
+        return violations
+
+    def update(self, chunk):
+        for column in chunk.columns:
+            profile = self.columns.get(column)
+            if profile is None:
+                profile = ColumnProfile(
+                    column, infer_type(chunk[column]), column in self.categorical_columns, self.max_domain_size
+                )
+                self.columns[column] = profile
+            profile.update(chunk[column])
+        self.item_count += len(chunk)
+
+    def statistics(self):
+        return {
+            "version": 0.0,
+            "dataset": {"item_count": self.item_count},
+            "features": [profile.statistics() for profile in self.columns.values()],
+        }
+
+    def constraints(self):
+        return {
+            "version": 0.0,
+            "features": [profile.constraints() for profile in self.columns.values()],
+            "monitoring_config": MONITORING_CONFIG,
+        }
+
+    def write_baseline(self, statistics_path, constraints_path):
+        for path, document in ((statistics_path, self.statistics()), (constraints_path, self.constraints())):
+            with open(path, "w") as f:
+                json.dump(document, f, indent=2)
+        logger.info(f"📐 Wrote baseline statistics to {statistics_path} and constraints to {constraints_path}")
@@ -2,14 +2,26 @@
 Ingest traffic data into SageMaker Feature Store from local machine using Boto3 + SageMaker SDK and environment variables.
 """
 
+import argparse
+import itertools
 import os
-import pandas as pd
+import sys
 import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
 import sagemaker
 from sagemaker.feature_store.feature_group import FeatureGroup
 from dotenv import load_dotenv
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.schema import memory_report
+from common.waiters import Waiter, stage_timer
+from ingest_stream import iter_csv_chunks, prepare_chunks, prefetch, ingest_chunks
+from watermark_manifest import IngestManifest
+from async_ingest import AsyncPutRecordEngine, failed_rows
+from data_profiler import StreamingProfiler, load_constraints
+
 # Load environment variables from ../.env
 load_dotenv(dotenv_path="../.env")
 
@@ -17,6 +29,33 @@ load_dotenv(dotenv_path="../.env")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Command line options
+parser = argparse.ArgumentParser(description="Ingest traffic data into SageMaker Feature Store.")
+parser.add_argument("--csv-path", default="traffic_data.csv")  # assumes file is in current directory
+parser.add_argument("--chunk-size", type=int, default=0,
+                    help="Rows per chunk for streaming ingestion; 0 loads the whole file at once.")
+parser.add_argument("--prefetch", type=int, default=1,
+                    help="Chunks read ahead of the ingest workers before the reader blocks.")
+parser.add_argument("--engine", choices=["sdk", "async"], default="sdk",
+                    help="sdk: FeatureGroup.ingest with --max-workers; async: adaptive-concurrency PutRecord engine.")
+parser.add_argument("--max-workers", type=int, default=3)
+parser.add_argument("--max-concurrency", type=int, default=64,
+                    help="Upper bound on in-flight PutRecord calls for --engine async.")
+parser.add_argument("--target-latency", type=float, default=0.25,
+                    help="PutRecord latency (seconds) above which --engine async shrinks its window.")
+parser.add_argument("--failed-records", default="failed_records.csv",
+                    help="Rows that --engine async could not write are appended here.")
+parser.add_argument("--constraints", default="../5_model_monitoring/baseline_constraints.json",
+                    help="Baseline constraints every chunk is checked against (ignored while the file is empty).")
+parser.add_argument("--write-baseline", action="store_true",
+                    help="Write Model Monitor baseline statistics/constraints profiled from this run.")
+parser.add_argument("--baseline-dir", default="../5_model_monitoring")
+parser.add_argument("--incremental", action="store_true",
+                    help="Only ingest records that are new or changed since the last run.")
+parser.add_argument("--manifest", default="ingest_manifest.json",
+                    help="Watermark manifest used by --incremental.")
+args = parser.parse_args()
+
 # Extract environment variables
 region = os.getenv("AWS_REGION")
 role = os.getenv("SAGEMAKER_ROLE")
@@ -32,40 +71,33 @@ boto_session = boto3.Session(region_name=region)
 session = sagemaker.Session(boto_session=boto_session)
 
 # Load traffic data CSV
-csv_path = "traffic_data.csv"  # assumes file is in current directory
-try:
-    df = pd.read_csv(csv_path)
-    logger.info(f"✅ Loaded dataset with {df.shape[0]} rows and {df.shape[1]} columns.")
-except Exception as e:
-    logger.error("❌ Error loading dataset.", exc_info=True)
-    raise e
+# Columns are parsed straight into the compact dtypes of common/schema.py.
+# With --chunk-size the file is streamed in fixed-size chunks so memory stays flat for large exports.
+csv_path = args.csv_path
 
+# Incremental mode: skip the run entirely if the source has not changed since the last ingest
+manifest = IngestManifest(args.manifest) if args.incremental else None
+if manifest and manifest.is_unchanged(csv_path):
+    logger.info(f"✅ {csv_path} is unchanged since the last ingest. Nothing to do.")
+    sys.exit(0)
 
-# Data Validation: Check for missing values
-missing_values = df.isnull().sum().sum()
-if missing_values > 0:
-    raise ValueError(f"❌ Dataset contains {missing_values} missing values. Please clean the data before ingestion.")
-
-
-
-# Ensure timestamp format consistency
-"""
-try:
-    df["timestamp"] = pd.to_datetime(df["timestamp"], format="%m/%d/%y %H:%M").dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-except Exception as e:
-    logger.error("❌ Timestamp format mismatch. Ensure it follows MM/DD/YY HH:MM format.", exc_info=True)
-    raise e
-"""
-# Convert timestamp column to ISO 8601 string
-print(df["timestamp"].head())
+# Wall-clock time per stage, summarised at the end of the run
+timings = {}
 
 try:
-    # # Original timestamp format: 1/1/23 0:00
-    df["timestamp"] = pd.to_datetime(df["timestamp"], format="%m/%d/%y %H:%M")
-    # # Convert to required ISO 8601 format
-    df["timestamp"] = df["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    # Every chunk is profiled in the same pass: rejected if it breaks the baseline constraints,
+    # and folded into constant-memory statistics otherwise.
+    profiler = StreamingProfiler(constraints=load_constraints(args.constraints))
+    chunks = prefetch(prepare_chunks(iter_csv_chunks(csv_path, args.chunk_size), profiler), depth=args.prefetch)
+    # The first chunk is used to register the schema before the rest are read.
+    with stage_timer("read first chunk", timings):
+        first_chunk = next(chunks)
+    logger.info(f"✅ Loaded first chunk with {first_chunk.shape[0]} rows and {first_chunk.shape[1]} columns.")
+    memory_report(first_chunk, "feature store records (first chunk)", logger)
+except StopIteration:
+    raise ValueError(f"❌ {csv_path} contains no records.")
 except Exception as e:
-    logger.error("❌ Timestamp format mismatch. Ensure it follows MM/DD/YY HH:MM format.", exc_info=True)
+    logger.error("❌ Error loading dataset.", exc_info=True)
     raise e
 
 # Define FeatureGroup
@@ -73,46 +105,81 @@ record_identifier = "incident"
 event_time_feature = "timestamp"
 
 feature_group = FeatureGroup(name=feature_group_name, sagemaker_session=session)
-feature_group.load_feature_definitions(data_frame=df) # Registering the schema from a Pandas DataFrame
+feature_group.load_feature_definitions(data_frame=first_chunk) # Registering the schema from a Pandas DataFrame
+
+# Incremental runs write into the Feature Group created by the first run
+try:
+    feature_group_exists = feature_group.describe().get("FeatureGroupStatus") == "Created"
+except ClientError as e:
+    if e.response["Error"]["Code"] != "ResourceNotFound":
+        raise
+    feature_group_exists = False
 
 # Create the Feature Group (Writes the schema to SageMaker Feature Store)
 # Create the Feature Group
 try:
-    feature_group.create(
-        s3_uri=f"s3://{bucket}/{prefix}/feature-store/ingest/",
-        record_identifier_name=record_identifier,
-        event_time_feature_name=event_time_feature,
-        role_arn=role,
-        enable_online_store=True
-    )
+    with stage_timer("create feature group", timings):
+        if feature_group_exists:
+            logger.info(f"ℹ️ Feature Group '{feature_group_name}' already exists. Skipping creation.")
+        else:
+            feature_group.create(
+                s3_uri=f"s3://{bucket}/{prefix}/feature-store/ingest/",
+                record_identifier_name=record_identifier,
+                event_time_feature_name=event_time_feature,
+                role_arn=role,
+                enable_online_store=True
+            )
+
+            # Monitor Feature Group creation status with backoff (first check after ~1s, then up to 15s apart)
+            Waiter(
+                f"Feature Group '{feature_group_name}'",
+                poll=feature_group.describe,
+                status=lambda description: description.get("FeatureGroupStatus"),
+                success={"Created"},
+                failure={"CreateFailed", "Failed", "Deleting"},
+                max_delay=15,
+                timeout=900,
+            ).wait()
 except Exception as e:
     logger.error("❌ Error creating Feature Group.", exc_info=True)
     raise e
 
 
-# Wait for creation to complete
-import time
 
-# Monitor Feature Group creation status
-while True:
-    status = feature_group.describe().get("FeatureGroupStatus")
-    logger.info(f"⏳ Feature Group status: {status}")
-    if status == "Created":
-        logger.info(f"✅ Feature Group '{feature_group_name}' successfully created.")
-        break
-    elif status in ("Failed", "Deleting"):
-        raise RuntimeError(f"❌ Feature Group creation failed with status: {status}")
-    time.sleep(10)
+# Choose how each chunk is written
+if args.engine == "async":
+    runtime_client = boto_session.client(
+        "sagemaker-featurestore-runtime",
+        config=Config(retries={"total_max_attempts": 1}, max_pool_connections=args.max_concurrency),
+    )
+    engine = AsyncPutRecordEngine(
+        runtime_client,
+        feature_group_name,
+        max_concurrency=args.max_concurrency,
+        target_latency=args.target_latency,
+    )
 
+    def ingest_chunk(chunk):
+        report = engine.ingest(chunk)
+        if report.failed:
+            failed = failed_rows(chunk, report)
+            failed.to_csv(args.failed_records, mode="a", index=False, header=not os.path.exists(args.failed_records))
+            raise RuntimeError(f"❌ {len(failed)} records failed to ingest. See {args.failed_records}.")
+else:
+    def ingest_chunk(chunk):
+        feature_group.ingest(data_frame=chunk, max_workers=args.max_workers, wait=True)
 
 
 # 🔄 Ingest data into Feature Store
 try:
-    logger.info(f"📥 Ingesting {len(df)} records into Feature Store...")
-    ingestion_start_time = time.time()
-    feature_group.ingest(data_frame=df, max_workers=3, wait=True)
-    ingestion_end_time = time.time()
-    elapsed_time = round(ingestion_end_time - ingestion_start_time, 2)
+    logger.info(f"📥 Ingesting {csv_path} into Feature Store...")
+    records = itertools.chain([first_chunk], chunks)
+    if manifest:
+        records = manifest.select_delta(records, csv_path, args.chunk_size)
+    with stage_timer("ingest", timings):
+        total_rows, n_features, elapsed_time = ingest_chunks(ingest_chunk, records)
+    if manifest:
+        manifest.save()
     logger.info(f"✅ Data ingestion completed successfully in {elapsed_time} seconds.")
 except Exception as e:
     logger.error("❌ Error during data ingestion.", exc_info=True)
@@ -121,4 +188,14 @@ except Exception as e:
 
 
 # Metadata Tracking: Log ingestion statistics
-logger.info(f"📊 Ingested {df.shape[0]} records with {df.shape[1]} features.")
+logger.info(f"📊 Ingested {total_rows} records with {n_features} features.")
+
+# Data quality baseline for Model Monitor, profiled from the chunks read above
+if args.write_baseline:
+    with stage_timer("write baseline", timings):
+        profiler.write_baseline(
+            os.path.join(args.baseline_dir, "baseline_statistics.json"),
+            os.path.join(args.baseline_dir, "baseline_constraints.json"),
+        )
+
+logger.info("⏱️ Stage timings: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items()))
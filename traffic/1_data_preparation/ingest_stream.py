@@ -0,0 +1,142 @@
+"""
+Chunked, bounded-memory helpers for streaming traffic data into SageMaker Feature Store.
+
+The CSV is read in fixed-size chunks with the compact dtypes of `common.schema` applied by the
+parser (`weather_condition` as a plain category: ingest writes whatever labels the source has, and
+only training and scoring map them onto a vocabulary), each chunk is validated and converted to the Feature Store types on its own, and a
+bounded prefetch queue hands chunks to the ingest workers.
+At most `prefetch_depth + 1` chunks are held in memory at any time, so peak RSS depends
+on the chunk size and not on the size of the input file.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+import pandas as pd
+
+from common.schema import memory_report, read_traffic_csv, to_feature_store_frame
+
+logger = logging.getLogger(__name__)
+
+SOURCE_TIMESTAMP_FORMAT = "%m/%d/%y %H:%M"    # Original timestamp format: 1/1/23 0:00
+FEATURE_STORE_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+_END_OF_STREAM = object()
+_PUT_TIMEOUT_S = 0.1  # How often a blocked producer checks whether the consumer is gone
+
+
+def iter_csv_chunks(csv_path, chunk_size=None):
+    """Yield the CSV as DataFrames of at most `chunk_size` rows (the whole file if None)."""
+    if not chunk_size:
+        yield read_traffic_csv(csv_path, timestamp_format=SOURCE_TIMESTAMP_FORMAT, categories=None)
+        return
+    with read_traffic_csv(csv_path, timestamp_format=SOURCE_TIMESTAMP_FORMAT, chunksize=chunk_size,
+                          categories=None) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+def validate_chunk(chunk, chunk_index):
+    """Reject a chunk that contains missing values."""
+    missing_values = chunk.isnull().sum().sum()
+    if missing_values > 0:
+        raise ValueError(
+            f"❌ Chunk {chunk_index} contains {missing_values} missing values. "
+            "Please clean the data before ingestion."
+        )
+
+
+def format_timestamps(chunk, column="timestamp"):
+    """
+    Convert a parsed chunk to the types the feature group was registered with: timestamps as the
+    ISO 8601 strings Feature Store expects, categories as strings, counts as integers.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(chunk[column]):
+        # The parser leaves the column as strings when a value does not match the source format
+        logger.error("❌ Timestamp format mismatch. Ensure it follows MM/DD/YY HH:MM format.")
+        raise ValueError(f"❌ Column '{column}' could not be parsed with format {SOURCE_TIMESTAMP_FORMAT}.")
+    return to_feature_store_frame(chunk, FEATURE_STORE_TIMESTAMP_FORMAT)
+
+
+def prepare_chunks(chunks, profiler=None):
+    """Validate and convert each chunk as it is read, profiling it on the way if a profiler is given."""
+    for chunk_index, chunk in enumerate(chunks):
+        if profiler is None:
+            validate_chunk(chunk, chunk_index)
+        else:
+            violations = profiler.check(chunk)
+            if violations:
+                raise ValueError(f"❌ Chunk {chunk_index} rejected: " + "; ".join(violations))
+            profiler.update(chunk)
+        if chunk_index == 0:
+            memory_report(chunk, "parse (first chunk)")
+        yield format_timestamps(chunk)
+
+
+def prefetch(iterable, depth=1):
+    """
+    Read ahead of the consumer on a background thread through a bounded queue.
+
+    The producer blocks once `depth` items are waiting, which is the backpressure that keeps
+    CSV parsing from running ahead of a slower ingest. Producer errors are re-raised in the
+    consumer. If the consumer stops early (an ingest error, or the generator is closed), the
+    producer notices within `_PUT_TIMEOUT_S`, closes `iterable` and exits instead of blocking
+    on the full queue forever.
+    """
+    buffer = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=_PUT_TIMEOUT_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    break
+            else:
+                put(_END_OF_STREAM)
+        except BaseException as e:
+            put(e)
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+    threading.Thread(target=produce, name="csv-prefetch", daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def ingest_chunks(ingest_chunk, chunks):
+    """Pass chunks one at a time to `ingest_chunk` and log rows/sec for each. Returns (rows, columns, seconds)."""
+    total_rows, n_columns = 0, 0
+    start = time.time()
+    for chunk_index, chunk in enumerate(chunks):
+        if chunk.empty:
+            continue
+        chunk_start = time.time()
+        ingest_chunk(chunk)
+        chunk_elapsed = time.time() - chunk_start
+        total_rows += len(chunk)
+        n_columns = chunk.shape[1]
+        logger.info(
+            f"📦 Chunk {chunk_index}: ingested {len(chunk)} rows in {chunk_elapsed:.2f}s "
+            f"({len(chunk) / max(chunk_elapsed, 1e-9):,.0f} rows/sec, {total_rows} total)"
+        )
+    return total_rows, n_columns, round(time.time() - start, 2)
@@ -1,9 +1,16 @@
 import boto3
+import logging
 import os
+import sys
 import pandas as pd
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.athena import AthenaParquetClient
+from common.waiters import stage_timer
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Load environment variables
 load_dotenv(dotenv_path="../.env")
@@ -19,6 +26,7 @@ sagemaker = boto3.client("sagemaker", region_name=region)
 s3 = boto3.client("s3", region_name=region)
 iam = boto3.client("iam", region_name=region)
 athena = boto3.client("athena", region_name=region)
+glue = boto3.client("glue", region_name=region)
 featurestore_runtime = boto3.client("sagemaker-featurestore-runtime", region_name=region)
 
 results = []
@@ -74,31 +82,15 @@ if fg_desc:
         table_name = fg_desc.get("OfflineStoreConfig", {}).get("DataCatalogConfig", {}).get("TableName")
         database_name = fg_desc.get("OfflineStoreConfig", {}).get("DataCatalogConfig", {}).get("Database")
         if table_name and database_name:
-            output_s3_uri = f"s3://{bucket}/{prefix}/athena/results/"
+            # UNLOAD to Parquet with a local result cache: re-runs skip the scan while the table is unchanged
+            athena_client = AthenaParquetClient(athena, s3, glue, output_s3_uri=f"s3://{bucket}/{prefix}/athena")
             query_string = f'SELECT COUNT(*) AS record_count FROM "{database_name}"."{table_name}"'
 
             try:
-                response = athena.start_query_execution(
-                    QueryString=query_string,
-                    QueryExecutionContext={"Database": database_name},
-                    ResultConfiguration={"OutputLocation": output_s3_uri},
-                )
-                query_execution_id = response["QueryExecutionId"]
-
-                # Wait for query to complete
-                while True:
-                    status = athena.get_query_execution(QueryExecutionId=query_execution_id)["QueryExecution"]["Status"]["State"]
-                    if status in ["SUCCEEDED", "FAILED", "CANCELLED"]:
-                        break
-                    time.sleep(2)
-
-                if status == "SUCCEEDED":
-                    result_response = athena.get_query_results(QueryExecutionId=query_execution_id)
-                    count = int(result_response["ResultSet"]["Rows"][1]["Data"][0]["VarCharValue"])
-                    results.append(["Athena Record Count", "✅", f"{count:,} rows"])
-                else:
-                    results.append(["Athena Record Count", "❌", f"Query failed with status: {status}"])
-
+                with stage_timer("athena record count"):
+                    count_df = athena_client.query(query_string, database=database_name, table=table_name)
+                count = int(count_df["record_count"].iloc[0])
+                results.append(["Athena Record Count", "✅", f"{count:,} rows"])
             except Exception as e:
                 results.append(["Athena Record Count", "❌", str(e)])
     else:
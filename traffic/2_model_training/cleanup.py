@@ -1,8 +1,14 @@
-import time
 import boto3
+import logging
 import os
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.waiters import Waiter, stage_timer, wait_all
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
 load_dotenv(dotenv_path="../.env")
 
 region = os.getenv("AWS_REGION")
@@ -65,6 +71,8 @@ def stop_and_delete_training_jobs(prefix=None):
                 continue
             training_jobs.append(job)
 
+    # Stop every running job first, then wait for all of them together
+    stopping = []
     for job in training_jobs:
         job_name = job["TrainingJobName"]
         status = job["TrainingJobStatus"]
@@ -73,15 +81,25 @@ def stop_and_delete_training_jobs(prefix=None):
         # Stop job if it's running
         if status in ["InProgress", "Stopping"]:
             print(f"⏹️ Stopping job: {job_name}")
-            sagemaker.stop_training_job(TrainingJobName=job_name)
-            # Wait for the job to stop
-            while True:
-                desc = sagemaker.describe_training_job(TrainingJobName=job_name)
-                if desc["TrainingJobStatus"] in ["Stopped", "Failed", "Completed"]:
-                    print(f"✅ Job {job_name} has stopped.")
-                    break
-                print(f"⏳ Waiting for job {job_name} to stop...")
-                time.sleep(10)
+            if status == "InProgress":
+                sagemaker.stop_training_job(TrainingJobName=job_name)
+            stopping.append(job_name)
+
+    # Wait for the jobs to stop
+    wait_all([
+        Waiter(
+            f"Training job {job_name}",
+            poll=lambda job_name=job_name: sagemaker.describe_training_job(TrainingJobName=job_name),
+            status=lambda desc: desc["TrainingJobStatus"],
+            success={"Stopped", "Failed", "Completed"},
+            max_delay=20,
+            timeout=1800,
+        )
+        for job_name in stopping
+    ])
+
+    for job in training_jobs:
+        job_name = job["TrainingJobName"]
 
         # Delete associated model (optional, assumes model name == job name)
         try:
@@ -98,4 +116,5 @@ def stop_and_delete_training_jobs(prefix=None):
     print("✅ Cleanup completed for training jobs and associated models.")
 
 # Run cleanup
-stop_and_delete_training_jobs(prefix="sagemaker-xgboost")  # change/remove prefix as needed
+with stage_timer("stop and delete training jobs"):
+    stop_and_delete_training_jobs(prefix="sagemaker-xgboost")  # change/remove prefix as needed
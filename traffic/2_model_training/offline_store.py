@@ -0,0 +1,275 @@
+"""
+Read the Feature Store offline store directly from its Parquet files, without Athena.
+
+SageMaker writes the offline store as Parquet under a Hive-style layout partitioned by event time:
+
+    <S3Uri>/<AccountId>/sagemaker/<Region>/offline-store/<FeatureGroup>-<CreationTime>/data/
+        year=2023/month=01/day=11/hour=06/<file>.parquet
+
+`OfflineStoreReader` takes the `data/` directory, either a local copy
+(`aws s3 sync <offline store uri>/data ./offline_store`) or an S3 path with a pyarrow
+filesystem. A time range is first used to prune whole partitions from their
+year/month/day/hour keys, so files outside the range are never opened. The time range and
+`sensor_id` filters are then pushed into the Parquet scan as row predicates, and only the
+requested columns are decoded.
+
+The offline store keeps every version of every record: re-ingested rows and deletions
+(`is_deleted`) sit next to the originals. `deduplicate_versions` and `latest_records` resolve
+versions in one sort-and-group pass, optionally as of a point in time. `read_deduplicated` and
+`as_of_join` do the same against the Parquet files one partition at a time, so the full
+history is never loaded into memory.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+PARTITION_COLUMNS = ["year", "month", "day", "hour"]
+VERSION_COLUMNS = ["write_time", "api_invocation_time", "is_deleted"]
+EVENT_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _to_utc(value):
+    """Accept a datetime, pandas Timestamp or ISO 8601 string and return an aware UTC datetime."""
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.to_pydatetime()
+
+
+def _partition_hour(keys):
+    """The event hour a partition covers, from its year/month/day[/hour] keys."""
+    return datetime(
+        int(keys["year"]), int(keys["month"]), int(keys.get("day", 1)), int(keys.get("hour", 0)),
+        tzinfo=timezone.utc,
+    )
+
+
+class OfflineStoreReader:
+    """Partition-pruned, column-projected reads of a Feature Store offline store."""
+
+    def __init__(self, root, event_time_column="timestamp", sensor_column="sensor_id", filesystem=None):
+        self.root = root
+        self.event_time_column = event_time_column
+        self.sensor_column = sensor_column
+        self.dataset = ds.dataset(root, format="parquet", partitioning="hive", filesystem=filesystem)
+
+    @property
+    def feature_columns(self):
+        return [name for name in self.dataset.schema.names if name not in PARTITION_COLUMNS]
+
+    def _pruned_dataset(self, start, end):
+        """Keep only the fragments whose event-time partition overlaps [start, end)."""
+        if start is None and end is None:
+            return self.dataset
+        fragments = []
+        for fragment in self.dataset.get_fragments():
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            if "year" not in keys:
+                fragments.append(fragment)  # Not partitioned by time; let the row filter decide
+                continue
+            granularity = timedelta(hours=1) if "hour" in keys else timedelta(days=1)
+            partition_start = _partition_hour(keys)
+            if start is not None and partition_start + granularity <= start:
+                continue
+            if end is not None and partition_start >= end:
+                continue
+            fragments.append(fragment)
+        logger.info(f"🗂️ Partition pruning kept {len(fragments)} fragment(s)")
+        return ds.FileSystemDataset(
+            fragments, self.dataset.schema, self.dataset.format, filesystem=self.dataset.filesystem
+        )
+
+    def _row_filter(self, start, end, sensor_ids):
+        event_time = ds.field(self.event_time_column)
+        predicates = []
+        # Event times are stored as ISO 8601 UTC strings, which sort lexicographically
+        if start is not None:
+            predicates.append(event_time >= start.strftime(EVENT_TIME_FORMAT))
+        if end is not None:
+            predicates.append(event_time < end.strftime(EVENT_TIME_FORMAT))
+        if sensor_ids is not None:
+            sensor_type = self.dataset.schema.field(self.sensor_column).type
+            predicates.append(ds.field(self.sensor_column).isin(pa.array(list(sensor_ids), type=sensor_type)))
+        expression = None
+        for predicate in predicates:
+            expression = predicate if expression is None else expression & predicate
+        return expression
+
+    def scanner(self, columns=None, start=None, end=None, sensor_ids=None, batch_size=131_072):
+        """A pyarrow Scanner over the selected columns, partitions and rows."""
+        start = _to_utc(start) if start is not None else None
+        end = _to_utc(end) if end is not None else None
+        dataset = self._pruned_dataset(start, end)
+        return dataset.scanner(
+            columns=columns or self.feature_columns,
+            filter=self._row_filter(start, end, sensor_ids),
+            batch_size=batch_size,
+        )
+
+    def read(self, columns=None, start=None, end=None, sensor_ids=None):
+        """Load the selected columns for event times in [start, end) and the given sensors."""
+        table = self.scanner(columns, start, end, sensor_ids).to_table()
+        logger.info(f"📊 Read {table.num_rows} rows x {table.num_columns} columns from {self.root}")
+        return table.to_pandas()
+
+    def iter_batches(self, columns=None, start=None, end=None, sensor_ids=None, batch_size=131_072):
+        """Yield the selection as DataFrames of at most `batch_size` rows."""
+        for batch in self.scanner(columns, start, end, sensor_ids, batch_size).to_batches():
+            if batch.num_rows:
+                yield batch.to_pandas()
+
+
+def write_offline_store(df, root, event_time_column="timestamp"):
+    """
+    Write a DataFrame into the offline-store layout (hive partitions by event hour).
+
+    Useful for building a local offline store from an export, or fixtures for tests.
+    """
+    event_time = pd.to_datetime(df[event_time_column], utc=True)
+    partitioned = df.assign(
+        year=event_time.dt.strftime("%Y"),
+        month=event_time.dt.strftime("%m"),
+        day=event_time.dt.strftime("%d"),
+        hour=event_time.dt.strftime("%H"),
+    )
+    pq.write_to_dataset(
+        pa.Table.from_pandas(partitioned, preserve_index=False), root, partition_cols=PARTITION_COLUMNS
+    )
+
+
+# ---------------- Point-in-time reads ----------------
+
+def _is_deleted(df):
+    deleted = df["is_deleted"]
+    if deleted.dtype == bool:
+        return deleted
+    return deleted.astype(str).str.lower().eq("true")
+
+
+def _sorted_versions(df, record_identifier, event_time_column, as_of):
+    """Filter to versions written by `as_of` and sort so the newest version of each key is last."""
+    write_time = pd.to_datetime(df["write_time"], utc=True)
+    if as_of is not None:
+        written = write_time <= _to_utc(as_of)
+        df, write_time = df[written], write_time[written]
+    order = df.assign(
+        _event_time=pd.to_datetime(df[event_time_column], utc=True),
+        _api_time=pd.to_datetime(df["api_invocation_time"], utc=True),
+        _write_time=write_time,
+    ).sort_values([record_identifier, "_event_time", "_api_time", "_write_time"], kind="stable")
+    return order
+
+
+def _drop_deleted(versions, record_identifier, deleted_at=None):
+    """Remove versions hidden by a deletion of the same record at the same or a later event time."""
+    if deleted_at is None:
+        deleted_at = versions["_event_time"].where(_is_deleted(versions)).groupby(versions[record_identifier]).max()
+    hidden_until = versions[record_identifier].map(deleted_at)
+    return versions[hidden_until.isna() | (versions["_event_time"] > hidden_until)]
+
+
+def deduplicate_versions(df, record_identifier="incident", event_time_column="timestamp", as_of=None):
+    """
+    Keep the newest write of each (record identifier, event time), as of `as_of` if given.
+
+    Versions written after `as_of` are ignored, and records deleted at or after an event time
+    hide their earlier versions, matching Feature Store's time-travel semantics.
+    """
+    versions = _sorted_versions(df, record_identifier, event_time_column, as_of)
+    versions = versions.drop_duplicates(subset=[record_identifier, "_event_time"], keep="last")
+    versions = _drop_deleted(versions, record_identifier)
+    return versions.drop(columns=["_event_time", "_api_time", "_write_time"]).reset_index(drop=True)
+
+
+def latest_records(df, record_identifier="incident", event_time_column="timestamp", as_of=None):
+    """Resolve each record identifier to its newest non-deleted version as of `as_of`."""
+    versions = _sorted_versions(df, record_identifier, event_time_column, as_of)
+    if as_of is not None:
+        versions = versions[versions["_event_time"] <= _to_utc(as_of)]
+    latest = versions.drop_duplicates(subset=[record_identifier], keep="last")
+    latest = latest[~_is_deleted(latest)]
+    return latest.drop(columns=["_event_time", "_api_time", "_write_time"]).reset_index(drop=True)
+
+
+def _deletions(reader, record_identifier, as_of):
+    """Latest deletion event time per record, from a scan of only the deletion rows."""
+    scanner = reader.dataset.scanner(
+        columns=[record_identifier, reader.event_time_column, "write_time"],
+        filter=ds.field("is_deleted") == True,  # noqa: E712 - pyarrow expression, not a Python comparison
+    )
+    deletions = scanner.to_table().to_pandas()
+    if as_of is not None:
+        deletions = deletions[pd.to_datetime(deletions["write_time"], utc=True) <= _to_utc(as_of)]
+    event_time = pd.to_datetime(deletions[reader.event_time_column], utc=True)
+    return event_time.groupby(deletions[record_identifier]).max()
+
+
+def read_deduplicated(reader, columns=None, start=None, end=None, sensor_ids=None,
+                      record_identifier="incident", as_of=None):
+    """
+    `deduplicate_versions` over the offline store, one event-time partition at a time.
+
+    All versions of a (record identifier, event time) pair share an event-time partition,
+    so each partition is deduplicated on its own. A first pass reads just the deletion rows
+    to apply deletions that land in a later partition. Yields one DataFrame per partition.
+    """
+    deleted_at = _deletions(reader, record_identifier, as_of)
+    needed = [record_identifier, reader.event_time_column] + VERSION_COLUMNS
+    columns = columns or reader.feature_columns
+    scan_columns = list(dict.fromkeys(columns + needed))
+    start_utc = _to_utc(start) if start is not None else None
+    end_utc = _to_utc(end) if end is not None else None
+    row_filter = reader._row_filter(start_utc, end_utc, sensor_ids)
+    for fragment in reader._pruned_dataset(start_utc, end_utc).get_fragments():
+        part = fragment.to_table(schema=reader.dataset.schema, columns=scan_columns, filter=row_filter).to_pandas()
+        if part.empty:
+            continue
+        versions = _sorted_versions(part, record_identifier, reader.event_time_column, as_of)
+        versions = versions.drop_duplicates(subset=[record_identifier, "_event_time"], keep="last")
+        versions = _drop_deleted(versions, record_identifier, deleted_at)
+        if not versions.empty:
+            yield versions[columns].reset_index(drop=True)
+
+
+def as_of_join(spine, reader, feature_columns, entity_column="sensor_id", spine_time_column="timestamp",
+               lookback=None, as_of=None, record_identifier="incident"):
+    """
+    Point-in-time join: attach to each spine row the latest features of its entity at or before its time.
+
+    Only the spine's entities and the time window [earliest spine time - lookback, latest spine time]
+    are read from the offline store, and feature versions written after `as_of` are ignored,
+    so a training set can be rebuilt exactly as it would have looked at a given cutoff.
+    """
+    spine = spine.assign(_spine_time=pd.to_datetime(spine[spine_time_column], utc=True))
+    lookback = pd.Timedelta(lookback) if lookback is not None else None
+    start = spine["_spine_time"].min() - lookback if lookback is not None else None
+    end = spine["_spine_time"].max() + pd.Timedelta(seconds=1)
+    event_time_column = reader.event_time_column
+    columns = list(dict.fromkeys([entity_column, event_time_column] + list(feature_columns)))
+
+    parts = list(read_deduplicated(
+        reader, columns=columns, start=start, end=end,
+        sensor_ids=spine[entity_column].unique().tolist() if entity_column == reader.sensor_column else None,
+        record_identifier=record_identifier, as_of=as_of,
+    ))
+    features = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+    features = features.rename(columns={event_time_column: "_feature_time"})
+    features["_feature_time"] = pd.to_datetime(features["_feature_time"], utc=True)
+
+    joined = pd.merge_asof(
+        spine.sort_values("_spine_time"),
+        features.sort_values("_feature_time"),
+        left_on="_spine_time",
+        right_on="_feature_time",
+        by=entity_column,
+        direction="backward",
+        tolerance=lookback,
+        suffixes=("", "_feature"),
+    )
+    return joined.drop(columns=["_spine_time", "_feature_time"])
@@ -1,62 +1,60 @@
+import argparse
+import os
+import sys
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
-from sklearn.preprocessing import OneHotEncoder
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import FeatureTransformer
+from common.hash_split import VALIDATION_SALT, HashSplitter
+from common.schema import FEATURE_COLUMNS, TRAINING_COLUMNS, memory_report, read_traffic_csv
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Define column names manually
-column_names = [
-    "incident", "timestamp", "sensor_id", "vehicle_count", 
-    "avg_speed", "weather_condition", "write_time", 
-    "api_invocation_time", "is_deleted"
-]
+# Command line options
+parser = argparse.ArgumentParser(description="Train and evaluate XGBoost on a local train.csv.")
+parser.add_argument("--categorical-mode", choices=["onehot", "native"], default="onehot",
+                    help="onehot: dummy columns; native: XGBoost categorical splits on weather_condition (tree_method=hist).")
+args = parser.parse_args()
 
 # Load data
-df = pd.read_csv("train.csv", names=column_names)
+# Columns follow common/schema.py; the header row is detected, and only the label, timestamp and features
+# are parsed, straight into their compact dtypes (write_time/api_invocation_time/is_deleted are skipped).
+df = read_traffic_csv("train.csv", usecols=TRAINING_COLUMNS)
 logger.info(f"📄 Loaded {len(df)} records from train.csv")
-
-# Drop unused columns
-df.drop(columns=["timestamp", "write_time", "api_invocation_time", "is_deleted"], inplace=True)
-
-# Convert numeric columns
-numeric_cols = ["sensor_id", "vehicle_count", "avg_speed"]
-for col in numeric_cols:
-    df[col] = pd.to_numeric(df[col], errors="coerce")
+memory_report(df, "load", logger)
 
 # Drop rows with missing values
 df.dropna(inplace=True)
 
-# Prepare features and label
-y = df["incident"].astype(int)  # Convert to int to match predicted labels
-X = df.drop(columns=["incident"])
-
-# One-hot encode weather_condition
-encoder = OneHotEncoder(sparse_output=False, handle_unknown="ignore")
-encoded_weather = encoder.fit_transform(X[["weather_condition"]])
-encoded_weather_df = pd.DataFrame(encoded_weather, columns=encoder.get_feature_names_out(["weather_condition"]))
-
-# Combine numeric and encoded categorical features
-X.reset_index(drop=True, inplace=True)
-encoded_weather_df.reset_index(drop=True, inplace=True)
-X_final = pd.concat([X.drop(columns=["weather_condition"]), encoded_weather_df], axis=1)
+# Train/test split by sensor_id + timestamp hash, the same split train_script.py uses
+train_df, test_df = HashSplitter(salt=VALIDATION_SALT).split(df)
+X_train_raw, X_test_raw = train_df[FEATURE_COLUMNS], test_df[FEATURE_COLUMNS]
+y_train, y_test = train_df["incident"], test_df["incident"]
 
-# Train/test split
-X_train, X_test, y_train, y_test = train_test_split(X_final, y, test_size=0.2, random_state=42)
+# Encode weather_condition with the same fitted transformer the training script uses
+transformer = FeatureTransformer(encoding=args.categorical_mode).fit(X_train_raw)
+X_train = transformer.transform(X_train_raw)
+X_test = transformer.transform(X_test_raw)
+logger.info(f"🔤 Features: {transformer.feature_names}")
 
 # XGBoost training
-dtrain = xgb.DMatrix(X_train, label=y_train)
-dtest = xgb.DMatrix(X_test, label=y_test)
+native = args.categorical_mode == "native"
+dmatrix_kwargs = {"feature_types": transformer.feature_types, "enable_categorical": True} if native else {}
+dtrain = xgb.DMatrix(X_train, label=y_train, **dmatrix_kwargs)
+dtest = xgb.DMatrix(X_test, label=y_test, **dmatrix_kwargs)
 
 params = {
     "objective": "binary:logistic",
     "eval_metric": "logloss",
     "verbosity": 0
 }
+if native:
+    params["tree_method"] = "hist"
 bst = xgb.train(params, dtrain, num_boost_round=100)
 
 # Predictions
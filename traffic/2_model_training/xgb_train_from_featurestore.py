@@ -16,6 +16,8 @@ Train XGBoost model from Feature Store data using SageMaker SDK locally.
 - When it’s done, the trained model is stored in S3 for later use (like making predictions).
 """
 
+import argparse
+import logging
 import boto3
 import sagemaker
 from sagemaker.feature_store.feature_group import FeatureGroup
@@ -23,9 +25,40 @@ from sagemaker.inputs import TrainingInput
 from sagemaker.xgboost.estimator import XGBoost
 from sagemaker.estimator import Estimator
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from dotenv import load_dotenv
 import os
+import sys
+from offline_store import OfflineStoreReader, read_deduplicated, deduplicate_versions
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.athena import AthenaParquetClient
+from common.channel_io import CONTENT_TYPES, write_dmatrix_channel
+from common.feature_transform import FeatureTransformer
+from common.hash_split import HOLDOUT_SALT, HashSplitter
+from common.schema import LABEL_COLUMN
+from common.waiters import stage_timer
+
+# Command line options
+# --offline-store-dir reads the Feature Store Parquet files directly instead of running Athena.
+# The time range and sensor filters only load the partitions and rows needed for training.
+parser = argparse.ArgumentParser(description="Train XGBoost from Feature Store data.")
+parser.add_argument("--offline-store-dir", default=None,
+                    help="Local copy (or path) of the offline store data/ directory.")
+parser.add_argument("--columns", nargs="+", default=None,
+                    help="Feature columns to load (default: all); incident, sensor_id and timestamp are always added.")
+parser.add_argument("--start", default=None, help="Earliest event time to load, e.g. 2023-01-01.")
+parser.add_argument("--end", default=None, help="Event time to load up to (exclusive).")
+parser.add_argument("--sensor-ids", nargs="+", type=int, default=None)
+parser.add_argument("--refresh-cache", action="store_true",
+                    help="Re-run the Athena query even if a cached result exists for the table's current state.")
+parser.add_argument("--as-of", default=None,
+                    help="Build the training set from record versions written up to this time (time travel).")
+parser.add_argument("--holdout-after", default=None,
+                    help="Send every record at or after this event time to the validation split.")
+parser.add_argument("--train-format", choices=["csv", "parquet", "dmatrix"], default="csv",
+                    help="Training channel format. parquet/dmatrix are read by 3_model_tuning/train_script.py "
+                         "without text parsing; the built-in container below only trains on csv.")
+args = parser.parse_args()
 
 # Load environment variables
 load_dotenv(dotenv_path="../.env")
@@ -37,23 +70,54 @@ prefix = os.getenv("S3_PREFIX")
 feature_group_name = os.getenv("FEATURE_GROUP_NAME")
 
 # Setup
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 session = sagemaker.Session()
+timings = {}  # Wall-clock seconds per stage
+
+# HashSplitter assigns each record by hashing its sensor_id + timestamp (see common/hash_split.py).
+# validation_fraction=0.2 means 20% of the data goes into the validation set, and 80% into the training set.
+# A record always lands in the same split, even after new data is ingested, so validation sets stay comparable.
+# --holdout-after additionally sends the newest records to validation (forward-in-time evaluation).
+splitter = HashSplitter(0.2, salt=HOLDOUT_SALT, holdout_after=args.holdout_after)
+
+# --columns only narrows the features: the label and the split keys are always loaded
+columns = None
+if args.columns:
+    columns = list(dict.fromkeys([LABEL_COLUMN, *splitter.key_columns, splitter.time_column, *args.columns]))
+
+with stage_timer("load training data", timings):
+    if args.offline_store_dir:
+        # Read the offline store Parquet files directly, with column projection and predicate pushdown.
+        # Duplicate and deleted record versions are resolved partition by partition as they are read.
+        reader = OfflineStoreReader(args.offline_store_dir)
+        parts = list(read_deduplicated(reader, columns=columns, start=args.start, end=args.end,
+                                       sensor_ids=args.sensor_ids, as_of=args.as_of))
+        df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    else:
+        # Connect to Feature Store (via Athena)
+        # Athena queries the parquet dataset automatically managed by SageMaker.
+        # Results come back as Parquet (UNLOAD) and are cached locally until the table changes.
+        feature_group = FeatureGroup(name=feature_group_name, sagemaker_session=session)
+        query = feature_group.athena_query()
+        query_string = f'SELECT * FROM "{query.table_name}"'
+        print(query_string)
+        boto_session = session.boto_session
+        athena_client = AthenaParquetClient(
+            boto_session.client("athena"), boto_session.client("s3"), boto_session.client("glue"),
+            output_s3_uri=f"s3://{bucket}/{prefix}/athena",
+        )
+
+        # Loads data into a Pandas DataFrame, Drops rows with missing values.
+        df = athena_client.query(query_string, database=query.database, table=query.table_name,
+                                 refresh=args.refresh_cache)
+
+        # The offline store keeps every record version; keep the newest non-deleted one.
+        df = deduplicate_versions(df, as_of=args.as_of)
 
-# Connect to Feature Store (via Athena)
-# Athena queries the parquet dataset automatically managed by SageMaker.
-feature_group = FeatureGroup(name=feature_group_name, sagemaker_session=session)
-query = feature_group.athena_query()
-query_string = f'SELECT * FROM "{query.table_name}"'
-print(query_string)
-query.run(query_string=query_string, output_location=f"s3://{bucket}/{prefix}/athena/")
-query.wait()
-
-# Loads data into a Pandas DataFrame, Drops rows with missing values.
-df = query.as_dataframe()
 print(f"📊 Records retrieved from Feature Store: {len(df)}")
 
 if df.empty:
-    raise ValueError("❌ No data retrieved from Feature Store via Athena. Please verify the feature group and ingestion.")
+    raise ValueError("❌ No data retrieved from Feature Store. Please verify the feature group, ingestion and filters.")
 
 print(f"🧾 Columns in dataframe: {df.columns.tolist()}")
 
@@ -80,11 +144,10 @@ y = df["incident"]
 # You're dividing your data into two parts:
 # Training Set: The part the model learns from.
 # Validation Set: The part you use to test if the model learned well.
-# train_test_split is a utility from Scikit-Learn used to split arrays or dataframes into random train and test subsets.
-# X = feature matrix; y = target vector.
-# test_size=0.2 means 20% of the data goes into the validation set, and 80% into the training set.
-# random_state=42 ensures the split is reproducible. (Using the same seed always results in the same split.)
-X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
+# The split itself is the HashSplitter set up before loading.
+is_validation = splitter.is_validation(df)
+X_train, X_val = X[~is_validation], X[is_validation]
+y_train, y_val = y[~is_validation], y[is_validation]
 
 #Output:
 # Full Dataset (X, y)
@@ -100,8 +163,26 @@ X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_st
 # Combines them column-wise into a single DataFrame where y_train is the first column and the features follow.
 # This format (label, feature1, feature2, ..., featureN) is required for XGBoost’s built-in CSV training format.
 train_data = pd.concat([y_train, X_train], axis=1)
-train_data.to_csv("train.csv", index=False, header=True)
-s3_train_path = session.upload_data("train.csv", bucket=bucket, key_prefix=f"{prefix}/train")
+if args.train_format == "parquet":
+    # Columnar and typed: train_script.py decodes only the label and feature columns
+    train_file = "train.parquet"
+    train_data.to_parquet(train_file, index=False)
+elif args.train_format == "dmatrix":
+    # Encode once here; train_script.py loads the binary buffer with no parsing or transform
+    train_file = "train_dmatrix"
+    transformer = FeatureTransformer().fit(X_train)
+    write_dmatrix_channel(transformer.transform(X_train), y_train, train_file, transformer)
+else:
+    train_file = "train.csv"
+    train_data.to_csv(train_file, index=False, header=True)
+with stage_timer("upload training data", timings):
+    s3_train_path = session.upload_data(train_file, bucket=bucket, key_prefix=f"{prefix}/train")
+
+if args.train_format != "csv":
+    print(f"✅ Uploaded {args.train_format} training channel to {s3_train_path}.")
+    print("ℹ️ Train on it with 3_model_tuning (train_script.py); the built-in container below needs csv.")
+    print("⏱️ Stage timings: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items()))
+    sys.exit(0)
 
 # Train Model
 # trains a machine learning model using Amazon SageMaker and the XGBoost algorithm.
@@ -142,5 +223,7 @@ xgb = Estimator(
 #  Feed the training data to XGBoost
 #  Optimize the model weights
 #  Save the final model to the output_path in S3
-xgb.fit({"train": TrainingInput(s3_train_path, content_type="csv")})
-print("✅ Model training completed.")
\ No newline at end of file
+with stage_timer("sagemaker training job", timings):
+    xgb.fit({"train": TrainingInput(s3_train_path, content_type=CONTENT_TYPES["csv"])})
+print("✅ Model training completed.")
+print("⏱️ Stage timings: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items()))
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Benchmark one-hot vs native categorical handling of weather_condition.
+
+The training CSV is scaled up by resampling rows with small numeric noise. Optionally each weather
+value is also split into synthetic sub-categories (`--categories`), to see how both paths behave
+as the vocabulary grows. Each mode is trained in its own fresh process on identical data, so the
+peak RSS numbers don't leak into each other. Reported per mode:
+
+- encode and training time
+- peak RSS and feature-matrix size
+- serialized model size
+- holdout AUC
+
+Usage:
+    python benchmark_categorical.py --rows 2000000 --categories 256 --num-round 100
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import FeatureTransformer
+from common.schema import FEATURE_COLUMNS, LABEL_COLUMN, read_traffic_csv
+
+logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def scale_up(df, rows, categories, seed=0):
+    """Resample `df` to `rows` rows, jitter the numerics and split weather into `categories` values."""
+    rng = np.random.default_rng(seed)
+    sample = df.iloc[rng.integers(0, len(df), size=rows)].reset_index(drop=True)
+    sample["vehicle_count"] = (sample["vehicle_count"] + rng.normal(0, 2, rows)).clip(0).astype(np.float32)
+    sample["avg_speed"] = (sample["avg_speed"] + rng.normal(0, 1, rows)).clip(0).astype(np.float32)
+    weather = sample["weather_condition"].astype(str)
+    n_weather = weather.nunique()
+    if categories > n_weather:
+        suffix = rng.integers(0, -(-categories // n_weather), size=rows).astype(str)
+        weather = weather + "_" + pd.Series(suffix)
+    sample["weather_condition"] = weather.astype("category")
+    return sample
+
+
+def run_mode(mode, csv_path, rows, categories, num_round, seed):
+    """Train one mode end to end and return its metrics (runs in a fresh process)."""
+    df = scale_up(read_traffic_csv(csv_path, usecols=[LABEL_COLUMN] + FEATURE_COLUMNS), rows, categories, seed)
+    train_df, test_df = train_test_split(df, test_size=0.2, random_state=seed)
+    del df
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    transformer = FeatureTransformer(encoding=mode).fit(train_df)
+    X_train = transformer.transform(train_df)
+    X_test = transformer.transform(test_df)
+    encode_seconds = time.perf_counter() - start
+
+    native = mode == "native"
+    dmatrix_kwargs = {"feature_types": transformer.feature_types, "enable_categorical": True} if native else {}
+    dtrain = xgb.DMatrix(X_train, label=train_df[LABEL_COLUMN], **dmatrix_kwargs)
+    dtest = xgb.DMatrix(X_test, **dmatrix_kwargs)
+    params = {"objective": "binary:logistic", "eval_metric": "auc", "tree_method": "hist", "seed": seed}
+
+    start = time.perf_counter()
+    booster = xgb.train(params, dtrain, num_boost_round=num_round)
+    train_seconds = time.perf_counter() - start
+
+    auc = roc_auc_score(test_df[LABEL_COLUMN], booster.predict(dtest))
+    return {
+        "mode": mode,
+        "features": transformer.n_features,
+        "matrix_mb": X_train.nbytes / 1e6,
+        "encode_s": encode_seconds,
+        "train_s": train_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_encode_mb": rss_before,
+        "model_kb": len(booster.save_raw()) / 1024,
+        "auc": auc,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare one-hot and native categorical training.")
+    parser.add_argument("--csv-path", default="../2_model_training/train.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=4,
+                        help="Distinct weather_condition values after scaling (4 keeps the real ones).")
+    parser.add_argument("--num-round", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    results = []
+    for mode in ("onehot", "native"):
+        logger.info(f"🏁 Training {mode} on {args.rows:,} rows with {args.categories} weather categories...")
+        # A fresh process per mode keeps the peak RSS of one mode out of the other's numbers
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            result = pool.submit(
+                run_mode, mode, args.csv_path, args.rows, args.categories, args.num_round, args.seed
+            ).result()
+        results.append(result)
+
+    print(f"{'mode':<8} {'features':>8} {'matrix MB':>10} {'encode s':>9} {'train s':>8} "
+          f"{'peak RSS MB':>12} {'model KB':>9} {'AUC':>7}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['features']:>8} {r['matrix_mb']:>10.1f} {r['encode_s']:>9.2f} {r['train_s']:>8.2f} "
+              f"{r['peak_rss_mb']:>12.0f} {r['model_kb']:>9.0f} {r['auc']:>7.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Wrote results to {args.output}")
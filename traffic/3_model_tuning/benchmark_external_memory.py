@@ -0,0 +1,110 @@
+"""
+Benchmark peak RSS against dataset size for the in-memory, QuantileDMatrix and external-memory paths.
+
+For each `--sizes` value, the training CSV is scaled up to that many rows and written as Parquet
+shards of `--shard-rows` rows. Each data mode then trains on the shards in its own fresh process
+and reports:
+
+- peak RSS
+- matrix build and training time
+- holdout AUC
+
+    python benchmark_external_memory.py --sizes 1000000 4000000 16000000 --num-round 50
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import xgboost as xgb
+from sklearn.metrics import roc_auc_score
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import FeatureTransformer
+from common.hash_split import HashSplitter
+from common.schema import LABEL_COLUMN, TRAINING_COLUMNS, read_traffic_csv
+from benchmark_categorical import peak_rss_mb, scale_up
+from external_memory import (
+    DATA_MODES, build_matrices, fit_transformer_on_first_chunk, list_shards, load_all_shards,
+)
+
+logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def write_shards(csv_path, rows, shard_rows, directory, seed=0):
+    """Scaled-up copy of the training CSV as Parquet shards, generated one shard at a time."""
+    source = read_traffic_csv(csv_path, usecols=TRAINING_COLUMNS)
+    for i, start in enumerate(range(0, rows, shard_rows)):
+        shard = scale_up(source, min(shard_rows, rows - start), categories=4, seed=seed + i)
+        shard.to_parquet(os.path.join(directory, f"part-{i:05d}.parquet"), index=False)
+    return list_shards(directory)
+
+
+def run_mode(mode, shards, chunk_rows, num_round, cache_dir):
+    """Build matrices and train with one data mode (runs in a fresh process)."""
+    params = {"objective": "binary:logistic", "eval_metric": "auc", "tree_method": "hist"}
+    start = time.perf_counter()
+    transformer = fit_transformer_on_first_chunk(shards, FeatureTransformer(), chunk_rows)
+    if mode == "inmemory":
+        df = load_all_shards(shards, chunk_rows)
+        train_df, val_df = HashSplitter().split(df)
+        dtrain = xgb.DMatrix(transformer.transform(train_df), label=train_df[LABEL_COLUMN])
+        dval = xgb.DMatrix(transformer.transform(val_df), label=val_df[LABEL_COLUMN])
+    else:
+        dtrain, dval = build_matrices(shards, transformer, mode, chunk_rows, cache_dir=cache_dir)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    booster = xgb.train(params, dtrain, num_boost_round=num_round)
+    train_seconds = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "build_s": build_seconds,
+        "train_s": train_seconds,
+        "peak_rss_mb": peak_rss_mb(),
+        "auc": roc_auc_score(dval.get_label(), booster.predict(dval)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Peak RSS vs dataset size for each training data mode.")
+    parser.add_argument("--csv-path", default="../2_model_training/train.csv")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000_000, 4_000_000])
+    parser.add_argument("--modes", nargs="+", choices=DATA_MODES, default=list(DATA_MODES))
+    parser.add_argument("--shard-rows", type=int, default=500_000)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--num-round", type=int, default=50)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="shards-") as shard_dir, \
+                tempfile.TemporaryDirectory(prefix="xgb-cache-") as cache_dir:
+            shards = write_shards(args.csv_path, rows, args.shard_rows, shard_dir)
+            data_mb = sum(os.path.getsize(path) for path in shards) / 1e6
+            for mode in args.modes:
+                logger.info(f"🏁 {mode}: {rows:,} rows in {len(shards)} shards ({data_mb:.0f} MB Parquet)")
+                # A fresh process per run so peak RSS belongs to this mode and size only
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    result = pool.submit(run_mode, mode, shards, args.chunk_rows, args.num_round, cache_dir).result()
+                result.update(rows=rows, parquet_mb=data_mb)
+                results.append(result)
+
+    print(f"{'rows':>12} {'mode':<9} {'peak RSS MB':>12} {'build s':>8} {'train s':>8} {'AUC':>7}")
+    for r in results:
+        print(f"{r['rows']:>12,} {r['mode']:<9} {r['peak_rss_mb']:>12.0f} {r['build_s']:>8.2f} "
+              f"{r['train_s']:>8.2f} {r['auc']:>7.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Wrote results to {args.output}")
@@ -0,0 +1,142 @@
+"""
+Boosting checkpoints for train_script.py, so managed spot training can resume after an interruption.
+
+SageMaker syncs the local checkpoint directory (`/opt/ml/checkpoints`, or `SM_CHECKPOINT_DIR` when
+local_runner.py sets it) with `checkpoint_s3_uri`. It restores the directory before the script starts
+again on a new instance. `CheckpointCallback` writes the booster there every `interval` rounds as
+`xgboost-checkpoint.<rounds>.json`:
+- writes are atomic: a temp file is renamed into place
+- only the newest `keep` checkpoints are kept
+At start-up, `latest_checkpoint` finds the newest one, and training continues from it for the
+remaining rounds.
+
+Rounds are counted with `num_boosted_rounds()` on the booster itself, so the file names stay correct
+however many times the job is resumed.
+
+With early stopping, use `ResumableEarlyStopping` ahead of `CheckpointCallback` in `callbacks`:
+- Each checkpoint then holds the untruncated booster plus, as booster attributes, the state early
+  stopping needs: `best_iteration`, `best_score`, the metric followed and whether it already fired.
+- On resume, the best score, best round and spent patience are restored instead of starting over.
+- `finished_checkpoint` tells the script that a checkpoint needs no more boosting.
+- `truncate_to_best` applies the same cut as `save_best`.
+"""
+
+import glob
+import logging
+import os
+import re
+
+import xgboost as xgb
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PREFIX = "xgboost-checkpoint"
+_CHECKPOINT_PATTERN = re.compile(rf"{CHECKPOINT_PREFIX}\.(\d+)\.json$")
+
+# Booster attributes saved with each checkpoint (best_iteration / best_score are XGBoost's own)
+METRIC_ATTR = "early_stopping_metric"
+STOPPED_ATTR = "early_stopped"
+
+
+def default_checkpoint_dir():
+    return os.environ.get("SM_CHECKPOINT_DIR", "/opt/ml/checkpoints")
+
+
+def list_checkpoints(directory):
+    """[(rounds, path)] of the checkpoints in `directory`, oldest first."""
+    checkpoints = []
+    for path in glob.glob(os.path.join(directory, f"{CHECKPOINT_PREFIX}.*.json")):
+        match = _CHECKPOINT_PATTERN.search(os.path.basename(path))
+        if match:
+            checkpoints.append((int(match.group(1)), path))
+    return sorted(checkpoints)
+
+
+def latest_checkpoint(directory):
+    """(rounds, path) of the newest checkpoint, or None."""
+    if not directory or not os.path.isdir(directory):
+        return None
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1] if checkpoints else None
+
+
+def finished_checkpoint(booster, num_round):
+    """True when the checkpointed booster needs no more rounds: all were boosted or early stopping fired."""
+    return booster.num_boosted_rounds() >= num_round or booster.attr(STOPPED_ATTR) == "true"
+
+
+def truncate_to_best(booster):
+    """The trees up to the best validation round, as EarlyStopping(save_best=True) returns them."""
+    best_iteration = booster.attr("best_iteration")
+    if best_iteration is None or int(best_iteration) + 1 >= booster.num_boosted_rounds():
+        return booster
+    return booster[: int(best_iteration) + 1]
+
+
+class ResumableEarlyStopping(xgb.callback.EarlyStopping):
+    """EarlyStopping that carries its state in booster attributes, so it survives a checkpoint and resume."""
+
+    def before_training(self, model):
+        model = super().before_training(model)
+        best_score, best_iteration = model.attr("best_score"), model.attr("best_iteration")
+        metric = model.attr(METRIC_ATTR)
+        if best_score is None or best_iteration is None or metric is None:
+            return model
+        # Same state the callback would hold had it never been interrupted
+        data_name = self.data or "validation"
+        self.stopping_history = {data_name: {metric: [float(best_score)]}}
+        self.best_scores = {data_name: {metric: [float(best_score)]}}
+        self.current_rounds = model.num_boosted_rounds() - 1 - int(best_iteration)
+        logger.info(f"♻️ Early stopping resumed: best {metric}={float(best_score):.5f} at round {best_iteration}, "
+                    f"{self.current_rounds} of {self.rounds} rounds of patience spent")
+        return model
+
+    def after_iteration(self, model, epoch, evals_log):
+        stop = super().after_iteration(model, epoch, evals_log)
+        data_name = self.data or list(evals_log)[-1]
+        model.set_attr(**{METRIC_ATTR: self.metric_name or list(evals_log[data_name])[-1],
+                          STOPPED_ATTR: "true" if stop else None})
+        return stop
+
+
+class CheckpointCallback(xgb.callback.TrainingCallback):
+    """
+    Saves the booster every `interval` boosted rounds and once more when training ends.
+
+    The final save is of the full booster seen during training, not the truncated one an earlier
+    EarlyStopping(save_best=True) hands on, so the newest checkpoint is never behind an older one.
+    """
+
+    def __init__(self, directory, interval=10, keep=2):
+        self.directory = directory
+        self.interval = max(1, interval)
+        self.keep = max(1, keep)
+        self._model = None
+        os.makedirs(directory, exist_ok=True)
+        super().__init__()
+
+    def before_training(self, model):
+        self._model = model
+        return model
+
+    def save(self, model):
+        rounds = model.num_boosted_rounds()
+        path = os.path.join(self.directory, f"{CHECKPOINT_PREFIX}.{rounds}.json")
+        if os.path.exists(path):
+            return path
+        staging = os.path.join(self.directory, f".{CHECKPOINT_PREFIX}.{rounds}.partial.json")
+        model.save_model(staging)
+        os.replace(staging, path)
+        for _, old_path in list_checkpoints(self.directory)[:-self.keep]:
+            os.remove(old_path)
+        logger.info(f"💾 Checkpoint after {rounds} rounds: {path}")
+        return path
+
+    def after_iteration(self, model, epoch, evals_log):
+        if model.num_boosted_rounds() % self.interval == 0:
+            self.save(model)
+        return False  # Never stops training
+
+    def after_training(self, model):
+        self.save(self._model if self._model is not None else model)
+        return model
@@ -0,0 +1,244 @@
+"""
+Out-of-core training data for train_script.py: an `xgb.DataIter` over sharded channel files.
+
+`ShardIter` walks the channel files (CSV or Parquet shards) in chunks of `chunk_rows` rows. Each
+chunk is encoded into float32 with the fitted `FeatureTransformer` and handed to XGBoost.
+XGBoost never sees the whole dataset at once:
+
+- `quantile`: `xgb.QuantileDMatrix(iter)` sketches quantiles in a first pass and stores only the
+  quantised histogram index (~1 byte per value) in a second pass. Memory is bounded by the
+  compressed matrix rather than by the raw float data plus pandas copies.
+- `external`: `xgb.DMatrix(iter)` with a `cache_prefix` writes the pages to disk and streams
+  them on every boosting round. Memory is bounded by the page size, at the cost of I/O per round.
+
+The split happens inside the iterator with a `row_filter(chunk, first_row)` hook that returns a
+boolean mask. By default that is the hash split of `common.hash_split`, which needs no
+other rows. When a `validation` channel is present it is used as is instead.
+
+`PipeIter` does the same over a Pipe-mode channel. Every pass XGBoost makes over the data reads the
+FIFO of the channel's next epoch (`train_0`, `train_1`, ...) chunk by chunk as the bytes arrive.
+Matrix building therefore overlaps the transfer, and no pass holds more than one chunk. The stream
+can't be peeked, so the transformer is fitted on the first chunk of the first pass
+(`build_pipe_matrices`).
+
+Neither path has the validation rows as a DataFrame to save, so the validation iterator can pass them
+to a `ValidationCsvWriter` during its first pass. That gives the same validation.csv (label + raw
+features) as the in-memory path without another read of the channel.
+"""
+
+import glob
+import itertools
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+
+from common.channel_io import iter_pipe_chunks, pipe_path
+from common.hash_split import VALIDATION_SALT, HashSplitter
+from common.schema import FEATURE_COLUMNS, LABEL_COLUMN, TRAINING_COLUMNS, cast_traffic_dtypes, read_traffic_csv
+
+logger = logging.getLogger(__name__)
+
+DATA_MODES = ("inmemory", "quantile", "external")
+
+
+def list_shards(directory):
+    """Parquet shards if the channel has any, otherwise CSV shards, in a stable order."""
+    for pattern in ("*.parquet", "*.csv"):
+        shards = sorted(glob.glob(os.path.join(directory, "**", pattern), recursive=True))
+        if shards:
+            return shards
+    raise FileNotFoundError(f"❌ No .parquet or .csv shards found in {directory}")
+
+
+def iter_shard_chunks(shards, chunk_rows=100_000):
+    """Yield (label, timestamp, features) DataFrame chunks of at most `chunk_rows` rows across all shards."""
+    columns = TRAINING_COLUMNS
+    for path in shards:
+        if path.endswith(".parquet"):
+            parquet = pq.ParquetFile(path, read_dictionary=["weather_condition"])
+            for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+                yield cast_traffic_dtypes(batch.to_pandas())
+        else:
+            with read_traffic_csv(path, usecols=columns, chunksize=chunk_rows) as reader:
+                yield from reader
+
+
+class ShardIter(xgb.DataIter):
+    """Feeds encoded chunks of sharded channel files to QuantileDMatrix / external-memory DMatrix."""
+
+    def __init__(self, shards, transformer, chunk_rows=100_000, row_filter=None, cache_prefix=None, sink=None):
+        self.shards = shards
+        self.transformer = transformer
+        self.chunk_rows = chunk_rows
+        self.row_filter = row_filter
+        # Called with every kept raw chunk of the first complete pass (XGBoost may make several)
+        self.sink = sink
+        self._chunks = None
+        self._first_row = 0
+        self._buffer = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._chunks = None
+        self._first_row = 0
+
+    def _open(self):
+        return iter_shard_chunks(self.shards, self.chunk_rows)
+
+    def next(self, input_data):
+        if self._chunks is None:
+            self._chunks = self._open()
+        for chunk in self._chunks:
+            if self.transformer.vocabularies is None:
+                # Pipe mode: fitted on the first chunk in passing, before anything is encoded
+                self.transformer.fit(chunk[FEATURE_COLUMNS])
+            first_row = self._first_row
+            self._first_row += len(chunk)
+            if self.row_filter is not None:
+                chunk = chunk[self.row_filter(chunk, first_row)]
+            if chunk.empty:
+                continue
+            if self.sink is not None:
+                self.sink(chunk)
+            native = self.transformer.encoding == "native"
+            input_data(
+                data=self._encode(chunk),
+                label=chunk[LABEL_COLUMN].to_numpy(),
+                feature_types=self.transformer.feature_types if native else None,
+            )
+            return True
+        self.sink = None
+        return False
+
+    def _encode(self, chunk):
+        # XGBoost copies each batch before asking for the next one, so one buffer serves every chunk
+        if self._buffer is None or self._buffer.shape[0] < len(chunk):
+            self._buffer = np.empty((max(self.chunk_rows, len(chunk)), self.transformer.n_features), dtype=np.float32)
+        return self.transformer.transform(chunk, out=self._buffer)
+
+
+class PipeIter(ShardIter):
+    """ShardIter over a Pipe-mode channel: each pass reads the FIFO of the next epoch."""
+
+    def __init__(self, channel, transformer, epochs, chunk_rows=100_000, row_filter=None, cache_prefix=None,
+                 input_dir=None, sink=None):
+        self.channel = channel
+        self.input_dir = input_dir
+        # Shared by the train and validation iterators, which read the same channel's epochs in turn
+        self.epochs = epochs
+        super().__init__([], transformer, chunk_rows, row_filter, cache_prefix, sink)
+
+    def _open(self):
+        epoch = next(self.epochs)
+        logger.info(f"🚰 Reading epoch {epoch} of channel '{self.channel}' from its FIFO")
+        return iter_pipe_chunks(pipe_path(self.channel, epoch, self.input_dir), self.chunk_rows)
+
+
+class ValidationCsvWriter:
+    """Appends raw validation chunks to validation.csv in the layout of train_script.validation_frame."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._header = True
+
+    def __call__(self, chunk):
+        chunk[[LABEL_COLUMN] + FEATURE_COLUMNS].to_csv(self.path, mode="w" if self._header else "a",
+                                                        header=self._header, index=False)
+        self._header = False
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._header:
+            # No validation rows: still a valid, empty validation.csv
+            pd.DataFrame(columns=[LABEL_COLUMN] + FEATURE_COLUMNS).to_csv(self.path, index=False)
+            self._header = False
+        logger.info(f"💾 Saved {self.rows} validation rows to {self.path}")
+        return self.path
+
+
+def fit_transformer_on_first_chunk(shards, transformer, chunk_rows=100_000):
+    """
+    Fit the transformer without loading the dataset: the declared weather categories come with
+    the compact dtypes, so the first chunk already carries the full vocabulary.
+    """
+    first = next(iter_shard_chunks(shards, chunk_rows))
+    return transformer.fit(first[FEATURE_COLUMNS])
+
+
+def build_matrices(train_shards, transformer, mode="quantile", chunk_rows=100_000, validation_shards=None,
+                   cache_dir="/tmp/xgb-cache", max_bin=256, splitter=None, validation_sink=None):
+    """
+    Train and validation matrices built chunk by chunk; returns (dtrain, dval).
+
+    `validation_sink` (e.g. a `ValidationCsvWriter`) receives the raw validation rows as they are read.
+    """
+    if validation_shards:
+        train_filter, val_filter = None, None
+    else:
+        splitter = splitter or HashSplitter(salt=VALIDATION_SALT)
+        train_filter, val_filter = splitter.row_filter(), splitter.row_filter(validation=True)
+        validation_shards = train_shards
+
+    def make_iter(name, shards, row_filter, sink=None):
+        cache_prefix = os.path.join(cache_dir, name) if mode == "external" else None
+        return ShardIter(shards, transformer, chunk_rows, row_filter, cache_prefix=cache_prefix, sink=sink)
+
+    return _build(make_iter("train", train_shards, train_filter),
+                  lambda: make_iter("validation", validation_shards, val_filter, validation_sink), transformer, mode,
+                  cache_dir, max_bin)
+
+
+def build_pipe_matrices(transformer, mode="quantile", channel="train", chunk_rows=100_000, validation_shards=None,
+                        cache_dir="/tmp/xgb-cache", max_bin=256, splitter=None, input_dir=None, validation_sink=None):
+    """
+    Train and validation matrices streamed from a Pipe-mode channel; returns (dtrain, dval).
+
+    `transformer` may be unfitted: it is then fitted on the first chunk of the stream. Validation rows
+    come from a File-mode `validation_shards` channel if given, else from the hash split of the stream.
+    They are passed to `validation_sink` as they are read.
+    """
+    if mode not in ("quantile", "external"):
+        raise ValueError(f"❌ Pipe mode builds iterator matrices only; got --data_mode {mode}")
+    splitter = splitter or HashSplitter(salt=VALIDATION_SALT)
+    epochs = itertools.count()
+
+    def cache_prefix(name):
+        return os.path.join(cache_dir, name) if mode == "external" else None
+
+    train_iter = PipeIter(channel, transformer, epochs, chunk_rows,
+                          None if validation_shards else splitter.row_filter(), cache_prefix("train"), input_dir)
+
+    def make_val_iter():
+        if validation_shards:
+            return ShardIter(validation_shards, transformer, chunk_rows, cache_prefix=cache_prefix("validation"),
+                             sink=validation_sink)
+        return PipeIter(channel, transformer, epochs, chunk_rows, splitter.row_filter(validation=True),
+                        cache_prefix("validation"), input_dir, sink=validation_sink)
+
+    return _build(train_iter, make_val_iter, transformer, mode, cache_dir, max_bin)
+
+
+def _build(train_iter, make_val_iter, transformer, mode, cache_dir, max_bin):
+    # The validation iterator is created once the training matrix exists, so a transformer fitted by
+    # the training iterator's first chunk is in place before the validation one is used
+    native = transformer.encoding == "native"
+    if mode == "external":
+        os.makedirs(cache_dir, exist_ok=True)
+        dtrain = xgb.DMatrix(train_iter, enable_categorical=native)
+        dval = xgb.DMatrix(make_val_iter(), enable_categorical=native)
+    else:
+        dtrain = xgb.QuantileDMatrix(train_iter, max_bin=max_bin, enable_categorical=native)
+        # Validation bins must come from the training sketch
+        dval = xgb.QuantileDMatrix(make_val_iter(), ref=dtrain, enable_categorical=native)
+    logger.info(f"🧱 Built {mode} matrices: {dtrain.num_row()} train / {dval.num_row()} validation rows")
+    return dtrain, dval
+
+
+def load_all_shards(shards, chunk_rows=100_000):
+    """The in-memory path, for comparison: every chunk concatenated into one DataFrame."""
+    return pd.concat(iter_shard_chunks(shards, chunk_rows), ignore_index=True)
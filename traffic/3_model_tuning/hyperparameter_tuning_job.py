@@ -2,14 +2,36 @@
 Run a hyperparameter tuning job for XGBoost using SageMaker SDK.
 """
 
+import argparse
 import os
+import sys
 import logging
 from dotenv import load_dotenv
 import sagemaker
 from sagemaker.inputs import TrainingInput
-from sagemaker.tuner import HyperparameterTuner, IntegerParameter, ContinuousParameter
+from sagemaker.tuner import HyperparameterTuner
 from sagemaker.xgboost.estimator import XGBoost
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.channel_io import CONTENT_TYPES
+from common.waiters import stage_timer
+from search_space import load_config, sagemaker_ranges
+
+# Command line options
+parser = argparse.ArgumentParser(description="Run a hyperparameter tuning job for train_script.py.")
+parser.add_argument("--train-format", choices=["csv", "parquet", "dmatrix"], default="csv",
+                    help="Format of the train channel written by xgb_train_from_featurestore.py --train-format.")
+parser.add_argument("--input-mode", choices=["File", "Pipe"], default="File",
+                    help="Pipe streams csv into the training container instead of downloading it first.")
+parser.add_argument("--spot", action="store_true",
+                    help="Managed spot training; train_script.py checkpoints and resumes through checkpoint_s3_uri.")
+parser.add_argument("--max-run", type=int, default=3600, help="Maximum training seconds per job.")
+parser.add_argument("--max-wait", type=int, default=7200,
+                    help="Maximum seconds per job including waiting for spot capacity (spot only, >= --max-run).")
+args = parser.parse_args()
+if args.input_mode == "Pipe" and args.train_format != "csv":
+    parser.error("Pipe mode streams csv only; use --input-mode File for parquet/dmatrix channels.")
+
 # ─────────────────────────────────────────────────────────────
 # Configure logging
 # ─────────────────────────────────────────────────────────────
@@ -37,9 +59,15 @@ logger.info(f"S3 Prefix: {prefix}")
 # Initialize SageMaker session
 session = sagemaker.Session()
 
+# Search space, objective and static hyperparameters are shared with local_tuner.py
+tuning_config = load_config()
+objective = tuning_config["objective"]
+tuner_settings = tuning_config.get("sagemaker_tuner", {})
+
 # Training data location
 s3_train_path = f"s3://{bucket}/{prefix}/train"
 output_path = f"s3://{bucket}/{prefix}/output"
+checkpoint_s3_uri = f"s3://{bucket}/{prefix}/checkpoints"
 
 # ─────────────────────────────────────────────────────────────
 # Define XGBoost Estimator
@@ -47,21 +75,28 @@ output_path = f"s3://{bucket}/{prefix}/output"
 logger.info("Configuring XGBoost Estimator...")
 xgb_estimator = XGBoost(
     entry_point="train_script.py",  # ✅ Must be the script filename
-    framework_version="1.3-1",
+    source_dir=".",
+    dependencies=["../common"],  # Shared schema helpers imported by train_script.py
+    framework_version="1.7-1",  # Native categorical support (--categorical_mode native) needs XGBoost >= 1.6
     instance_type="ml.m5.large",
     instance_count=1,
     output_path=output_path, # Ensures SageMaker uploads everything from /opt/ml/output/
     role=role,
     sagemaker_session=session,
+    # Spot: /opt/ml/checkpoints is synced to S3 and restored after an interruption, and train_script.py
+    # resumes from the newest checkpoint instead of starting over
+    use_spot_instances=args.spot,
+    max_run=args.max_run,
+    max_wait=args.max_wait if args.spot else None,
+    checkpoint_s3_uri=checkpoint_s3_uri if args.spot else None,
     hyperparameters={
-        "objective": "binary:logistic",
-        "eval_metric": "auc",
-        "num_round": 100
+        **tuning_config.get("static_hyperparameters", {}),
+        "train_format": args.train_format,
     },
     metric_definitions=[
         {
-            "Name": "validation:auc",
-            "Regex": ".*\\[[0-9]+\\].*validation-auc:([0-9\\.]+)"
+            "Name": objective["metric"],
+            "Regex": objective["regex"]
         }
     ]
 )
@@ -69,19 +104,11 @@ xgb_estimator = XGBoost(
 # ─────────────────────────────────────────────────────────────
 # Define hyperparameter search space
 # ─────────────────────────────────────────────────────────────
-# max_depth - The maximum depth per tree. A deeper tree might increase the performance, but also the complexity and chances to overfit.
-# eta - learning rate
-# gamma - Gamma is a pseudo-regularisation parameter (Lagrangian multiplier), and depends on the other parameters. The higher Gamma is, the higher the regularization.
-# subsample - Represents the fraction of observations to be sampled for each tree. A lower values prevent overfitting but might lead to under-fitting.
+# The ranges (max_depth, eta, gamma, min_child_weight, subsample) are defined in config.yaml.
+# local_tuner.py searches the same space on a single workstation before paying for a remote job.
 
 logger.info("Defining hyperparameter search ranges...")
-hyperparameter_ranges = {
-    "max_depth": IntegerParameter(3, 10),
-    "eta": ContinuousParameter(0.1, 0.5),
-    "gamma": ContinuousParameter(0, 10),
-    "min_child_weight": IntegerParameter(1, 10),
-    "subsample": ContinuousParameter(0.5, 1)
-}
+hyperparameter_ranges = sagemaker_ranges(tuning_config)
 
 # ─────────────────────────────────────────────────────────────
 # Create Hyperparameter Tuner
@@ -89,16 +116,18 @@ hyperparameter_ranges = {
 logger.info("Initializing Hyperparameter Tuner...")
 tuner = HyperparameterTuner(
     estimator=xgb_estimator,
-    objective_metric_name="validation:auc",
+    objective_metric_name=objective["metric"],
     hyperparameter_ranges=hyperparameter_ranges,
-    objective_type="Maximize",
-    max_jobs=10,
-    max_parallel_jobs=2
+    objective_type=objective.get("type", "Maximize"),
+    max_jobs=tuner_settings.get("max_jobs", 10),
+    max_parallel_jobs=tuner_settings.get("max_parallel_jobs", 2)
 )
 
 # ─────────────────────────────────────────────────────────────
 # Launch tuning job
 # ─────────────────────────────────────────────────────────────
 logger.info("Launching hyperparameter tuning job...")
-tuner.fit({"train": TrainingInput(s3_train_path, content_type="csv")})
+with stage_timer("hyperparameter tuning job"):
+    tuner.fit({"train": TrainingInput(s3_train_path, content_type=CONTENT_TYPES[args.train_format],
+                                      input_mode=args.input_mode)})
 logger.info("🚀 Hyperparameter tuning job started.")
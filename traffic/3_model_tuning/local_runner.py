@@ -0,0 +1,238 @@
+"""
+Run train_script.py locally against the SageMaker training-container contract, with no remote job.
+
+`LocalTrainingRunner` lays out the `/opt/ml` tree in a temporary directory:
+
+    <root>/input/config/hyperparameters.json   hyperparameters, JSON-encoded string values
+    <root>/input/config/inputdataconfig.json   channels and their TrainingInputMode
+    <root>/input/config/resourceconfig.json    current host / hosts
+    <root>/input/data/<channel>/               channel files (symlinked, not copied)
+    <root>/input/data/<channel>_0              FIFO for Pipe-mode channels
+    <root>/model/                              SM_MODEL_DIR
+    <root>/output/data/                        SM_OUTPUT_DATA_DIR
+    <root>/checkpoints/
+
+It then sets the `SM_*` environment variables as the container does and passes the
+hyperparameters as `--name value` arguments. The script runs either in-process (`in_process=True`,
+fastest, good for a debugger) or in a subprocess. Training uses every local core
+(`nthread`, `tree_method=hist`) unless the hyperparameters say otherwise. Preprocessed matrices go to
+the shared DMatrix cache (`dmatrix_cache_dir`), so repeated runs on the same channel skip preprocessing.
+
+    python local_runner.py --channel train=../2_model_training/train.csv --hp num_round=50 --hp max_depth=4
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.channel_io import simulate_pipe
+from common.dmatrix_cache import DEFAULT_CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ENTRY_POINT = os.path.join(SCRIPT_DIR, "train_script.py")
+
+
+@contextmanager
+def _patched_environ(env):
+    saved = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+class LocalTrainingRunner:
+    """Builds a local /opt/ml tree and runs a SageMaker script-mode entry point against it."""
+
+    def __init__(self, channels, hyperparameters=None, entry_point=DEFAULT_ENTRY_POINT, root=None,
+                 input_modes=None, nthread=None, keep=False):
+        self.channels = dict(channels)                 # name -> local file or directory
+        self.hyperparameters = dict(hyperparameters or {})
+        self.entry_point = entry_point
+        self.input_modes = dict(input_modes or {})     # name -> "File" | "Pipe"
+        self.nthread = nthread or os.cpu_count() or 1
+        self.keep = keep or root is not None
+        self.root = root or tempfile.mkdtemp(prefix="opt-ml-")
+
+    # ---------------- Container contract ----------------
+
+    def path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    def _hyperparameters(self):
+        hyperparameters = {"nthread": self.nthread, "tree_method": "hist", "validation_s3_uri": "",
+                           "dmatrix_cache_dir": DEFAULT_CACHE_DIR}
+        hyperparameters.update(self.hyperparameters)
+        return hyperparameters
+
+    def prepare(self):
+        """Create the directory tree, config files and channel links."""
+        for directory in ("input/config", "input/data", "model", "output/data", "checkpoints"):
+            os.makedirs(self.path(*directory.split("/")), exist_ok=True)
+
+        # SageMaker writes every hyperparameter value as a JSON-encoded string
+        with open(self.path("input", "config", "hyperparameters.json"), "w") as f:
+            json.dump({k: json.dumps(v) for k, v in self._hyperparameters().items()}, f, indent=2)
+        with open(self.path("input", "config", "inputdataconfig.json"), "w") as f:
+            json.dump(self.input_data_config(), f, indent=2)
+        with open(self.path("input", "config", "resourceconfig.json"), "w") as f:
+            json.dump({"current_host": "algo-1", "hosts": ["algo-1"]}, f)
+
+        for name, source in self.channels.items():
+            if self.input_modes.get(name) == "Pipe":
+                continue  # Fed through a FIFO at run time
+            destination = self.path("input", "data", name)
+            os.makedirs(destination, exist_ok=True)
+            sources = [source] if os.path.isfile(source) else [
+                os.path.join(source, entry) for entry in sorted(os.listdir(source))
+            ]
+            for path in sources:
+                link = os.path.join(destination, os.path.basename(path))
+                if not os.path.lexists(link):
+                    os.symlink(os.path.abspath(path), link)
+        return self
+
+    def input_data_config(self):
+        return {
+            name: {"TrainingInputMode": self.input_modes.get(name, "File"), "S3DistributionType": "FullyReplicated"}
+            for name in self.channels
+        }
+
+    def environ(self):
+        env = {
+            "SM_MODEL_DIR": self.path("model"),
+            "SM_OUTPUT_DATA_DIR": self.path("output", "data"),
+            "SM_OUTPUT_DIR": self.path("output"),
+            "SM_INPUT_DIR": self.path("input"),
+            "SM_INPUT_CONFIG_DIR": self.path("input", "config"),
+            "SM_INPUT_DATA_CONFIG": json.dumps(self.input_data_config()),
+            "SM_CHANNELS": json.dumps(sorted(self.channels)),
+            "SM_HPS": json.dumps(self._hyperparameters()),
+            "SM_HOSTS": json.dumps(["algo-1"]),
+            "SM_CURRENT_HOST": "algo-1",
+            "SM_NUM_CPUS": str(self.nthread),
+            "SM_CHECKPOINT_DIR": self.path("checkpoints"),
+        }
+        for name in self.channels:
+            env[f"SM_CHANNEL_{name.upper()}"] = self.path("input", "data", name)
+        return env
+
+    def argv(self):
+        argv = []
+        for name, value in self._hyperparameters().items():
+            argv += [f"--{name}", str(value)]
+        return argv
+
+    # ---------------- Running ----------------
+
+    @contextmanager
+    def _pipes(self):
+        with ExitStack() as stack:
+            for name, source in self.channels.items():
+                if self.input_modes.get(name) == "Pipe":
+                    sources = [source] if os.path.isfile(source) else sorted(
+                        os.path.join(source, entry) for entry in os.listdir(source)
+                    )
+                    stack.enter_context(simulate_pipe(sources, channel=name, input_dir=self.path("input", "data")))
+            yield
+
+    def run(self, in_process=False):
+        """Run the entry point; returns a summary with timings and the produced files."""
+        self.prepare()
+        started = time.perf_counter()
+        with self._pipes():
+            if in_process:
+                self._run_in_process()
+            else:
+                self._run_subprocess()
+        elapsed = time.perf_counter() - started
+        return self.summary(elapsed)
+
+    def _run_in_process(self):
+        module_dir = os.path.dirname(os.path.abspath(self.entry_point))
+        module_name = os.path.splitext(os.path.basename(self.entry_point))[0]
+        if module_dir not in sys.path:
+            sys.path.insert(0, module_dir)
+        with _patched_environ(self.environ()):
+            module = importlib.import_module(module_name)
+            module.main(self.argv())
+
+    def _run_subprocess(self):
+        env = dict(os.environ, **self.environ())
+        command = [sys.executable, self.entry_point] + self.argv()
+        logger.info(f"🐍 {' '.join(command)}")
+        subprocess.run(command, env=env, cwd=os.path.dirname(os.path.abspath(self.entry_point)), check=True)
+
+    def summary(self, elapsed):
+        timings_path = self.path("output", "data", "timings.json")
+        timings = {}
+        if os.path.exists(timings_path):
+            with open(timings_path) as f:
+                timings = json.load(f)
+        return {
+            "root": self.root,
+            "elapsed_s": elapsed,
+            "timings": timings,
+            "model_files": sorted(os.listdir(self.path("model"))),
+            "output_files": sorted(os.listdir(self.path("output", "data"))),
+        }
+
+    def cleanup(self):
+        if not self.keep:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def _parse_pairs(pairs, what):
+    parsed = {}
+    for pair in pairs or []:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"❌ {what} must be name=value, got '{pair}'")
+        parsed[name] = value
+    return parsed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run train_script.py against a local /opt/ml tree.")
+    parser.add_argument("--channel", action="append", required=True,
+                        help="name=path of a local file or directory, e.g. train=../2_model_training/train.csv")
+    parser.add_argument("--hp", action="append", help="Hyperparameter name=value (repeatable).")
+    parser.add_argument("--pipe", nargs="*", default=[], help="Channels to stream through a FIFO (Pipe mode).")
+    parser.add_argument("--entry-point", default=DEFAULT_ENTRY_POINT)
+    parser.add_argument("--root", default=None, help="Directory for the /opt/ml tree (kept); default is a temp dir.")
+    parser.add_argument("--nthread", type=int, default=None)
+    parser.add_argument("--in-process", action="store_true", help="Import and call main() instead of a subprocess.")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary /opt/ml tree after the run.")
+    args = parser.parse_args()
+
+    runner = LocalTrainingRunner(
+        channels=_parse_pairs(args.channel, "--channel"),
+        hyperparameters=_parse_pairs(args.hp, "--hp"),
+        entry_point=args.entry_point,
+        root=args.root,
+        input_modes={name: "Pipe" for name in args.pipe},
+        nthread=args.nthread,
+        keep=args.keep,
+    )
+    try:
+        result = runner.run(in_process=args.in_process)
+        print(json.dumps(result, indent=2))
+    finally:
+        runner.cleanup()
@@ -0,0 +1,481 @@
+"""
+Local hyperparameter search for train_script.py: trials run in a process pool, one trial per core.
+
+The search space, objective metric and static hyperparameters come from config.yaml, the same
+definitions `hyperparameter_tuning_job.py` hands to the SageMaker tuner (see search_space.py). Each trial
+builds its booster params through train_script's `parse_args` / `build_params`, so a configuration found
+here trains the same way as a remote job.
+
+The training CSV is loaded, split and encoded once in the parent, into the content-addressed DMatrix
+cache (common/dmatrix_cache.py, `--dmatrix-cache-dir`). Later runs on the same data skip that step.
+Every worker loads the binary matrices a single time at start-up. Trials then only pay for boosting,
+with `nthread=1` per trial and one worker per core.
+
+Samplers:
+- random: independent uniform draws from each range
+- tpe: Tree-structured Parzen Estimator; after `n_startup` (10) random trials, candidates are drawn from a
+  density fitted on the best trials and ranked by their good/bad density ratio. Only completed
+  trials are told to it: a pruned trial's score is at fewer rounds and not comparable with the
+  full-`num_round` scores, so it would drag its configuration into the "bad" density
+
+Schedulers, pruning on the per-round `validation-auc` of each trial:
+- none: every trial boosts `num_round` rounds
+- successive_halving: asynchronous successive halving. Rungs sit at min_rounds * reduction_factor^k
+  rounds, and a trial continues past a rung only while it ranks in the top 1/reduction_factor of the
+  trials that reached that rung.
+- hyperband: successive halving brackets with different minimum rounds; trials are assigned round-robin
+  so that aggressive and conservative pruning run side by side
+
+A pruned trial's model is sent back to the parent as raw bytes, and boosting continues from it in
+whichever worker is free, so no round is trained twice.
+
+Finished trials are recorded in a SQLite trial store (trial_store.py, `--store`). A configuration
+already completed on the same data is served from the store instead of being trained again. The
+sampler is warm-started from every earlier completed trial on that data at the same `num_round`
+(`--no-warm-start` to disable).
+
+    python local_tuner.py --n-trials 200 --sampler tpe --scheduler hyperband
+    python trial_store.py --db local_tuning/trials.sqlite    # throughput and cache hit rate per run
+"""
+
+import argparse
+import csv
+import json
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import xgboost as xgb
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.dmatrix_cache import DEFAULT_CACHE_DIR, DMatrixCache, fingerprint_files, load_entry
+from common.hash_split import VALIDATION_SALT, HashSplitter
+from common.schema import read_traffic_csv
+from common.waiters import stage_timer
+from search_space import DEFAULT_CONFIG, load_config, objective_metric
+from train_script import build_params, parse_args, preprocess_to_cache
+from trial_store import DEFAULT_DB, TrialStore, params_key
+
+logger = logging.getLogger(__name__)
+
+SAMPLERS = ("random", "tpe")
+SCHEDULERS = ("none", "successive_halving", "hyperband")
+
+
+# ---------------- Search space ----------------
+
+def _is_log(spec):
+    return spec.get("scaling") == "Logarithmic"
+
+
+def _to_unit(spec, value):
+    low, high = spec["min"], spec["max"]
+    if _is_log(spec):
+        low, high, value = math.log(low), math.log(high), math.log(value)
+    return 0.0 if high == low else (value - low) / (high - low)
+
+
+def _from_unit(spec, u):
+    low, high = spec["min"], spec["max"]
+    if _is_log(spec):
+        value = math.exp(math.log(low) + u * (math.log(high) - math.log(low)))
+    else:
+        value = low + u * (high - low)
+    if spec["type"] == "Integer":
+        return int(min(max(round(value), low), high))
+    return float(value)
+
+
+def in_space(ranges, config):
+    """True if `config` sets exactly the parameters of `ranges`, each inside its range."""
+    if set(config) != set(ranges):
+        return False
+    for name, spec in ranges.items():
+        value = config[name]
+        if spec["type"] == "Categorical":
+            if value not in spec["values"]:
+                return False
+        elif not spec["min"] <= value <= spec["max"]:
+            return False
+    return True
+
+
+class RandomSampler:
+    """Independent uniform draws from each range."""
+
+    def __init__(self, ranges, seed=0):
+        self.ranges = ranges
+        self.rng = np.random.default_rng(seed)
+
+    def ask(self):
+        config = {}
+        for name, spec in self.ranges.items():
+            if spec["type"] == "Categorical":
+                config[name] = spec["values"][self.rng.integers(len(spec["values"]))]
+            else:
+                config[name] = _from_unit(spec, self.rng.random())
+        return config
+
+    def tell(self, config, score):
+        pass
+
+
+class TPESampler(RandomSampler):
+    """Tree-structured Parzen Estimator over the unit-scaled ranges, one independent density per parameter."""
+
+    def __init__(self, ranges, seed=0, maximize=True, n_startup=10, gamma=0.25, n_candidates=24):
+        super().__init__(ranges, seed)
+        self.maximize = maximize
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+        self.history = []  # (config, score)
+
+    def tell(self, config, score):
+        self.history.append((config, score))
+
+    def ask(self):
+        if len(self.history) < self.n_startup:
+            return super().ask()
+        ordered = sorted(self.history, key=lambda item: item[1], reverse=self.maximize)
+        n_good = max(1, math.ceil(self.gamma * len(ordered)))
+        good = [config for config, _ in ordered[:n_good]]
+        bad = [config for config, _ in ordered[n_good:]]
+
+        config = {}
+        for name, spec in self.ranges.items():
+            if spec["type"] == "Categorical":
+                config[name] = self._ask_categorical(spec["values"], [c[name] for c in good], [c[name] for c in bad])
+            else:
+                good_u = np.array([_to_unit(spec, c[name]) for c in good])
+                bad_u = np.array([_to_unit(spec, c[name]) for c in bad])
+                candidates = self._sample_parzen(good_u)
+                ratio = np.log(self._parzen_pdf(candidates, good_u)) - np.log(self._parzen_pdf(candidates, bad_u))
+                config[name] = _from_unit(spec, float(candidates[np.argmax(ratio)]))
+        return config
+
+    def _ask_categorical(self, values, good, bad):
+        # Frequencies with a +1 prior, so unseen values keep a chance
+        l = np.array([good.count(v) + 1.0 for v in values])
+        g = np.array([bad.count(v) + 1.0 for v in values])
+        l, g = l / l.sum(), g / g.sum()
+        candidates = self.rng.choice(len(values), size=self.n_candidates, p=l)
+        return values[candidates[np.argmax(l[candidates] / g[candidates])]]
+
+    @staticmethod
+    def _bandwidth(points):
+        if len(points) < 2:
+            return 0.25
+        return max(1.06 * float(np.std(points)) * len(points) ** -0.2, 0.05)
+
+    def _sample_parzen(self, points):
+        # Mixture of a uniform prior and a Gaussian around every observed point, clipped to [0, 1]
+        component = self.rng.integers(0, len(points) + 1, size=self.n_candidates)
+        samples = self.rng.random(self.n_candidates)
+        from_points = component < len(points)
+        centers = points[component[from_points]]
+        samples[from_points] = self.rng.normal(centers, self._bandwidth(points))
+        return np.clip(samples, 0.0, 1.0)
+
+    def _parzen_pdf(self, x, points):
+        weight = 1.0 / (len(points) + 1)
+        density = np.full(len(x), weight)  # uniform prior on [0, 1]
+        if len(points):
+            bandwidth = self._bandwidth(points)
+            z = (x[:, None] - points[None, :]) / bandwidth
+            density += weight * np.exp(-0.5 * z ** 2).sum(axis=1) / (bandwidth * math.sqrt(2 * math.pi))
+        return density
+
+
+# ---------------- Schedulers ----------------
+
+class NoPruning:
+    """Every trial boosts the full number of rounds in one go."""
+
+    def __init__(self, max_rounds):
+        self.max_rounds = max_rounds
+
+    def next_stop(self, trial_id, rounds_done):
+        return self.max_rounds
+
+    def report(self, trial_id, rounds, score):
+        return False
+
+
+class SuccessiveHalving:
+    """Asynchronous successive halving: promote a trial past a rung while it ranks in the top 1/reduction_factor."""
+
+    def __init__(self, min_rounds, max_rounds, reduction_factor=3, maximize=True):
+        self.max_rounds = max_rounds
+        self.reduction_factor = reduction_factor
+        self.maximize = maximize
+        self.rungs = []
+        rung = min_rounds
+        while rung < max_rounds:
+            self.rungs.append(rung)
+            rung *= reduction_factor
+        self.rungs.append(max_rounds)
+        self.recorded = {rung: [] for rung in self.rungs}
+
+    def next_stop(self, trial_id, rounds_done):
+        return next(rung for rung in self.rungs if rung > rounds_done)
+
+    def report(self, trial_id, rounds, score):
+        """Record the score at a rung; True if the trial should keep boosting."""
+        if rounds >= self.max_rounds:
+            return False
+        scores = self.recorded[rounds]
+        scores.append(score)
+        k = max(1, len(scores) // self.reduction_factor)
+        cutoff = sorted(scores, reverse=self.maximize)[k - 1]
+        return score >= cutoff if self.maximize else score <= cutoff
+
+
+class Hyperband:
+    """Successive halving brackets from aggressive (min_rounds) to none (max_rounds), assigned round-robin."""
+
+    def __init__(self, min_rounds, max_rounds, reduction_factor=3, maximize=True):
+        s_max = max(0, int(math.log(max_rounds / min_rounds, reduction_factor) + 1e-9))
+        self.brackets = [
+            SuccessiveHalving(min(min_rounds * reduction_factor ** s, max_rounds), max_rounds, reduction_factor, maximize)
+            for s in range(s_max + 1)
+        ]
+
+    def _bracket(self, trial_id):
+        return self.brackets[trial_id % len(self.brackets)]
+
+    def next_stop(self, trial_id, rounds_done):
+        return self._bracket(trial_id).next_stop(trial_id, rounds_done)
+
+    def report(self, trial_id, rounds, score):
+        return self._bracket(trial_id).report(trial_id, rounds, score)
+
+
+def make_scheduler(name, min_rounds, max_rounds, reduction_factor=3, maximize=True):
+    if name == "successive_halving":
+        return SuccessiveHalving(min_rounds, max_rounds, reduction_factor, maximize)
+    if name == "hyperband":
+        return Hyperband(min_rounds, max_rounds, reduction_factor, maximize)
+    return NoPruning(max_rounds)
+
+
+# ---------------- Workers ----------------
+
+_WORKER_DATA = {}
+
+
+def _init_worker(entry_dir):
+    # Loaded once per worker process, then shared by every trial segment it runs
+    _WORKER_DATA["dtrain"], _WORKER_DATA["dval"], _, _ = load_entry(entry_dir)
+
+
+def train_segment(params, num_rounds, model_raw, eval_name, metric, return_model):
+    """Boost `num_rounds` more rounds on top of `model_raw` (or from scratch); returns the per-round metric."""
+    started = time.perf_counter()
+    evals_result = {}
+    booster = xgb.train(
+        params,
+        _WORKER_DATA["dtrain"],
+        num_boost_round=num_rounds,
+        evals=[(_WORKER_DATA["dval"], eval_name)],
+        evals_result=evals_result,
+        verbose_eval=False,
+        xgb_model=bytearray(model_raw) if model_raw is not None else None,
+    )
+    return {
+        "scores": [float(score) for score in evals_result[eval_name][metric]],
+        "model": bytes(booster.save_raw()) if return_model else None,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# ---------------- Tuning loop ----------------
+
+def trial_params(static_hyperparameters, config, nthread, native):
+    """Booster params and num_round for one configuration, parsed exactly as train_script.py would."""
+    argv = []
+    for name, value in {**static_hyperparameters, **config}.items():
+        argv += [f"--{name}", str(value)]
+    args = parse_args(argv + ["--categorical_mode", "native" if native else "onehot"])
+    return build_params(args, nthread, native), args.num_round
+
+
+def prepare_data(csv_path, cache_dir=DEFAULT_CACHE_DIR, categorical_mode="onehot", validation_fraction=0.2,
+                 holdout_after=None):
+    """
+    Split and encode the training CSV through the DMatrix cache. Returns (entry directory, key); the key
+    fingerprints the data and its preprocessing, and doubles as the trial store's data hash.
+    """
+    key = fingerprint_files([csv_path], categorical_mode=categorical_mode, validation_fraction=validation_fraction,
+                            holdout_after=holdout_after, salt=VALIDATION_SALT)
+    splitter = HashSplitter(validation_fraction, salt=VALIDATION_SALT, holdout_after=holdout_after)
+
+    def build(directory):
+        preprocess_to_cache(directory, read_traffic_csv(csv_path), categorical_mode, splitter)
+
+    return DMatrixCache(cache_dir).get_or_build(key, build), key
+
+
+def tune(entry_dir, config, n_trials=200, sampler="tpe", scheduler="hyperband", workers=None,
+         min_rounds=10, reduction_factor=3, native=False, seed=42, store=None, data_hash=None, warm_start=True):
+    """
+    Run the search; returns every trial as a dict, best first.
+
+    With a `store` (and the `data_hash` of the prepared data), finished trials are recorded, completed
+    configurations are served from it, and earlier trials on the same data warm-start the sampler.
+    """
+    eval_name, metric, maximize = objective_metric(config)
+    static_hyperparameters = config.get("static_hyperparameters", {})
+    ranges = config["hyperparameter_ranges"]
+    workers = workers or os.cpu_count() or 1
+    _, max_rounds = trial_params(static_hyperparameters, {}, 1, native)
+
+    search = TPESampler(ranges, seed, maximize) if sampler == "tpe" else RandomSampler(ranges, seed)
+    pruner = make_scheduler(scheduler, min(min_rounds, max_rounds), max_rounds, reduction_factor, maximize)
+    trials = []
+    pending = {}  # future -> (trial, rounds it stops at)
+
+    run_id = None
+    if store is not None:
+        run_id = store.start_run(data_hash, sampler, scheduler, workers)
+        if warm_start:
+            prior = [(c, score) for c, score in store.history(data_hash, rounds=max_rounds) if in_space(ranges, c)]
+            for prior_config, prior_score in prior:
+                search.tell(prior_config, prior_score)
+            logger.info(f"🔥 Warm-started the {sampler} sampler from {len(prior)} earlier completed trials")
+
+    def finish(trial, key, cached=False):
+        # Pruned scores are measured at a lower budget; only full-budget scores shape the sampler
+        if trial["status"] == "completed":
+            search.tell(trial["hyperparameters"], trial["score"])
+        if store is not None:
+            store.record_trial(run_id, data_hash, key, trial, cached=cached)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(entry_dir,)) as pool:
+
+        def submit(trial, model_raw=None):
+            stop = pruner.next_stop(trial["trial"], trial["rounds"])
+            future = pool.submit(train_segment, trial["params"], stop - trial["rounds"], model_raw,
+                                 eval_name, metric, stop < max_rounds)
+            pending[future] = (trial, stop)
+
+        while len(trials) < n_trials or pending:
+            # Continuations were resubmitted as soon as they were promoted, so new trials only fill idle workers
+            while len(trials) < n_trials and len(pending) < workers:
+                hyperparameters = search.ask()
+                params, _ = trial_params(static_hyperparameters, hyperparameters, 1, native)
+                trial = {"trial": len(trials), "hyperparameters": hyperparameters, "params": params,
+                         "rounds": 0, "curve": [], "seconds": 0.0, "status": "running", "cached": False}
+                trials.append(trial)
+                key = params_key(params, max_rounds)
+                hit = store.lookup(data_hash, key) if store is not None else None
+                if hit is not None:
+                    # Identical configuration already trained on this data: reuse its curve, no worker needed
+                    trial.update(status="completed", cached=True, curve=hit["curve"], rounds=hit["rounds"],
+                                 score=hit["score"])
+                    finish(trial, key, cached=True)
+                    logger.info(f"♻️ Trial {trial['trial']} served from the trial store: "
+                                f"{eval_name}-{metric}={hit['score']:.5f}")
+                    continue
+                trial["key"] = key
+                submit(trial)
+
+            if not pending:
+                continue
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                trial, stop = pending.pop(future)
+                result = future.result()
+                trial["curve"].extend(result["scores"])
+                trial["rounds"] = stop
+                trial["seconds"] += result["seconds"]
+                score = trial["curve"][-1]
+                if pruner.report(trial["trial"], stop, score):
+                    submit(trial, result["model"])
+                    continue
+                trial["status"] = "completed" if stop >= max_rounds else "pruned"
+                trial["score"] = score
+                finish(trial, trial.pop("key"))
+                finished = sum(t["status"] != "running" for t in trials)
+                logger.info(f"{'🏁' if trial['status'] == 'completed' else '✂️'} Trial {trial['trial']} "
+                            f"{trial['status']} at {stop} rounds: {eval_name}-{metric}={score:.5f} "
+                            f"({finished}/{n_trials})")
+
+    if store is not None:
+        store.finish_run(run_id)
+
+    # Completed trials rank ahead of pruned ones: their score is at the full num_round
+    sign = -1 if maximize else 1
+    return sorted(trials, key=lambda t: (t["status"] != "completed", sign * t["score"]))
+
+
+def write_results(trials, config, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    names = list(config["hyperparameter_ranges"])
+    trials_path = os.path.join(output_dir, "trials.csv")
+    with open(trials_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["trial", "status", "cached", "rounds", "score", "seconds"] + names)
+        for t in trials:
+            writer.writerow([t["trial"], t["status"], int(t["cached"]), t["rounds"], t["score"],
+                             round(t["seconds"], 3)] + [t["hyperparameters"][name] for name in names])
+
+    best = trials[0]
+    best_path = os.path.join(output_dir, "best_hyperparameters.json")
+    with open(best_path, "w") as f:
+        json.dump({**config.get("static_hyperparameters", {}), **best["hyperparameters"]}, f, indent=2)
+    logger.info(f"💾 Wrote {trials_path} and {best_path}")
+    return best_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel local hyperparameter search for train_script.py.")
+    parser.add_argument("--csv-path", default="../2_model_training/train.csv")
+    parser.add_argument("--config", default=DEFAULT_CONFIG, help="Search space and objective (shared with the SageMaker tuner).")
+    parser.add_argument("--n-trials", type=int, default=200)
+    parser.add_argument("--sampler", choices=SAMPLERS, default="tpe")
+    parser.add_argument("--scheduler", choices=SCHEDULERS, default="hyperband")
+    parser.add_argument("--workers", type=int, default=None, help="Trials run in parallel (default: one per core).")
+    parser.add_argument("--min-rounds", type=int, default=10, help="First rung of successive halving / Hyperband.")
+    parser.add_argument("--reduction-factor", type=int, default=3)
+    parser.add_argument("--categorical-mode", choices=["onehot", "native"], default="onehot")
+    parser.add_argument("--validation-fraction", type=float, default=0.2)
+    parser.add_argument("--holdout-after", default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default="local_tuning")
+    parser.add_argument("--store", default=DEFAULT_DB, help="SQLite trial store; empty to disable caching and warm start.")
+    parser.add_argument("--no-warm-start", action="store_true", help="Do not seed the sampler with earlier trials.")
+    parser.add_argument("--dmatrix-cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Content-addressed cache of the preprocessed matrices (shared with train_script.py).")
+    args = parser.parse_args()
+
+    tuning_config = load_config(args.config)
+    timings = {}
+    store = TrialStore(args.store) if args.store else None
+    try:
+        with stage_timer("prepare data", timings):
+            entry_dir, data_hash = prepare_data(args.csv_path, args.dmatrix_cache_dir, args.categorical_mode,
+                                                args.validation_fraction, args.holdout_after)
+        with stage_timer("search", timings):
+            results = tune(entry_dir, tuning_config, args.n_trials, args.sampler, args.scheduler,
+                           args.workers, args.min_rounds, args.reduction_factor,
+                           native=args.categorical_mode == "native", seed=args.seed,
+                           store=store, data_hash=data_hash, warm_start=not args.no_warm_start)
+    finally:
+        if store is not None:
+            store.close()
+
+    write_results(results, tuning_config, args.output_dir)
+    rounds_trained = sum(t["rounds"] for t in results if not t["cached"])
+    print(f"{'trial':>5} {'status':<10} {'rounds':>6} {'score':>8}  hyperparameters")
+    for t in results[:10]:
+        print(f"{t['trial']:>5} {t['status']:<10} {t['rounds']:>6} {t['score']:>8.5f}  {json.dumps(t['hyperparameters'])}")
+    cache_hits = sum(t["cached"] for t in results)
+    logger.info(f"✅ {len(results)} trials ({cache_hits} from the trial store), {rounds_trained:,} boosting rounds "
+                f"in {timings['search']:.1f}s")
@@ -0,0 +1,47 @@
+"""
+Search space and objective for hyperparameter tuning, read from config.yaml.
+
+The remote SageMaker tuner (`hyperparameter_tuning_job.py`) and the local engine (`local_tuner.py`)
+both read the same definitions, so the two explore the same ranges and optimise the same metric.
+"""
+
+import os
+
+import yaml
+
+DEFAULT_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+
+
+def load_config(path=DEFAULT_CONFIG):
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    for section in ("objective", "hyperparameter_ranges"):
+        if section not in config:
+            raise ValueError(f"❌ {path} is missing the '{section}' section.")
+    return config
+
+
+def objective_metric(config):
+    """(eval set name, metric name, maximize) from an objective like 'validation:auc'."""
+    objective = config["objective"]
+    eval_name, _, metric = objective["metric"].partition(":")
+    return eval_name, metric, objective.get("type", "Maximize") == "Maximize"
+
+
+def sagemaker_ranges(config):
+    """The ranges as sagemaker.tuner parameter objects."""
+    from sagemaker.tuner import CategoricalParameter, ContinuousParameter, IntegerParameter
+
+    ranges = {}
+    for name, spec in config["hyperparameter_ranges"].items():
+        kind = spec["type"]
+        scaling = spec.get("scaling", "Auto")
+        if kind == "Integer":
+            ranges[name] = IntegerParameter(spec["min"], spec["max"], scaling_type=scaling)
+        elif kind == "Continuous":
+            ranges[name] = ContinuousParameter(spec["min"], spec["max"], scaling_type=scaling)
+        elif kind == "Categorical":
+            ranges[name] = CategoricalParameter(spec["values"])
+        else:
+            raise ValueError(f"❌ Unknown range type '{kind}' for {name}")
+    return ranges
@@ -1,17 +1,49 @@
 """
 s3://sagemaker-traffic-prediction-bucket/traffic-pipeline/train/train.csv
 - Remove columns: write_time, api_invocation_time, is_deleted
-- One-hot encode weather_condition
+- One-hot encode weather_condition with a fitted FeatureTransformer (common/feature_transform.py),
+  saved to the model directory as transformer.json next to the model
+- --categorical_mode native keeps weather_condition as one categorical column and uses
+  XGBoost's native categorical splits (tree_method=hist) instead of one-hot columns
+- The train channel may be CSV, Parquet or an encoded XGBoost binary DMatrix (--train_format),
+  or a CSV streamed through a Pipe-mode FIFO (see common/channel_io.py). A Pipe-mode channel is
+  fed chunk by chunk into QuantileDMatrix (or an external-memory DMatrix) while it downloads,
+  and is never loaded as one DataFrame
+- --data_mode quantile|external trains out of core from sharded channel files through an
+  xgb.DataIter (see external_memory.py) instead of loading one DataFrame
+- --dmatrix_cache_dir keeps the preprocessed train/validation matrices in a content-addressed cache
+  (common/dmatrix_cache.py), so repeated runs on the same data (tuning trials) skip load and preprocessing
+- Boosting is checkpointed to /opt/ml/checkpoints every --checkpoint_interval rounds and resumes from the
+  newest checkpoint after a spot interruption (see checkpointing.py); --early_stopping_rounds stops once
+  validation AUC stops improving and keeps the best iteration
+- Paths follow the SageMaker container contract (SM_CHANNEL_TRAIN, SM_MODEL_DIR, SM_OUTPUT_DATA_DIR),
+  so local_runner.py can run the script against a local /opt/ml tree; stage timings are written to
+  timings.json in the output data directory
 """
 import argparse
+import json
 import os
+import shutil
+import sys
+import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import train_test_split
 import traceback
 import boto3
 import logging
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import TRANSFORMER_FILENAME, FeatureTransformer
+from common.hash_split import VALIDATION_SALT, HashSplitter
+from common.schema import FEATURE_COLUMNS, memory_report
+from common.waiters import stage_timer
+from common.channel_io import CHANNEL_FORMATS, channel_dir, channel_files, input_mode, load_channel
+from common.dmatrix_cache import DMatrixCache, fingerprint_files, load_entry, save_entry
+from external_memory import (DATA_MODES, ValidationCsvWriter, build_matrices, build_pipe_matrices,
+                             fit_transformer_on_first_chunk, list_shards)
+from checkpointing import (CheckpointCallback, ResumableEarlyStopping, default_checkpoint_dir, finished_checkpoint,
+                           latest_checkpoint, truncate_to_best)
+
 # ---------------- Setup Logger ----------------
 logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s",
@@ -20,83 +52,311 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ---------------- Preprocessing ----------------
-def preprocess(df):
-    """Preprocess the input DataFrame for training."""
+def preprocess(df, categorical_mode="onehot", splitter=None):
+    """Split the raw DataFrame and encode both parts with a transformer fitted on the training part."""
     logger.info("🔄 Starting preprocessing...")
 
-    # One-hot encode 'weather_condition'
-    df = pd.get_dummies(df, columns=["weather_condition"], drop_first=True)
+    # Deterministic split by sensor_id + timestamp hash: stable across runs and data refreshes
+    splitter = splitter or HashSplitter(salt=VALIDATION_SALT)
+    train_df, val_df = splitter.split(df)
+    X_train_raw, X_val_raw = train_df[FEATURE_COLUMNS], val_df[FEATURE_COLUMNS]
+    y_train, y_val = train_df["incident"], val_df["incident"]
+
+    # Encode 'weather_condition' (one-hot or native category codes) with a frozen vocabulary and column order
+    transformer = FeatureTransformer(encoding=categorical_mode).fit(X_train_raw)
+    X_train = transformer.transform(X_train_raw)
+    X_val = transformer.transform(X_val_raw)
+
+    logger.info("✅ Finished preprocessing. Data shape: %s", X_train.shape)
+    return X_train, X_val, y_train, y_val, X_val_raw, transformer
+
+
+def validation_frame(y_val, X_val_raw):
+    """Label + raw features of the validation rows, the layout of validation.csv."""
+    return pd.concat([y_val.reset_index(drop=True), X_val_raw.reset_index(drop=True)], axis=1)
+
+
+def preprocess_to_cache(directory, df, categorical_mode="onehot", splitter=None):
+    """Preprocess `df` and write the result as a DMatrix cache entry (see common/dmatrix_cache.py)."""
+    X_train, X_val, y_train, y_val, X_val_raw, transformer = preprocess(df, categorical_mode, splitter)
+    save_entry(directory, X_train, y_train, X_val, y_val, transformer, validation_frame(y_val, X_val_raw))
+
 
-    # Separate target
-    y = df["incident"]
+def cached_matrices(args, splitter, timings):
+    """Cache entry directory for the train channel, built on a miss; None when the channel can't be cached."""
+    if input_mode("train") == "Pipe":
+        return None  # A FIFO can only be read once, so there is nothing to hash up front
+    fmt, paths = channel_files("train", args.train_format)
+    if fmt == "dmatrix":
+        return None  # Already encoded
+    key = fingerprint_files(paths, categorical_mode=args.categorical_mode, validation_fraction=args.validation_fraction,
+                            holdout_after=args.holdout_after, salt=VALIDATION_SALT)
 
-    # Drop irrelevant timestamp-related columns and the target
-    drop_columns = ["timestamp", "write_time", "api_invocation_time", "is_deleted", "incident"]
-    X = df.drop(columns=drop_columns, errors="ignore")
+    def build(directory):
+        _, df = load_channel("train", fmt)
+        preprocess_to_cache(directory, df, args.categorical_mode, splitter)
 
-    logger.info("✅ Finished preprocessing. Data shape: %s", X.shape)
-    return train_test_split(X, y, test_size=0.2, random_state=42)
+    with stage_timer("dmatrix cache", timings):
+        return DMatrixCache(args.dmatrix_cache_dir).get_or_build(key, build)
+
+
+def split_dmatrix(dmatrix, test_size=0.2, seed=42):
+    """
+    Train/validation split of an already encoded binary DMatrix by row slicing. The buffer carries no
+    sensor_id/timestamp keys, so this one is a seeded random split rather than the hash split.
+    """
+    order = np.random.default_rng(seed).permutation(dmatrix.num_row())
+    n_val = int(round(dmatrix.num_row() * test_size))
+    return dmatrix.slice(np.sort(order[n_val:])), dmatrix.slice(np.sort(order[:n_val]))
 
 # ---------------- Main Training ----------------
-if __name__ == "__main__":
-    try:
-        parser = argparse.ArgumentParser()
-        parser.add_argument("--num_round", type=int, default=100)
-        parser.add_argument("--eta", type=float, default=0.3)
-        parser.add_argument("--gamma", type=float, default=0)
-        parser.add_argument("--max_depth", type=int, default=6)
-        parser.add_argument("--min_child_weight", type=int, default=1)
-        parser.add_argument("--subsample", type=float, default=1.0)
-        parser.add_argument("--objective", type=str, default="binary:logistic")
-        parser.add_argument("--eval_metric", type=str, default="auc")
-        args = parser.parse_args()
-
-        logger.info("🚀 Starting training job...")
-        input_dir = "/opt/ml/input/data/train"
-        input_file = os.path.join(input_dir, "train.csv")
-        df = pd.read_csv(input_file, header=0)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_round", type=int, default=100)
+    parser.add_argument("--eta", type=float, default=0.3)
+    parser.add_argument("--gamma", type=float, default=0)
+    parser.add_argument("--max_depth", type=int, default=6)
+    parser.add_argument("--min_child_weight", type=int, default=1)
+    parser.add_argument("--subsample", type=float, default=1.0)
+    parser.add_argument("--objective", type=str, default="binary:logistic")
+    parser.add_argument("--eval_metric", type=str, default="auc")
+    parser.add_argument("--tree_method", type=str, default="hist")
+    parser.add_argument("--nthread", type=int, default=0, help="XGBoost threads; 0 uses every core of the instance.")
+    parser.add_argument("--categorical_mode", type=str, default="onehot", choices=["onehot", "native"])
+    parser.add_argument("--train_format", type=str, default="auto", choices=CHANNEL_FORMATS)
+    parser.add_argument("--data_mode", type=str, default="inmemory", choices=DATA_MODES)
+    parser.add_argument("--chunk_rows", type=int, default=100_000)
+    parser.add_argument("--validation_fraction", type=float, default=0.2)
+    parser.add_argument("--holdout_after", type=str, default=None,
+                        help="Rows at or after this event time always go to validation.")
+    parser.add_argument("--early_stopping_rounds", type=int, default=0,
+                        help="Stop after this many rounds without validation improvement; 0 disables it.")
+    parser.add_argument("--checkpoint_dir", type=str, default=default_checkpoint_dir(),
+                        help="Checkpoints for resuming interrupted (spot) training; empty disables them.")
+    parser.add_argument("--checkpoint_interval", type=int, default=10, help="Boosting rounds between checkpoints.")
+    parser.add_argument("--dmatrix_cache_dir", type=str, default="",
+                        help="Content-addressed cache of the preprocessed matrices; empty disables it.")
+    parser.add_argument("--validation_s3_uri", type=str,
+                        default="s3://sagemaker-traffic-prediction-bucket/traffic-pipeline/validation",
+                        help="Where validation.csv and transformer.json are uploaded; empty to skip the upload.")
+    return parser.parse_args(argv)
+
+
+def build_params(args, nthread, native=False):
+    """XGBoost booster params from the parsed hyperparameters (shared with local_tuner.py)."""
+    params = {
+        "objective": args.objective,
+        "eval_metric": args.eval_metric,
+        "eta": args.eta,
+        "gamma": args.gamma,
+        "max_depth": args.max_depth,
+        "min_child_weight": args.min_child_weight,
+        "subsample": args.subsample,
+        "tree_method": args.tree_method,
+        "nthread": nthread,
+    }
+    if (native or args.data_mode != "inmemory") and args.tree_method != "hist":
+        # Native categorical splits and iterator-built matrices need the histogram tree method
+        logger.warning("⚠️ tree_method=%s is not supported here; using hist.", args.tree_method)
+        params["tree_method"] = "hist"
+    return params
+
+
+def upload_validation(validation_s3_uri, paths):
+    bucket, _, prefix = validation_s3_uri.replace("s3://", "", 1).partition("/")
+    s3 = boto3.client("s3")
+    for path in paths:
+        key = f"{prefix.rstrip('/')}/{os.path.basename(path)}"
+        s3.upload_file(path, bucket, key)
+        logger.info("☁️ Uploaded %s to s3://%s/%s", os.path.basename(path), bucket, key)
 
+
+def persist_validation(args, model_dir, val_output_path):
+    """
+    Upload this run's validation.csv and transformer.json, whichever way the data was loaded.
+
+    validate_model_from_csv.py and predictor_test.py read both from --validation_s3_uri. With no
+    validation.csv (`val_output_path` None) the stale copy of an earlier run is deleted, so those scripts
+    fail instead of scoring this model on another run's split.
+    """
+    if not args.validation_s3_uri:
+        return
+    transformer_path = os.path.join(model_dir, TRANSFORMER_FILENAME)
+    if val_output_path is None:
+        bucket, _, prefix = args.validation_s3_uri.replace("s3://", "", 1).partition("/")
+        key = f"{prefix.rstrip('/')}/validation.csv"
+        boto3.client("s3").delete_object(Bucket=bucket, Key=key)
+        logger.warning("⚠️ No raw validation rows in this run; deleted the stale s3://%s/%s", bucket, key)
+        upload_validation(args.validation_s3_uri, [transformer_path])
+    else:
+        upload_validation(args.validation_s3_uri, [val_output_path, transformer_path])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logger.info("🚀 Starting training job...")
+    model_dir = os.environ.get("SM_MODEL_DIR", "/opt/ml/model")
+    output_data_dir = os.environ.get("SM_OUTPUT_DATA_DIR", "/opt/ml/output/data")
+    nthread = args.nthread or int(os.environ.get("SM_NUM_CPUS", os.cpu_count() or 1))
+    splitter = HashSplitter(args.validation_fraction, salt=VALIDATION_SALT, holdout_after=args.holdout_after)
+    timings = {}
+
+    val_output_path = os.path.join(output_data_dir, "validation.csv")
+
+    kind, data = None, None
+    if input_mode("train") == "Pipe":
+        if args.data_mode == "inmemory":
+            # A FIFO is consumed as it arrives: the matrices are built from the stream, not from a DataFrame
+            logger.info("🚰 Pipe mode: building the matrices from the stream (data_mode=quantile)")
+            args.data_mode = "quantile"
+        kind, data = load_channel("train", args.train_format)
+    elif args.data_mode != "inmemory":
+        # Out of core: shards are read chunk by chunk and never held as one DataFrame
+        kind, data = "shards", list_shards(channel_dir("train"))
+    elif args.dmatrix_cache_dir:
+        entry = cached_matrices(args, splitter, timings)
+        if entry is not None:
+            kind, data = "cached", entry
+    if kind is None:
+        with stage_timer("load", timings):
+            kind, data = load_channel("train", args.train_format)
+
+    if kind == "pipe":
+        validation_dir = channel_dir("validation")
+        validation_shards = list_shards(validation_dir) if os.path.isdir(validation_dir) else None
+        validation_csv = ValidationCsvWriter(val_output_path)
+        with stage_timer("dmatrix build", timings):
+            # Fitted on the first chunk of the stream, before anything is encoded
+            transformer = FeatureTransformer(encoding=args.categorical_mode)
+            dtrain, dval = build_pipe_matrices(transformer, args.data_mode, data, args.chunk_rows, validation_shards,
+                                               splitter=splitter, validation_sink=validation_csv)
+        transformer.save(os.path.join(model_dir, TRANSFORMER_FILENAME))
+        persist_validation(args, model_dir, validation_csv.close())
+        native = args.categorical_mode == "native"
+    elif kind == "shards":
+        validation_dir = channel_dir("validation")
+        validation_shards = list_shards(validation_dir) if os.path.isdir(validation_dir) else None
+        validation_csv = ValidationCsvWriter(val_output_path)
+        with stage_timer("dmatrix build", timings):
+            transformer = fit_transformer_on_first_chunk(
+                data, FeatureTransformer(encoding=args.categorical_mode), args.chunk_rows
+            )
+            transformer.save(os.path.join(model_dir, TRANSFORMER_FILENAME))
+            dtrain, dval = build_matrices(data, transformer, args.data_mode, args.chunk_rows, validation_shards,
+                                          splitter=splitter, validation_sink=validation_csv)
+        persist_validation(args, model_dir, validation_csv.close())
+        native = args.categorical_mode == "native"
+    elif kind == "dmatrix":
+        # Already encoded: no text parsing, no transform; reuse the transformer it was encoded with
+        if args.holdout_after:
+            raise ValueError("❌ --holdout_after needs event times, which a binary DMatrix channel doesn't carry.")
+        dmatrix, transformer_path = data
+        transformer = FeatureTransformer.load(transformer_path)
+        shutil.copy(transformer_path, os.path.join(model_dir, TRANSFORMER_FILENAME))
+        logger.info("📄 Loaded binary DMatrix: %d rows x %d features", dmatrix.num_row(), dmatrix.num_col())
+        with stage_timer("dmatrix build", timings):
+            dtrain, dval = split_dmatrix(dmatrix, args.validation_fraction)
+        # Encoded rows only: there is no raw validation.csv to write
+        persist_validation(args, model_dir, None)
+        native = transformer.encoding == "native"
+    elif kind == "cached":
+        # Preprocessed by an earlier run on the same data: load the binary matrices as they are
+        with stage_timer("dmatrix build", timings):
+            dtrain, dval, transformer_path, cached_validation_path = load_entry(data)
+        transformer = FeatureTransformer.load(transformer_path)
+        shutil.copy(transformer_path, os.path.join(model_dir, TRANSFORMER_FILENAME))
+        shutil.copy(cached_validation_path, val_output_path)
+        logger.info("📄 Loaded cached matrices: %d train / %d validation rows", dtrain.num_row(), dval.num_row())
+        persist_validation(args, model_dir, val_output_path)
+        native = transformer.encoding == "native"
+    else:
+        df = data
         logger.info("📄 Loaded training data: %d rows", len(df))
+        memory_report(df, "load", logger)
 
         # Preprocess
-        X_train, X_val, y_train, y_val = preprocess(df)
+        with stage_timer("preprocess", timings):
+            X_train, X_val, y_train, y_val, X_val_raw, transformer = preprocess(df, args.categorical_mode, splitter)
+        memory_report(X_train, "preprocess (train features)", logger)
 
-        # Save validation set to S3
-        val_df = pd.concat([y_val.reset_index(drop=True), X_val.reset_index(drop=True)], axis=1)
-        val_output_path = "/opt/ml/output/data/validation.csv"
+        # Save validation set (label + raw features) and the fitted transformer
+        val_df = validation_frame(y_val, X_val_raw)
         val_df.to_csv(val_output_path, index=False)
         logger.info("💾 Saved validation set to %s", val_output_path)
 
-        bucket = "sagemaker-traffic-prediction-bucket"
-        key = "traffic-pipeline/validation/validation.csv"
-        s3 = boto3.client("s3")
-        s3.upload_file(val_output_path, bucket, key)
-        logger.info("☁️ Uploaded validation.csv to s3://%s/%s", bucket, key)
+        transformer_path = os.path.join(model_dir, TRANSFORMER_FILENAME)
+        transformer.save(transformer_path)
+        logger.info("💾 Saved feature transformer to %s", transformer_path)
+
+        persist_validation(args, model_dir, val_output_path)
 
         # Train model
-        dtrain = xgb.DMatrix(X_train, label=y_train)
-        dval = xgb.DMatrix(X_val, label=y_val)
-        params = {
-            "objective": args.objective,
-            "eval_metric": args.eval_metric,
-            "eta": args.eta,
-            "gamma": args.gamma,
-            "max_depth": args.max_depth,
-            "min_child_weight": args.min_child_weight,
-            "subsample": args.subsample,
-        }
-
-        logger.info("⚙️ XGBoost training params: %s", params)
-        xgb.train(
-            params=params,
-            dtrain=dtrain,
-            num_boost_round=args.num_round,
-            evals=[(dval, "validation")],
-            verbose_eval=True
-        )
-
-        logger.info("✅ Training completed successfully.")
+        # Feature names stay in transformer.json; the model itself takes positional float32 columns
+        native = args.categorical_mode == "native"
+        dmatrix_kwargs = {"feature_types": transformer.feature_types, "enable_categorical": True} if native else {}
+        with stage_timer("dmatrix build", timings):
+            dtrain = xgb.DMatrix(X_train, label=y_train, nthread=nthread, **dmatrix_kwargs)
+            dval = xgb.DMatrix(X_val, label=y_val, nthread=nthread, **dmatrix_kwargs)
 
+    params = build_params(args, nthread, native)
+    logger.info("⚙️ XGBoost training params: %s", params)
+
+    # Resume from the newest checkpoint restored by SageMaker after a spot interruption
+    resume_from, rounds_done, finished = None, 0, False
+    callbacks = []
+    if args.early_stopping_rounds:
+        # save_best keeps only the trees up to the best validation round in the returned booster.
+        # First in the list, so each checkpoint carries the best round and score as of the round it was
+        # taken at, and a resumed run picks up the same best score and remaining patience.
+        callbacks.append(ResumableEarlyStopping(rounds=args.early_stopping_rounds, data_name="validation",
+                                                save_best=True))
+    if args.checkpoint_dir:
+        checkpoint = latest_checkpoint(args.checkpoint_dir)
+        if checkpoint is not None:
+            rounds_done, resume_from = checkpoint
+            finished = finished_checkpoint(xgb.Booster(model_file=resume_from), args.num_round)
+            logger.info("♻️ Resuming from %s (%d of %d rounds done%s)", resume_from, rounds_done, args.num_round,
+                        ", training already finished" if finished else "")
+        callbacks.append(CheckpointCallback(args.checkpoint_dir, args.checkpoint_interval))
+
+    remaining_rounds = 0 if finished else max(args.num_round - rounds_done, 0)
+    with stage_timer("boosting", timings):
+        if remaining_rounds == 0:
+            # Interrupted after the last round or after early stopping fired: the checkpoint holds every
+            # boosted tree, so apply the cut save_best would have made
+            booster = xgb.Booster(params, model_file=resume_from)
+            if args.early_stopping_rounds:
+                booster = truncate_to_best(booster)
+        else:
+            booster = xgb.train(
+                params=params,
+                dtrain=dtrain,
+                num_boost_round=remaining_rounds,
+                evals=[(dval, "validation")],
+                verbose_eval=True,
+                xgb_model=resume_from,
+                callbacks=callbacks,
+            )
+    if args.early_stopping_rounds:
+        logger.info("🛑 Kept %d boosted rounds (best validation round: %s)",
+                    booster.num_boosted_rounds(), booster.attr("best_iteration"))
+
+    # The serving container loads xgboost-model; transformer.json travels in the same model.tar.gz
+    model_path = os.path.join(model_dir, "xgboost-model")
+    with stage_timer("save model", timings):
+        booster.save_model(model_path)
+    logger.info("💾 Saved model to %s", model_path)
+
+    with open(os.path.join(output_data_dir, "timings.json"), "w") as f:
+        json.dump(timings, f, indent=2)
+    logger.info("⏱️ Stage timings: " + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items()))
+    logger.info("✅ Training completed successfully.")
+    return booster, timings
+
+
+if __name__ == "__main__":
+    try:
+        main()
     except Exception as e:
         logger.exception("❌ Exception occurred during training:")
         raise
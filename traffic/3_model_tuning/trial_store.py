@@ -0,0 +1,208 @@
+"""
+Persistent SQLite store of local tuning trials, shared across local_tuner.py runs.
+
+Every trial is recorded with:
+- its hyperparameters and the full booster params
+- the dataset fingerprint
+- the per-round validation metric curve
+- its status (completed / pruned) and wall time
+
+Trials are keyed by `params_key`: a hash of the canonical booster params plus num_round. Two uses:
+- cache: a completed trial with the same (params_key, data_hash) is returned instead of being
+  trained again; cache hits are recorded too (`cached=1`)
+- warm start: every earlier trial on the same data seeds the sampler, so TPE starts from the
+  good regions already found instead of from random trials
+
+The dataset fingerprint is the DMatrix cache key of the prepared data (`common.dmatrix_cache.fingerprint_files`).
+It hashes the training CSV bytes together with everything that changes the encoded matrices:
+categorical mode, validation fraction, holdout cut-off and split salt.
+
+    python trial_store.py --db local_tuning/trials.sqlite
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB = os.path.join("local_tuning", "trials.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_hash TEXT NOT NULL,
+    sampler TEXT,
+    scheduler TEXT,
+    workers INTEGER,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    data_hash TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    hyperparameters TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    rounds INTEGER NOT NULL,
+    score REAL,
+    curve TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trials_lookup ON trials (data_hash, params_key, status);
+"""
+
+
+def params_key(params, num_round):
+    """Identity of a trial's training configuration; thread count does not change the model."""
+    canonical = {k: v for k, v in params.items() if k != "nthread"}
+    canonical["num_round"] = num_round
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class TrialStore:
+    """SQLite-backed record of tuning runs and trials. Written from the tuner's parent process only."""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------- Runs ----------------
+
+    def start_run(self, data_hash, sampler=None, scheduler=None, workers=None):
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (data_hash, sampler, scheduler, workers, started_at) VALUES (?, ?, ?, ?, ?)",
+                (data_hash, sampler, scheduler, workers, time.time()),
+            )
+        return cursor.lastrowid
+
+    def finish_run(self, run_id):
+        with self.conn:
+            self.conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    # ---------------- Trials ----------------
+
+    def record_trial(self, run_id, data_hash, key, trial, cached=False):
+        """Store one finished trial dict as produced by local_tuner.tune()."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO trials (run_id, data_hash, params_key, hyperparameters, params, status, rounds, score,"
+                " curve, seconds, cached, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, data_hash, key, json.dumps(trial["hyperparameters"]), json.dumps(trial["params"]),
+                 trial["status"], trial["rounds"], trial["score"], json.dumps(trial["curve"]),
+                 0.0 if cached else trial["seconds"], int(cached), time.time()),
+            )
+
+    def lookup(self, data_hash, key):
+        """The earliest trained, completed trial for this configuration and data, or None."""
+        row = self.conn.execute(
+            "SELECT * FROM trials WHERE data_hash = ? AND params_key = ? AND status = 'completed' AND cached = 0"
+            " ORDER BY id LIMIT 1",
+            (data_hash, key),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"hyperparameters": json.loads(row["hyperparameters"]), "curve": json.loads(row["curve"]),
+                "rounds": row["rounds"], "score": row["score"], "seconds": row["seconds"]}
+
+    def history(self, data_hash, rounds=None):
+        """
+        (hyperparameters, score) of every trained, completed trial on this data, oldest first, for warm-starting.
+
+        Pruned trials are left out: their scores are at a smaller budget. With `rounds`, so are trials
+        completed at another num_round.
+        """
+        query = ("SELECT hyperparameters, score FROM trials WHERE data_hash = ? AND cached = 0 AND status = 'completed'"
+                 " AND score IS NOT NULL")
+        parameters = [data_hash]
+        if rounds is not None:
+            query += " AND rounds = ?"
+            parameters.append(rounds)
+        rows = self.conn.execute(query + " ORDER BY id", parameters).fetchall()
+        return [(json.loads(row["hyperparameters"]), row["score"]) for row in rows]
+
+    # ---------------- Reporting ----------------
+
+    def report(self, limit=20):
+        """Per-run throughput and cache hit rate, newest run first."""
+        rows = self.conn.execute(
+            """
+            SELECT r.run_id, r.data_hash, r.sampler, r.scheduler, r.workers, r.started_at, r.finished_at,
+                   COUNT(t.id) AS trials,
+                   COALESCE(SUM(t.cached), 0) AS cache_hits,
+                   COALESCE(SUM(CASE WHEN t.status = 'pruned' THEN 1 ELSE 0 END), 0) AS pruned,
+                   COALESCE(SUM(CASE WHEN t.cached = 0 THEN t.rounds ELSE 0 END), 0) AS rounds_trained,
+                   COALESCE(SUM(t.seconds), 0) AS trial_seconds,
+                   MAX(t.score) AS best_score
+            FROM runs r LEFT JOIN trials t ON t.run_id = r.run_id
+            GROUP BY r.run_id ORDER BY r.run_id DESC LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        report = []
+        for row in rows:
+            wall = (row["finished_at"] or time.time()) - row["started_at"]
+            report.append({
+                "run_id": row["run_id"],
+                "data_hash": row["data_hash"][:12],
+                "sampler": row["sampler"],
+                "scheduler": row["scheduler"],
+                "workers": row["workers"],
+                "trials": row["trials"],
+                "cache_hits": row["cache_hits"],
+                "cache_hit_rate": row["cache_hits"] / row["trials"] if row["trials"] else 0.0,
+                "pruned": row["pruned"],
+                "rounds_trained": row["rounds_trained"],
+                "wall_s": wall,
+                "trials_per_min": 60 * row["trials"] / wall if wall > 0 else 0.0,
+                "trial_seconds": row["trial_seconds"],
+                "best_score": row["best_score"],
+            })
+        return report
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Report throughput and cache hit rate of local tuning runs.")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--runs", type=int, default=20, help="Number of most recent runs to show.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"❌ No trial store at {args.db}")
+    with TrialStore(args.db) as store:
+        runs = store.report(args.runs)
+
+    if args.json:
+        print(json.dumps(runs, indent=2))
+    else:
+        print(f"{'run':>4} {'data':<12} {'sampler':<7} {'scheduler':<18} {'trials':>6} {'hits':>5} {'hit %':>6} "
+              f"{'pruned':>6} {'rounds':>8} {'wall s':>8} {'trials/min':>10} {'best':>8}")
+        for r in runs:
+            best = f"{r['best_score']:.5f}" if r["best_score"] is not None else "-"
+            print(f"{r['run_id']:>4} {r['data_hash']:<12} {r['sampler'] or '-':<7} {r['scheduler'] or '-':<18} "
+                  f"{r['trials']:>6} {r['cache_hits']:>5} {100 * r['cache_hit_rate']:>5.1f}% {r['pruned']:>6} "
+                  f"{r['rounds_trained']:>8,} {r['wall_s']:>8.1f} {r['trials_per_min']:>10.1f} {best:>8}")
@@ -0,0 +1,233 @@
+"""
+Offline batch scoring of large CSV/Parquet files with the model artifact; a local Batch Transform.
+
+Scoring a historical file used to mean posting it to the endpoint. This reads model.tar.gz (local,
+s3:// or an extracted directory) and scores the input itself:
+
+1. The input is streamed in chunks of `--chunk-rows`: CSV through `read_traffic_csv`, Parquet as
+   record batches. Only the feature columns and the columns to keep are read.
+2. Chunks are fanned out to a process pool. Each worker loads the booster and transformer.json once
+   and encodes its chunk with that transformer, so the features match training. It then predicts with
+   `inference.predict_fn` (`inplace_predict`), using `--threads-per-worker` XGBoost threads.
+3. Scored chunks are appended to one Parquet file as row groups. Each row group holds the kept
+   columns, `--id-column` (or `row`, the input row number) and `prediction`.
+
+Memory is bounded: at most `2 * --workers` chunks are in flight, and the writer never holds more than
+those. By default the output is in input order, like Batch Transform with `AssembleWith=Line`. With
+`--unordered`, chunks are written as they finish and the output is joined back to the input by
+`--id-column`. That keeps the pool busy when chunk times vary.
+
+    python batch_score.py --model model.tar.gz --input /data/history/ --output /tmp/scored.parquet \\
+        --id-column sensor_id --keep-columns timestamp incident --workers 8
+"""
+
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from inference import model_fn, predict_fn
+from local_server import extract_artifact
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import TRANSFORMER_FILENAME, FeatureTransformer
+from common.schema import cast_traffic_dtypes, read_traffic_csv
+
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = ("auto", "csv", "parquet")
+_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet"}
+PREDICTION_COLUMN = "prediction"
+ROW_COLUMN = "row"
+
+
+# ---------------- Input ----------------
+
+def input_files(paths, fmt="auto"):
+    """(format, sorted files) for files, directories (searched recursively) and glob patterns."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            extensions = _EXTENSIONS.values() if fmt == "auto" else [_EXTENSIONS[fmt]]
+            for extension in extensions:
+                files += glob.glob(os.path.join(path, "**", f"*{extension}"), recursive=True)
+        else:
+            files += glob.glob(path) or [path]
+    files = sorted(set(files))
+    if not files:
+        raise FileNotFoundError(f"❌ No input files found in {paths}")
+    formats = {fmt} if fmt != "auto" else {
+        "parquet" if f.endswith(_EXTENSIONS["parquet"]) else "csv" for f in files
+    }
+    if len(formats) != 1:
+        raise ValueError("❌ Input mixes CSV and Parquet files; score them separately or pass --input-format.")
+    return formats.pop(), files
+
+
+def iter_chunks(files, fmt, columns, chunk_rows):
+    """Yield chunks of `columns`: DataFrames for CSV, Arrow record batches for Parquet (decoded in the worker)."""
+    for path in files:
+        if fmt == "csv":
+            with read_traffic_csv(path, usecols=columns, chunksize=chunk_rows) as reader:
+                yield from reader
+        else:
+            yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns)
+
+
+# ---------------- Workers ----------------
+
+_WORKER_STATE = {}
+
+
+def _init_worker(model_dir, transformer_path, threads):
+    # Loaded once per worker process, then used for every chunk it scores
+    model = model_fn(model_dir)
+    if transformer_path:
+        model.transformer = FeatureTransformer.load(transformer_path)
+    model.booster.set_param({"nthread": threads})
+    _WORKER_STATE["model"] = model
+    _WORKER_STATE["buffer"] = None
+
+
+def score_chunk(start_row, chunk, keep_columns, id_column):
+    """Encode and predict one chunk; returns the output row group as an Arrow table."""
+    model = _WORKER_STATE["model"]
+    transformer = model.transformer
+    if not isinstance(chunk, pd.DataFrame):
+        chunk = cast_traffic_dtypes(chunk.to_pandas())
+    n_rows = len(chunk)
+
+    buffer = _WORKER_STATE["buffer"]
+    if buffer is None or buffer.shape[0] < n_rows:
+        buffer = _WORKER_STATE["buffer"] = np.empty((n_rows, transformer.n_features), dtype=np.float32)
+    predictions = predict_fn(transformer.transform(chunk, out=buffer), model)
+
+    output = {column: chunk[column] for column in keep_columns}
+    if id_column is None:
+        output = {ROW_COLUMN: np.arange(start_row, start_row + n_rows, dtype=np.int64), **output}
+    output[PREDICTION_COLUMN] = np.asarray(predictions, dtype=np.float32)
+    return pa.Table.from_pandas(pd.DataFrame(output, copy=False), preserve_index=False)
+
+
+# ---------------- Pipeline ----------------
+
+def score(model_dir, files, fmt, output_path, transformer_path=None, id_column=None, keep_columns=(),
+          chunk_rows=200_000, workers=None, threads_per_worker=1, ordered=True):
+    """Score every file into one Parquet file at `output_path`; returns the run summary."""
+    if not ordered and id_column is None:
+        raise ValueError("❌ --unordered output can only be joined back by --id-column.")
+    # The transformer saved with the model is the one training encoded with
+    transformer_path = transformer_path or os.path.join(model_dir, TRANSFORMER_FILENAME)
+    if not os.path.exists(transformer_path):
+        raise FileNotFoundError(f"❌ No {TRANSFORMER_FILENAME} in the model artifact; pass --transformer "
+                                "with the one used in training.")
+    transformer = FeatureTransformer.load(transformer_path)
+
+    keep_columns = [c for c in dict.fromkeys([id_column, *keep_columns]) if c is not None]
+    columns = list(dict.fromkeys(transformer.input_columns + keep_columns))
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    max_in_flight = 2 * workers
+
+    started = time.perf_counter()
+    rows = row_groups = 0
+    writer = None
+    tmp_path = f"{output_path}.tmp"
+
+    def write(table):
+        nonlocal writer, rows, row_groups
+        if writer is None:
+            writer = pq.ParquetWriter(tmp_path, table.schema)
+        writer.write_table(table)
+        rows += table.num_rows
+        row_groups += 1
+        if row_groups % 10 == 0:
+            elapsed = time.perf_counter() - started
+            logger.info(f"⏳ {rows:,} rows scored ({rows / elapsed * 60:,.0f} rows/min)")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    try:
+        # spawn: workers start with no OpenMP state inherited from the parent
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(model_dir, transformer_path, threads_per_worker)) as pool:
+            pending = deque()
+            next_row = 0
+            for chunk in iter_chunks(files, fmt, columns, chunk_rows):
+                pending.append(pool.submit(score_chunk, next_row, chunk, keep_columns, id_column))
+                next_row += len(chunk) if isinstance(chunk, pd.DataFrame) else chunk.num_rows
+                while len(pending) >= max_in_flight:
+                    if ordered:
+                        write(pending.popleft().result())
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pending.remove(future)
+                            write(future.result())
+            while pending:
+                write(pending.popleft().result())
+        if writer is None:
+            raise ValueError(f"❌ No rows read from {files}")
+        writer.close()
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        # No partial output file: a failed run leaves nothing that looks scored
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "row_groups": row_groups,
+        "files": len(files),
+        "elapsed_s": elapsed,
+        "rows_per_min": rows / elapsed * 60 if elapsed else None,
+        "workers": workers,
+        "threads_per_worker": threads_per_worker,
+        "ordered": ordered,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Score CSV/Parquet files offline with model.tar.gz into Parquet.")
+    parser.add_argument("--model", required=True, help="model.tar.gz (local path or s3://) or an extracted directory.")
+    parser.add_argument("--input", nargs="+", required=True, help="Files, directories or glob patterns to score.")
+    parser.add_argument("--input-format", choices=INPUT_FORMATS, default="auto")
+    parser.add_argument("--output", required=True, help="Output Parquet file.")
+    parser.add_argument("--transformer", default=None,
+                        help="transformer.json to encode with (default: the one in the model artifact).")
+    parser.add_argument("--id-column", default=None,
+                        help="Record id written next to each prediction (default: the input row number).")
+    parser.add_argument("--keep-columns", nargs="*", default=[], help="Input columns copied to the output.")
+    parser.add_argument("--chunk-rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes (default: cores / threads).")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="XGBoost threads per worker.")
+    parser.add_argument("--unordered", action="store_true",
+                        help="Write chunks as they finish; join the output back by --id-column.")
+    args = parser.parse_args()
+
+    model_dir = extract_artifact(args.model)
+    try:
+        fmt, files = input_files(args.input, args.input_format)
+        logger.info(f"📂 Scoring {len(files)} {fmt} file(s) into {args.output}")
+        summary = score(model_dir, files, fmt, args.output, args.transformer, args.id_column, args.keep_columns,
+                        args.chunk_rows, args.workers, args.threads_per_worker, ordered=not args.unordered)
+    finally:
+        if model_dir != args.model:
+            shutil.rmtree(model_dir, ignore_errors=True)
+
+    logger.info(f"✅ Scored {summary['rows']:,} rows in {summary['elapsed_s']:.1f}s "
+                f"({summary['rows_per_min']:,.0f} rows/min, {summary['workers']} workers) -> {args.output}")
@@ -0,0 +1,157 @@
+"""
+Microbenchmark of the endpoint request path: the default framework handler vs inference.py.
+
+Each variant turns a serialized request body into a serialized response, in process with no network,
+so only parsing, prediction and response encoding are measured. Variants:
+
+- default-csv: the framework's default path, `default_input_fn` / `default_predict_fn` /
+  `default_output_fn` of `sagemaker_xgboost_container.serving` when the container package is installed
+- default-csv~: the stand-in used when it is not; the CSV is split row by row in Python, a DMatrix is
+  built and `Booster.predict` runs on it. Only an approximation of the container, and labelled as such
+- custom-csv / custom-npy / custom-arrow: `inference.transform_fn` with each content type
+  (vectorized parse into float32 + `inplace_predict`)
+
+Reported per batch size: median request latency, per-row latency and rows/sec.
+
+    python benchmark_inference.py --model-dir /path/to/extracted/model.tar.gz --batch-sizes 1 10 100 1000 10000
+    python benchmark_inference.py     # trains a throwaway model on synthetic rows first
+"""
+
+import argparse
+import io
+import json
+import logging
+import statistics
+import time
+
+import numpy as np
+import xgboost as xgb
+
+from inference import (ARROW_CONTENT_TYPE, CSV_CONTENT_TYPE, NPY_CONTENT_TYPE, ServingModel, model_fn,
+                       transform_fn)
+
+logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def synthetic_model(n_features=6, rows=50_000, num_round=100, seed=0):
+    """A model of realistic size (100 trees, depth 6) trained on random rows, for when no artifact is given."""
+    rng = np.random.default_rng(seed)
+    X = rng.random((rows, n_features), dtype=np.float32)
+    y = (X[:, 1] + rng.normal(0, 0.3, rows) > 0.5).astype(np.float32)
+    booster = xgb.train({"objective": "binary:logistic", "max_depth": 6, "tree_method": "hist"},
+                        xgb.DMatrix(X, label=y), num_boost_round=num_round)
+    return ServingModel(booster)
+
+
+try:
+    from sagemaker_xgboost_container import serving as container_serving
+except ImportError:
+    container_serving = None
+
+
+def container_handler(model, body):
+    """The container's own default handler functions, as it serves a model without inference.py."""
+    data = container_serving.default_input_fn(body, CSV_CONTENT_TYPE)
+    predictions = container_serving.default_predict_fn(data, model.booster)
+    return container_serving.default_output_fn(predictions, CSV_CONTENT_TYPE)
+
+
+def default_handler(model, body):
+    """Approximation of the default framework path: split rows and fields in Python, build a DMatrix, predict."""
+    rows = [
+        [float(value) if value else np.nan for value in line.split(",")]
+        for line in body.decode("utf-8").splitlines() if line
+    ]
+    predictions = model.booster.predict(xgb.DMatrix(np.array(rows, dtype=np.float32)))
+    return "\n".join(map(str, predictions.tolist()))
+
+
+def encode_payloads(X):
+    """The request body of `X` for each content type."""
+    import pyarrow as pa
+
+    csv_body = "\n".join(",".join(repr(float(v)) for v in row) for row in X).encode("utf-8")
+    npy = io.BytesIO()
+    np.save(npy, X)
+    table = pa.Table.from_arrays([pa.array(X[:, i]) for i in range(X.shape[1])],
+                                 names=[f"f{i}" for i in range(X.shape[1])])
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return {CSV_CONTENT_TYPE: csv_body, NPY_CONTENT_TYPE: npy.getvalue(), ARROW_CONTENT_TYPE: sink.getvalue().to_pybytes()}
+
+
+def time_call(call, repeats, warmup=3):
+    for _ in range(warmup):
+        call()
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - started)
+    return statistics.median(latencies)
+
+
+if container_serving is not None:
+    DEFAULT_VARIANT, default_call = "default-csv", container_handler
+else:
+    DEFAULT_VARIANT, default_call = "default-csv~", default_handler
+
+
+def run(model, batch_sizes, repeats, seed=0):
+    rng = np.random.default_rng(seed)
+    results = []
+    for batch_size in batch_sizes:
+        X = rng.random((batch_size, model.n_features), dtype=np.float32)
+        payloads = encode_payloads(X)
+        variants = {
+            DEFAULT_VARIANT: lambda: default_call(model, payloads[CSV_CONTENT_TYPE]),
+            "custom-csv": lambda: transform_fn(model, payloads[CSV_CONTENT_TYPE], CSV_CONTENT_TYPE, CSV_CONTENT_TYPE),
+            "custom-npy": lambda: transform_fn(model, payloads[NPY_CONTENT_TYPE], NPY_CONTENT_TYPE, CSV_CONTENT_TYPE),
+            "custom-arrow": lambda: transform_fn(model, payloads[ARROW_CONTENT_TYPE], ARROW_CONTENT_TYPE,
+                                                 CSV_CONTENT_TYPE),
+        }
+        # Fewer repeats for the big batches keeps the whole run short
+        n = max(5, repeats * 100 // max(batch_size, 100))
+        for name, call in variants.items():
+            latency = time_call(call, n)
+            results.append({
+                "variant": name,
+                "batch_size": batch_size,
+                "latency_ms": latency * 1e3,
+                "per_row_us": latency * 1e6 / batch_size,
+                "rows_per_s": batch_size / latency,
+            })
+            logger.info(f"⏱️ {name:<13} batch={batch_size:<6} {latency * 1e3:8.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the default and custom inference handlers.")
+    parser.add_argument("--model-dir", default=None,
+                        help="Directory with xgboost-model (and transformer.json); default trains a synthetic model.")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this path.")
+    args = parser.parse_args()
+
+    model = model_fn(args.model_dir) if args.model_dir else synthetic_model(seed=args.seed)
+    if container_serving is None:
+        logger.warning("⚠️ sagemaker_xgboost_container is not installed: default-csv~ is a hand-written "
+                       "approximation of its default handler, so its latency and the speedups are estimates.")
+    results = run(model, args.batch_sizes, args.repeats, args.seed)
+
+    print(f"{'variant':<13} {'batch':>6} {'latency ms':>11} {'per-row µs':>11} {'rows/s':>12} {'speedup':>8}")
+    baseline = {r["batch_size"]: r["latency_ms"] for r in results if r["variant"] == DEFAULT_VARIANT}
+    for r in results:
+        print(f"{r['variant']:<13} {r['batch_size']:>6} {r['latency_ms']:>11.3f} {r['per_row_us']:>11.2f} "
+              f"{r['rows_per_s']:>12,.0f} {baseline[r['batch_size']] / r['latency_ms']:>7.1f}x")
+    if container_serving is None:
+        print("~ approximation of the container's default handler (sagemaker_xgboost_container not installed)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"💾 Wrote results to {args.output}")
@@ -2,17 +2,31 @@
 Deploy the trained XGBoost model to a SageMaker endpoint.
 
 This script will:
-- Load the model artifact from S3 (model.tar.gz)
+- Take the model.tar.gz written by train_script.py (xgboost-model + transformer.json): --model-data,
+  MODEL_ARTIFACT in .env, the best job of --tuning-job or the output of --training-job
+- Check that the artifact holds both files, and publish its transformer.json next to validation.csv so
+  predictor_test.py encodes requests exactly as the deployed model expects
 - Deploy it to a new or existing SageMaker endpoint using the endpoint name from .env
 - Use instance type like ml.m5.large for hosting
+- Serve with the custom handler in inference.py (vectorized CSV / npy / Arrow parsing and
+  Booster.inplace_predict on the whole batch) instead of the framework's default handler
 """
 
+import argparse
 import os
+import sys
 import logging
+import tarfile
+import tempfile
+import boto3
 from dotenv import load_dotenv
 import sagemaker
 from sagemaker.xgboost.model import XGBoostModel
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import TRANSFORMER_FILENAME
+from common.waiters import stage_timer
+
 # ----------------- Logger Setup -----------------
 logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s",
@@ -31,9 +45,50 @@ endpoint_name = os.getenv("ENDPOINT_NAME")
 session = sagemaker.Session()
 
 # ----------------- Model Path -----------------
-# Example: xgboost-traffic-local or a specific training job output
-# model_artifact = f"s3://{bucket}/{prefix}/output/xgboost-traffic-local/output/model.tar.gz"
-model_artifact = f"s3://{bucket}/{prefix}/output/sagemaker-xgboost-2025-06-18-21-28-12-436/output/model.tar.gz"
+# inference.py needs the artifact of train_script.py: the built-in container's model.tar.gz has no
+# transformer.json, and its feature layout need not match the published transformer
+parser = argparse.ArgumentParser(description="Deploy a train_script.py model.tar.gz behind the inference.py handler.")
+source = parser.add_mutually_exclusive_group()
+source.add_argument("--model-data", default=os.getenv("MODEL_ARTIFACT"),
+                    help="s3:// URI of model.tar.gz (default: MODEL_ARTIFACT from .env).")
+source.add_argument("--tuning-job", default=None, help="Deploy the best training job of this tuning job.")
+source.add_argument("--training-job", default=None, help="Deploy the output of this training job.")
+args = parser.parse_args()
+
+sagemaker_client = boto3.client("sagemaker", region_name=region)
+if args.tuning_job:
+    best_job = sagemaker_client.describe_hyper_parameter_tuning_job(
+        HyperParameterTuningJobName=args.tuning_job)["BestTrainingJob"]["TrainingJobName"]
+    logger.info("🏆 Best training job of %s: %s", args.tuning_job, best_job)
+    args.training_job = best_job
+if args.training_job:
+    model_artifact = sagemaker_client.describe_training_job(
+        TrainingJobName=args.training_job)["ModelArtifacts"]["S3ModelArtifacts"]
+elif args.model_data:
+    model_artifact = args.model_data
+else:
+    parser.error("Pass --model-data, --tuning-job or --training-job (or set MODEL_ARTIFACT in .env).")
+
+# ----------------- Check Artifact -----------------
+s3 = boto3.client("s3")
+artifact_bucket, _, artifact_key = model_artifact.replace("s3://", "", 1).partition("/")
+with tempfile.TemporaryDirectory() as tmp:
+    local_artifact = os.path.join(tmp, "model.tar.gz")
+    s3.download_file(artifact_bucket, artifact_key, local_artifact)
+    with tarfile.open(local_artifact) as archive:
+        # `tar -C model_dir .` stores members as ./transformer.json: look them up by normalized name
+        members = {os.path.normpath(member.name): member for member in archive.getmembers() if member.isfile()}
+        missing = [name for name in ("xgboost-model", TRANSFORMER_FILENAME) if name not in members]
+        if missing:
+            logger.error("❌ %s lacks %s; deploy a model.tar.gz written by train_script.py.", model_artifact, missing)
+            sys.exit(1)
+        transformer_path = os.path.join(tmp, TRANSFORMER_FILENAME)
+        with archive.extractfile(members[TRANSFORMER_FILENAME]) as src, open(transformer_path, "wb") as dst:
+            dst.write(src.read())
+    # predictor_test.py encodes its samples with this file: publish the one deployed
+    transformer_key = f"{prefix}/validation/{TRANSFORMER_FILENAME}"
+    s3.upload_file(transformer_path, bucket, transformer_key)
+    logger.info("☁️ Published the model's %s to s3://%s/%s", TRANSFORMER_FILENAME, bucket, transformer_key)
 
 logger.info("🚀 Deploying model from: %s", model_artifact)
 logger.info("🛠️ Using endpoint: %s", endpoint_name)
@@ -43,15 +98,19 @@ try:
     xgb_model = XGBoostModel(
         model_data=model_artifact,
         role=role,
-        framework_version="1.3-1",
+        entry_point="inference.py",  # model_fn / transform_fn
+        source_dir=".",
+        dependencies=["../common"],  # FeatureTransformer for application/json requests
+        framework_version="1.7-1",  # Same XGBoost version the model is trained with (train_script.py)
         sagemaker_session=session
     )
 
-    predictor = xgb_model.deploy(
-        endpoint_name=endpoint_name,
-        instance_type="ml.m5.large",
-        initial_instance_count=1
-    )
+    with stage_timer("deploy endpoint"):
+        predictor = xgb_model.deploy(
+            endpoint_name=endpoint_name,
+            instance_type="ml.m5.large",
+            initial_instance_count=1
+        )
 
     logger.info("✅ Endpoint deployed: %s", predictor.endpoint_name)
 
@@ -0,0 +1,175 @@
+"""
+Inference entry point for the XGBoostModel endpoint (SageMaker XGBoost framework, script mode).
+
+The default framework handler parses a CSV body row by row, builds a DMatrix per request and predicts
+through it. This handler instead turns every payload into one contiguous feature matrix and predicts the
+whole batch with `Booster.inplace_predict`, which skips DMatrix construction:
+
+| Content-Type                           | body                                      | parsing                                   |
+|----------------------------------------|-------------------------------------------|-------------------------------------------|
+| text/csv                               | encoded feature rows, no header           | Arrow's vectorized CSV reader, float32    |
+| application/x-npy                      | `np.save` of a 2-D float32/float64 array  | zero-copy view of the request bytes       |
+| application/vnd.apache.arrow.stream    | Arrow IPC stream, one column per feature  | zero-copy Arrow buffers, one gather       |
+| application/json                       | `{"instances": [{raw record}, ...]}`      | encoded with the model's transformer.json |
+
+CSV, npy and Arrow carry already encoded features, in the column order of `transformer.json` (what
+predictor_test.py sends). JSON carries raw records (`sensor_id`, `vehicle_count`, `avg_speed`,
+`weather_condition`) and is encoded here with the transformer shipped in model.tar.gz.
+
+Responses are text/csv (one probability per line, the default), application/json or application/x-npy,
+chosen by the Accept header.
+
+benchmark_inference.py compares this handler with the default one across batch sizes.
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import TRANSFORMER_FILENAME, FeatureTransformer
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = "xgboost-model"
+
+CSV_CONTENT_TYPE = "text/csv"
+NPY_CONTENT_TYPE = "application/x-npy"
+ARROW_CONTENT_TYPE = "application/vnd.apache.arrow.stream"
+JSON_CONTENT_TYPE = "application/json"
+
+
+class ServingModel:
+    """The booster plus what the handler needs to decode requests for it."""
+
+    def __init__(self, booster, transformer=None):
+        self.booster = booster
+        self.transformer = transformer
+        self.n_features = booster.num_features()
+
+
+# ---------------- Model loading ----------------
+
+def model_fn(model_dir):
+    booster = xgb.Booster()
+    booster.load_model(os.path.join(model_dir, MODEL_FILENAME))
+    transformer_path = os.path.join(model_dir, TRANSFORMER_FILENAME)
+    transformer = FeatureTransformer.load(transformer_path) if os.path.exists(transformer_path) else None
+    logger.info(f"📦 Loaded {MODEL_FILENAME} ({booster.num_features()} features, "
+                f"transformer: {'yes' if transformer else 'no'})")
+    return ServingModel(booster, transformer)
+
+
+# ---------------- Request parsing ----------------
+
+def parse_csv(body, n_features):
+    """Headerless CSV of encoded rows -> C-contiguous float32 matrix; empty fields become NaN."""
+    from pyarrow import csv as pa_csv
+    import pyarrow as pa
+
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    names = [f"f{i}" for i in range(n_features)]
+    table = pa_csv.read_csv(
+        pa.py_buffer(body),
+        read_options=pa_csv.ReadOptions(column_names=names),
+        convert_options=pa_csv.ConvertOptions(column_types={name: pa.float32() for name in names}),
+    )
+    return _gather(table)
+
+
+def parse_npy(body):
+    """`np.save` payload -> array viewing the request bytes (no copy for float32/float64 C-order data)."""
+    stream = io.BytesIO(body)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    if dtype.hasobject:
+        raise ValueError("❌ Object arrays are not accepted.")
+    array = np.frombuffer(body, dtype=dtype, count=int(np.prod(shape)), offset=stream.tell())
+    array = array.reshape(shape, order="F" if fortran_order else "C")
+    if array.ndim == 1:
+        array = array.reshape(1, -1)
+    if array.dtype not in (np.float32, np.float64):
+        array = array.astype(np.float32)
+    return array
+
+
+def parse_arrow(body):
+    """Arrow IPC stream -> float32 matrix, reading the record batches in place."""
+    import pyarrow as pa
+
+    table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    return _gather(table)
+
+
+def _gather(table):
+    # Columnar -> row-major: the single copy, straight into the output matrix
+    matrix = np.empty((table.num_rows, table.num_columns), dtype=np.float32)
+    for i, column in enumerate(table.columns):
+        offset = 0
+        for chunk in column.chunks:
+            # A view of the Arrow buffer when the chunk has no nulls; nulls become NaN
+            values = chunk.to_numpy(zero_copy_only=False)
+            matrix[offset:offset + len(values), i] = values
+            offset += len(values)
+    return matrix
+
+
+def parse_json(body, transformer):
+    if transformer is None:
+        raise ValueError(f"❌ {JSON_CONTENT_TYPE} needs {TRANSFORMER_FILENAME} in the model artifact.")
+    document = json.loads(body)
+    records = document["instances"] if isinstance(document, dict) else document
+    return transformer.transform(pd.DataFrame.from_records(records))
+
+
+def input_fn(request_body, request_content_type, model=None):
+    """Decode the request into a 2-D feature matrix."""
+    content_type = (request_content_type or CSV_CONTENT_TYPE).split(";")[0].strip().lower()
+    if content_type == CSV_CONTENT_TYPE:
+        if model is None:
+            raise ValueError("❌ The model is needed to know the CSV column count.")
+        return parse_csv(request_body, model.n_features)
+    if content_type == NPY_CONTENT_TYPE:
+        return parse_npy(request_body)
+    if content_type == ARROW_CONTENT_TYPE:
+        return parse_arrow(request_body)
+    if content_type == JSON_CONTENT_TYPE:
+        return parse_json(request_body, model.transformer if model else None)
+    raise ValueError(f"❌ Unsupported content type: {request_content_type}")
+
+
+# ---------------- Prediction ----------------
+
+def predict_fn(input_data, model):
+    if input_data.shape[1] != model.n_features:
+        raise ValueError(f"❌ Expected {model.n_features} features per row, got {input_data.shape[1]}.")
+    return model.booster.inplace_predict(input_data, validate_features=False)
+
+
+def output_fn(prediction, accept=CSV_CONTENT_TYPE):
+    accept = (accept or CSV_CONTENT_TYPE).split(";")[0].strip().lower()
+    if accept in (CSV_CONTENT_TYPE, "*/*"):
+        return "\n".join(map(repr, prediction.tolist())), CSV_CONTENT_TYPE
+    if accept == JSON_CONTENT_TYPE:
+        return json.dumps({"predictions": prediction.tolist()}), JSON_CONTENT_TYPE
+    if accept == NPY_CONTENT_TYPE:
+        buffer = io.BytesIO()
+        np.save(buffer, prediction)
+        return buffer.getvalue(), NPY_CONTENT_TYPE
+    raise ValueError(f"❌ Unsupported accept type: {accept}")
+
+
+def transform_fn(model, request_body, request_content_type, accept):
+    """Whole request in one call, so input_fn can see the model (CSV width, JSON transformer)."""
+    features = input_fn(request_body, request_content_type, model)
+    return output_fn(predict_fn(features, model), accept)
@@ -0,0 +1,382 @@
+"""
+Async load generator and batch client for the prediction endpoint.
+
+Streams a CSV of any size, cuts it into request payloads of `--rows-per-request` rows and sends them
+with at most `--concurrency` requests in flight. Targets:
+- `--url`: local_server.py, or anything else speaking the /invocations contract, over a pooled
+  httpx.AsyncClient with keep-alive connections
+- `--endpoint-name`: a deployed SageMaker endpoint through `sagemaker-runtime` InvokeEndpoint, on a
+  thread pool with the same concurrency
+
+Input CSV:
+- with `--transformer transformer.json`: raw records (validation.csv, train.csv), read in chunks and
+  encoded with the model's FeatureTransformer. Payloads can then be text/csv, application/x-npy or
+  Arrow IPC (`--content-type`).
+- without: rows that are already encoded feature values, forwarded line by line as text/csv
+  (`--skip-header` drops a header row)
+
+Failed requests are retried with exponential backoff and jitter:
+- retried: connection errors, timeouts, 429 and 5xx
+- not retried: other 4xx, which are the payload's fault
+
+The run reports:
+- a latency histogram of every successful request (log-spaced buckets, ~2% resolution)
+- p50 / p90 / p99 / p99.9 latency
+- requests/sec and rows/sec, overall and per second of the run, to show the sustained rate
+`--predictions-out` writes the returned predictions in input order, which makes this a batch client too.
+
+    python local_server.py --model model.tar.gz --workers 4 &
+    python load_client.py --url http://localhost:8080 --csv /tmp/validation.csv --transformer /tmp/transformer.json \\
+        --rows-per-request 1 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import FeatureTransformer
+from common.schema import read_traffic_csv
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {"csv": "text/csv", "npy": "application/x-npy", "arrow": "application/vnd.apache.arrow.stream"}
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+# ---------------- Payloads ----------------
+
+def serialize(X, fmt):
+    """Encoded float32 rows -> request body in the given format."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        np.savetxt(buffer, X, delimiter=",", fmt="%.9g")
+        return buffer.getvalue().encode("utf-8")
+    if fmt == "npy":
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(X, dtype=np.float32))
+        return buffer.getvalue()
+    import pyarrow as pa
+
+    table = pa.Table.from_arrays([pa.array(X[:, i]) for i in range(X.shape[1])],
+                                 names=[f"f{i}" for i in range(X.shape[1])])
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def iter_payloads(csv_path, rows_per_request, fmt="csv", transformer=None, skip_header=False):
+    """Yield (n_rows, body) for consecutive chunks of the CSV, never holding more than one chunk."""
+    if transformer is not None:
+        # One encode buffer for the whole file; serialize() copies out of it
+        buffer = np.empty((rows_per_request, transformer.n_features), dtype=np.float32)
+        with read_traffic_csv(csv_path, chunksize=rows_per_request) as reader:
+            for chunk in reader:
+                yield len(chunk), serialize(transformer.transform(chunk, out=buffer), fmt)
+        return
+    if fmt != "csv":
+        raise ValueError("❌ Pre-encoded input is forwarded as text/csv; pass --transformer for npy/arrow payloads.")
+    with open(csv_path, "rb") as f:
+        if skip_header:
+            f.readline()
+        lines = []
+        for line in f:
+            if line.strip():
+                lines.append(line if line.endswith(b"\n") else line + b"\n")
+            if len(lines) == rows_per_request:
+                yield len(lines), b"".join(lines)
+                lines = []
+        if lines:
+            yield len(lines), b"".join(lines)
+
+
+# ---------------- Targets ----------------
+
+class RetryableError(Exception):
+    pass
+
+
+class HttpTarget:
+    """POST /invocations over a pooled keep-alive connection set."""
+
+    def __init__(self, url, concurrency, timeout=30.0):
+        self.url = url.rstrip("/") + "/invocations"
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        self.client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+    async def invoke(self, body, content_type, accept):
+        try:
+            response = await self.client.post(self.url, content=body,
+                                              headers={"Content-Type": content_type, "Accept": accept})
+        except (httpx.TransportError, httpx.TimeoutException) as e:
+            raise RetryableError(str(e)) from e
+        if response.status_code in RETRYABLE_STATUS:
+            raise RetryableError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.content
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class EndpointTarget:
+    """SageMaker InvokeEndpoint on a thread pool; botocore's own retries are off so ours apply."""
+
+    def __init__(self, endpoint_name, concurrency, region=None):
+        import boto3
+        from botocore.config import Config
+
+        config = Config(max_pool_connections=concurrency, retries={"max_attempts": 1, "mode": "standard"})
+        self.runtime = boto3.client("sagemaker-runtime", region_name=region, config=config)
+        self.endpoint_name = endpoint_name
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def _invoke(self, body, content_type, accept):
+        from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError
+
+        try:
+            response = self.runtime.invoke_endpoint(EndpointName=self.endpoint_name, Body=body,
+                                                    ContentType=content_type, Accept=accept)
+        except BotoConnectionError as e:
+            raise RetryableError(str(e)) from e
+        except ClientError as e:
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 500)
+            if status in RETRYABLE_STATUS or e.response.get("Error", {}).get("Code") == "ThrottlingException":
+                raise RetryableError(f"HTTP {status}") from e
+            raise
+        return response["Body"].read()
+
+    async def invoke(self, body, content_type, accept):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._invoke, body, content_type, accept)
+
+    async def close(self):
+        self.executor.shutdown(wait=True)
+
+
+# ---------------- Measurements ----------------
+
+class LatencyHistogram:
+    """Counts per log-spaced bucket (each ~`resolution` wide), so the full distribution costs a few KB."""
+
+    def __init__(self, resolution=0.02):
+        self.base = 1.0 + resolution
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = max(seconds * 1e6, 1.0)
+        self.buckets[int(math.log(micros, self.base))] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q):
+        """Upper edge (seconds) of the bucket holding the q-th percentile."""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.base ** (bucket + 1) / 1e6, self.max)
+        return self.max
+
+    def coarse(self):
+        """[(upper bound ms, count)] over power-of-two millisecond bins, for printing."""
+        bins = Counter()
+        for bucket, count in self.buckets.items():
+            ms = self.base ** bucket / 1e3
+            bins[2 ** max(0, math.ceil(math.log2(ms))) if ms > 0 else 1] += count
+        return sorted(bins.items())
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1e3 if self.count else None,
+            "min_ms": self.min * 1e3 if self.count else None,
+            "max_ms": self.max * 1e3 if self.count else None,
+            **{f"p{q:g}_ms": (self.percentile(q) or 0) * 1e3 for q in (50, 90, 99, 99.9)},
+        }
+
+
+class OrderedWriter:
+    """Writes each request's predictions in input order, buffering only the out-of-order ones."""
+
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.next_seq = 0
+        self.pending = {}
+
+    def add(self, seq, body):
+        self.pending[seq] = body
+        while self.next_seq in self.pending:
+            data = self.pending.pop(self.next_seq)
+            self.file.write(data if data.endswith(b"\n") else data + b"\n")
+            self.next_seq += 1
+
+    def close(self):
+        self.file.close()
+
+
+# ---------------- Load loop ----------------
+
+async def run_load(target, payloads, concurrency=32, content_type="text/csv", accept="text/csv", retries=3,
+                   backoff=0.05, rate=None, writer=None):
+    """Send every payload with bounded concurrency; returns the run summary."""
+    histogram = LatencyHistogram()
+    per_second = Counter()
+    stats = Counter()
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    started = time.perf_counter()
+    interval = 1.0 / rate if rate else 0.0
+    schedule = {"next": started}
+
+    async def produce():
+        iterator = iter(payloads)
+        seq = 0
+        while True:
+            # Reading and encoding the next chunk happens off the event loop
+            item = await asyncio.to_thread(next, iterator, None)
+            if item is None:
+                break
+            await queue.put((seq, *item))
+            seq += 1
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def pace():
+        if not interval:
+            return
+        now = time.perf_counter()
+        slot = max(schedule["next"], now)
+        schedule["next"] = slot + interval
+        await asyncio.sleep(slot - now)
+
+    async def consume():
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            seq, n_rows, body = item
+            await pace()
+            response = None
+            for attempt in range(retries + 1):
+                sent = time.perf_counter()
+                try:
+                    response = await target.invoke(body, content_type, accept)
+                except RetryableError as e:
+                    if attempt == retries:
+                        stats["failed"] += 1
+                        logger.warning(f"⚠️ Request {seq} failed after {retries + 1} attempts: {e}")
+                        break
+                    stats["retries"] += 1
+                    await asyncio.sleep(backoff * 2 ** attempt * (0.5 + random.random()))
+                    continue
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.warning(f"⚠️ Request {seq} rejected: {e}")
+                    break
+                done = time.perf_counter()
+                histogram.record(done - sent)
+                per_second[int(done - started)] += 1
+                stats["requests"] += 1
+                stats["rows"] += n_rows
+                break
+            if writer is not None:
+                # A failed request leaves one empty line per row, so the output stays aligned with the input
+                writer.add(seq, response if response is not None else b"\n" * n_rows)
+
+    await asyncio.gather(produce(), *(consume() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    # Sustained rate: whole seconds only, leaving out the ramp-up and the final partial second
+    full_seconds = [per_second.get(s, 0) for s in range(1, int(elapsed))]
+    return {
+        "elapsed_s": elapsed,
+        "requests": stats["requests"],
+        "rows": stats["rows"],
+        "failed": stats["failed"],
+        "retries": stats["retries"],
+        "requests_per_s": stats["requests"] / elapsed if elapsed else None,
+        "rows_per_s": stats["rows"] / elapsed if elapsed else None,
+        "sustained_requests_per_s": sorted(full_seconds)[len(full_seconds) // 2] if full_seconds else None,
+        "min_second_requests": min(full_seconds) if full_seconds else None,
+        "latency": histogram.summary(),
+        "histogram_ms": histogram.coarse(),
+    }
+
+
+async def main(args):
+    fmt = args.content_type
+    transformer = FeatureTransformer.load(args.transformer) if args.transformer else None
+    payloads = iter_payloads(args.csv, args.rows_per_request, fmt, transformer, args.skip_header)
+    if args.url:
+        target = HttpTarget(args.url, args.concurrency, args.timeout)
+    else:
+        target = EndpointTarget(args.endpoint_name, args.concurrency, args.region)
+    writer = OrderedWriter(args.predictions_out) if args.predictions_out else None
+    try:
+        return await run_load(target, payloads, args.concurrency, CONTENT_TYPES[fmt], "text/csv", args.retries,
+                              args.backoff, args.rate, writer)
+    finally:
+        await target.close()
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Load-test or batch-score the prediction endpoint from a CSV.")
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument("--url", help="Base URL of a server speaking /invocations, e.g. http://localhost:8080")
+    target_group.add_argument("--endpoint-name", default=None, help="Deployed SageMaker endpoint.")
+    parser.add_argument("--region", default=os.getenv("AWS_REGION"))
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--transformer", default=None,
+                        help="transformer.json: the CSV holds raw records to encode; otherwise encoded rows.")
+    parser.add_argument("--skip-header", action="store_true", help="Drop the first line of a pre-encoded CSV.")
+    parser.add_argument("--content-type", choices=sorted(CONTENT_TYPES), default="csv")
+    parser.add_argument("--rows-per-request", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight (and pooled connections).")
+    parser.add_argument("--rate", type=float, default=None, help="Target requests/sec (default: as fast as possible).")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=0.05, help="Base seconds of the exponential backoff.")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--predictions-out", default=None, help="Write the predictions here, in input order.")
+    parser.add_argument("--output", default=None, help="Write the summary as JSON to this path.")
+    args = parser.parse_args()
+
+    summary = asyncio.run(main(args))
+    latency = summary["latency"]
+    print(f"✅ {summary['requests']:,} requests ({summary['rows']:,} rows) in {summary['elapsed_s']:.1f}s, "
+          f"{summary['failed']} failed, {summary['retries']} retries")
+    print(f"   {summary['requests_per_s']:,.1f} req/s overall, sustained {summary['sustained_requests_per_s']} req/s, "
+          f"{summary['rows_per_s']:,.0f} rows/s")
+    print(f"   latency ms: p50={latency['p50_ms']:.2f} p90={latency['p90_ms']:.2f} p99={latency['p99_ms']:.2f} "
+          f"p99.9={latency['p99.9_ms']:.2f} max={latency['max_ms'] or 0:.2f}")
+    peak = max((count for _, count in summary["histogram_ms"]), default=0)
+    for upper_ms, count in summary["histogram_ms"]:
+        print(f"   <= {upper_ms:>6} ms {count:>9,} {'█' * max(1, round(40 * count / peak)) if peak else ''}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"💾 Wrote summary to {args.output}")
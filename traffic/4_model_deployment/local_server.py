@@ -0,0 +1,284 @@
+"""
+Local stand-in for the SageMaker hosting container: serves model.tar.gz over the endpoint HTTP contract.
+
+- `GET /ping`: 200 once the model is loaded (the container health check)
+- `POST /invocations`: the request body, with its `Content-Type` and `Accept` headers, goes through
+  `inference.transform_fn`, so the content types are exactly those of the deployed handler
+- `GET /execution-parameters`: what batch transform asks the container for
+
+Process model: pre-fork, as with gunicorn in the hosting container.
+1. The parent extracts the artifact and loads the booster once, binds the listening socket, then
+   forks the workers.
+2. The model's memory is shared copy-on-write. `gc.freeze()` keeps the garbage collector from
+   touching, and thus copying, the pages of objects created before the fork.
+3. Each worker accepts from the shared socket and answers on a few threads
+   (`ThreadingHTTPServer`, HTTP/1.1 keep-alive). XGBoost releases the GIL while predicting.
+4. The parent only supervises. It respawns a worker that dies and stops all of them on
+   SIGTERM/SIGINT.
+
+The parent never predicts before forking, so no OpenMP thread pool exists yet when the workers are
+created. Each worker then predicts with `--threads-per-worker` OpenMP threads.
+
+    python local_server.py --model model.tar.gz --workers 4 --port 8080
+    curl -s localhost:8080/ping
+    curl -s -H "Content-Type: text/csv" --data-binary "3,42,55.5,0,1,0" localhost:8080/invocations
+
+With `--batch-delay-ms`, concurrent requests in a worker are coalesced into one prediction
+(see micro_batcher.py).
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import sys
+import tarfile
+import tempfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from inference import CSV_CONTENT_TYPE, model_fn, transform_fn
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8080
+MAX_PAYLOAD_MB = 6  # SageMaker real-time endpoint request limit
+
+
+def extract_artifact(path, destination=None):
+    """Directory holding the model files of `path` (a model.tar.gz, local or s3://, or a directory)."""
+    if os.path.isdir(path):
+        return path
+    destination = destination or tempfile.mkdtemp(prefix="model-")
+    if path.startswith("s3://"):
+        import boto3
+
+        bucket, _, key = path[len("s3://"):].partition("/")
+        local_path = os.path.join(destination, "model.tar.gz")
+        boto3.client("s3").download_file(bucket, key, local_path)
+        logger.info(f"⬇️ Downloaded {path}")
+        path = local_path
+    with tarfile.open(path) as archive:
+        if hasattr(tarfile, "data_filter"):
+            archive.extractall(destination, filter="data")
+        else:
+            archive.extractall(destination, members=_checked_members(archive, destination))
+    return destination
+
+
+def _checked_members(archive, destination):
+    """
+    The archive's members, once none of them can write outside `destination`; the check `filter="data"`
+    does on Pythons without tarfile extraction filters (before 3.8.17 / 3.9.17 / 3.10.12 / 3.11.4).
+    """
+    root = os.path.realpath(destination)
+
+    def inside(target):
+        return os.path.commonpath([root, os.path.realpath(os.path.join(root, target))]) == root
+
+    members = archive.getmembers()
+    for member in members:
+        name = member.name
+        if os.path.isabs(name) or ".." in name.replace("\\", "/").split("/") or not inside(name):
+            raise ValueError(f"❌ Unsafe path in model artifact: {name}")
+        if member.issym() and not inside(os.path.join(os.path.dirname(name), member.linkname)):
+            raise ValueError(f"❌ Symlink out of the model directory in artifact: {name} -> {member.linkname}")
+        if member.islnk() and not inside(member.linkname):
+            raise ValueError(f"❌ Hard link out of the model directory in artifact: {name} -> {member.linkname}")
+        if not (member.isfile() or member.isdir() or member.issym() or member.islnk()):
+            raise ValueError(f"❌ Unsupported member type in model artifact: {name}")
+    return members
+
+
+class InvocationHandler(BaseHTTPRequestHandler):
+    """The hosting contract; `server.model` is the loaded ServingModel."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/ping":
+            self._send(200 if self.server.model is not None else 503, b"")
+        elif self.path == "/execution-parameters":
+            self._send(200, json.dumps({"MaxConcurrentTransforms": self.server.workers,
+                                        "BatchStrategy": "MULTI_RECORD", "MaxPayloadInMB": MAX_PAYLOAD_MB}))
+        else:
+            self._send(404, json.dumps({"error": f"Unknown path {self.path}"}))
+
+    def _read_body(self):
+        """The request body, or None after answering 413 for payloads over the endpoint limit."""
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_PAYLOAD_MB * 1024 * 1024:
+            self._send(413, json.dumps({"error": f"Payload over {MAX_PAYLOAD_MB} MB"}))
+            self.close_connection = True  # The unread body is still on the socket
+            return None
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        if self.path != "/invocations":
+            self._send(404, json.dumps({"error": f"Unknown path {self.path}"}))
+            return
+        body = self._read_body()
+        if body is None:
+            return
+        try:
+            response, content_type = transform_fn(self.server.model, body,
+                                                  self.headers.get("Content-Type", CSV_CONTENT_TYPE),
+                                                  self.headers.get("Accept", CSV_CONTENT_TYPE))
+        except ValueError as e:
+            # Bad payloads are the client's fault, as with the hosting container's 4xx responses
+            self._send(400, json.dumps({"error": str(e)}))
+            return
+        except Exception as e:
+            logger.exception("❌ Invocation failed")
+            self._send(500, json.dumps({"error": str(e)}))
+            return
+        self._send(200, response, content_type)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class WorkerHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer on an already bound, listening socket inherited from the parent."""
+
+    daemon_threads = True
+
+    def __init__(self, listen_socket, handler, model, workers):
+        super().__init__(listen_socket.getsockname()[:2], handler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listen_socket
+        self.model = model
+        self.workers = workers
+
+
+class PreforkServer:
+    """Takes an already loaded model, binds the socket, forks `workers` children and supervises them."""
+
+    def __init__(self, model, host="0.0.0.0", port=DEFAULT_PORT, workers=None, threads_per_worker=1,
+                 handler=InvocationHandler, backlog=1024):
+        self.model = model
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+        self.handler = handler
+        self.backlog = backlog
+        self.children = set()
+        self.socket = None
+        self._stopping = False
+
+    def bind(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(self.backlog)
+        self.port = self.socket.getsockname()[1]
+        return self
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid:
+            self.children.add(pid)
+            return pid
+        # ---- worker ----
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent handles Ctrl-C and stops the workers
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        exit_code = 0
+        try:
+            self.model.booster.set_param({"nthread": self.threads_per_worker})
+            self.serve_worker()
+        except Exception:
+            logger.exception("❌ Worker crashed")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def serve_worker(self):
+        """Body of a worker process; subclasses can wrap the model or handler here."""
+        WorkerHTTPServer(self.socket, self.handler, self.model, self.workers).serve_forever()
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve_forever(self):
+        if self.socket is None:
+            self.bind()
+        # Objects allocated so far are never collected, so the GC does not write to their shared pages
+        gc.collect()
+        gc.freeze()
+        for _ in range(self.workers):
+            self._spawn()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        logger.info(f"🚀 Serving on {self.host}:{self.port} with {self.workers} workers "
+                    f"({self.threads_per_worker} XGBoost thread(s) each)")
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            self.children.discard(pid)
+            if not self._stopping:
+                logger.warning(f"⚠️ Worker {pid} exited with status {status}; respawning")
+                self._spawn()
+        self.socket.close()
+        logger.info("🛑 All workers stopped")
+
+
+def build_parser(description="Serve model.tar.gz locally over the SageMaker /ping and /invocations contract."):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--model", required=True, help="model.tar.gz (local path or s3://) or an extracted directory.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SAGEMAKER_MODEL_SERVER_WORKERS", 0)) or None,
+                        help="Worker processes (default: SAGEMAKER_MODEL_SERVER_WORKERS or one per core).")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="XGBoost threads per worker.")
+    parser.add_argument("--batch-delay-ms", type=float, default=0.0,
+                        help="Coalesce concurrent requests for up to this long (micro_batcher.py); 0 disables it.")
+    parser.add_argument("--max-batch-size", type=int, default=256, help="Rows per coalesced prediction.")
+    return parser
+
+
+def load_model(path):
+    model_dir = extract_artifact(path)
+    try:
+        return model_fn(model_dir)
+    finally:
+        if model_dir != path:
+            shutil.rmtree(model_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(process)d %(message)s", level=logging.INFO)
+    args = build_parser().parse_args()
+    if sys.platform == "win32":
+        raise SystemExit("❌ The pre-fork server needs os.fork (Linux/macOS).")
+    model = load_model(args.model)
+    if args.batch_delay_ms > 0:
+        from micro_batcher import BatchingPreforkServer
+
+        server = BatchingPreforkServer(model, args.host, args.port, args.workers, args.threads_per_worker,
+                                       args.max_batch_size, args.batch_delay_ms / 1000)
+    else:
+        server = PreforkServer(model, args.host, args.port, args.workers, args.threads_per_worker)
+    server.serve_forever()
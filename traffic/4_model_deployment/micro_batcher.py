@@ -0,0 +1,200 @@
+"""
+Dynamic micro-batching for the /invocations path of local_server.py.
+
+Sensor traffic arrives as many single-row requests, while `inplace_predict` costs far less per row
+on a batch. `MicroBatcher` queues the decoded rows of concurrent requests. A batch is closed either:
+- `max_delay` seconds after its first request arrived, or
+- once `max_batch_size` rows are waiting, whichever comes first.
+It then runs one vectorized prediction on the concatenated rows and scatters the slices back to the
+waiting callers. A request is never split; one larger than `max_batch_size` is predicted on its own.
+
+Each request is decoded and encoded in its own handler thread; only prediction is batched. The
+batcher records per-request latency (enqueue -> result), batch sizes and throughput. `GET /metrics`
+returns them for the worker that answers, for tuning the window against real fan-in:
+
+    python local_server.py --model model.tar.gz --workers 2 --batch-delay-ms 2 --max-batch-size 512
+    curl -s localhost:8080/metrics
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from inference import CSV_CONTENT_TYPE, input_fn, output_fn, predict_fn
+from local_server import InvocationHandler, PreforkServer, WorkerHTTPServer
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class MicroBatcher:
+    """Coalesces concurrent `predict(rows)` calls into one `predict_batch` call per window."""
+
+    def __init__(self, predict_batch, max_batch_size=256, max_delay=0.002, latency_window=10_000,
+                 clock=time.perf_counter):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.clock = clock
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_rows = deque(maxlen=latency_window)
+        self.requests = self.rows = self.batches = self.errors = 0
+        self.predict_seconds = 0.0
+        self.started = clock()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows):
+        """Queue a 2-D array of rows; the future resolves to their predictions."""
+        future = Future()
+        self._queue.put((rows, future, self.clock()))
+        return future
+
+    def predict(self, rows, timeout=None):
+        return self.submit(rows).result(timeout)
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # ---------------- Batching loop ----------------
+
+    def _collect(self):
+        """Block for the first request, then gather more until the window or the size limit closes the batch."""
+        first = self._queue.get()
+        if first is _STOP:
+            return None
+        batch, n_rows = [first], len(first[0])
+        deadline = first[2] + self.max_delay
+        while n_rows < self.max_batch_size:
+            remaining = deadline - self.clock()
+            try:
+                # Past the deadline, still take whatever is already queued
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # Finish this batch, stop on the next _collect
+                break
+            batch.append(item)
+            n_rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            parts = [rows for rows, _, _ in batch]
+            started = self.clock()
+            try:
+                predictions = self.predict_batch(parts[0] if len(parts) == 1 else np.concatenate(parts))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._lock:
+                    self.errors += len(batch)
+                continue
+            finished = self.clock()
+
+            offset = 0
+            for rows, future, enqueued in batch:
+                future.set_result(predictions[offset:offset + len(rows)])
+                offset += len(rows)
+            with self._lock:
+                self.requests += len(batch)
+                self.rows += offset
+                self.batches += 1
+                self.predict_seconds += finished - started
+                self._batch_rows.append(offset)
+                self._latencies.extend(finished - enqueued for _, _, enqueued in batch)
+
+    # ---------------- Metrics ----------------
+
+    def metrics(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            batch_rows = sorted(self._batch_rows)
+            elapsed = self.clock() - self.started
+            return {
+                "requests": self.requests,
+                "rows": self.rows,
+                "batches": self.batches,
+                "errors": self.errors,
+                "requests_per_s": self.requests / elapsed if elapsed else None,
+                "rows_per_s": self.rows / elapsed if elapsed else None,
+                "avg_batch_rows": self.rows / self.batches if self.batches else None,
+                "p50_batch_rows": _percentile(batch_rows, 50),
+                "max_batch_rows": batch_rows[-1] if batch_rows else None,
+                "p50_ms": _percentile(latencies, 50) * 1000 if latencies else None,
+                "p99_ms": _percentile(latencies, 99) * 1000 if latencies else None,
+                "predict_s": self.predict_seconds,
+                "max_delay_ms": self.max_delay * 1000,
+                "max_batch_size": self.max_batch_size,
+            }
+
+
+# ---------------- Serving ----------------
+
+class BatchingHandler(InvocationHandler):
+    """/invocations through the worker's MicroBatcher, plus GET /metrics."""
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send(200, json.dumps(self.server.batcher.metrics()))
+        else:
+            super().do_GET()
+
+    def do_POST(self):
+        if self.path != "/invocations":
+            super().do_POST()
+            return
+        body = self._read_body()
+        if body is None:
+            return
+        model = self.server.model
+        try:
+            features = input_fn(body, self.headers.get("Content-Type", CSV_CONTENT_TYPE), model)
+            if features.ndim != 2 or features.shape[1] != model.n_features:
+                raise ValueError(f"❌ Expected {model.n_features} features per row, got shape {features.shape}.")
+            predictions = self.server.batcher.predict(features)
+            response, content_type = output_fn(predictions, self.headers.get("Accept", CSV_CONTENT_TYPE))
+        except ValueError as e:
+            self._send(400, json.dumps({"error": str(e)}))
+            return
+        except Exception as e:
+            logger.exception("❌ Invocation failed")
+            self._send(500, json.dumps({"error": str(e)}))
+            return
+        self._send(200, response, content_type)
+
+
+class BatchingPreforkServer(PreforkServer):
+    """PreforkServer whose workers each start a MicroBatcher after the fork (threads don't survive fork)."""
+
+    def __init__(self, model, host="0.0.0.0", port=8080, workers=None, threads_per_worker=1,
+                 max_batch_size=256, max_delay=0.002):
+        super().__init__(model, host, port, workers, threads_per_worker, handler=BatchingHandler)
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+    def serve_worker(self):
+        server = WorkerHTTPServer(self.socket, self.handler, self.model, self.workers)
+        server.batcher = MicroBatcher(lambda X: predict_fn(X, self.model), self.max_batch_size, self.max_delay)
+        server.serve_forever()
@@ -0,0 +1,298 @@
+"""
+Low-latency reads of the Feature Store online store at inference time.
+
+`OnlineFeatureClient.get(identifier)` returns the latest features for a record identifier.
+Enriching requests per sensor therefore needs a feature group whose record identifier is
+`sensor_id`. The group `feature_store_ingest.py` writes (FEATURE_GROUP_NAME) is keyed by
+`incident`, which is 0 or 1, so a sensor id looked up there never matches a record.
+`require_record_identifier` checks the group before the client is used.
+
+Lookups go through three layers:
+
+- a bounded LRU cache with a TTL, so hot identifiers cost no network round trip
+- single-flight coalescing, so concurrent lookups of the same missing identifier share one request
+- a batcher thread that collects misses for up to `batch_window` seconds (or `max_batch_size`
+  identifiers, the BatchGetRecord limit) and resolves them with one `BatchGetRecord` call
+
+Identifiers BatchGetRecord returns as unprocessed (throttling) are retried after a capped,
+jittered exponential backoff. They fail with a LookupError after `max_retries` retries.
+
+Any object with a boto3-style `batch_get_record(Identifiers=[...])` method works as the runtime
+client, so a local fake is enough for tests:
+
+    sensor_group = os.getenv("SENSOR_FEATURE_GROUP_NAME")  # record identifier: sensor_id
+    require_record_identifier(boto3.client("sagemaker", region_name=region), sensor_group)
+    runtime = boto3.client("sagemaker-featurestore-runtime", region_name=region)
+    features = OnlineFeatureClient(runtime, sensor_group, ttl=30)
+    latest = features.get("5")  # sensor 5
+    print(features.metrics())
+"""
+
+import heapq
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_GET_IDENTIFIERS = 100
+SENSOR_IDENTIFIER = "sensor_id"
+
+
+def require_record_identifier(sagemaker_client, feature_group_name, expected=SENSOR_IDENTIFIER):
+    """Raise ValueError unless the feature group's record identifier is `expected`."""
+    description = sagemaker_client.describe_feature_group(FeatureGroupName=feature_group_name)
+    actual = description["RecordIdentifierFeatureName"]
+    if actual != expected:
+        raise ValueError(f"❌ Feature group {feature_group_name} is keyed by '{actual}', not '{expected}'; "
+                         f"lookups by {expected} would never match a record.")
+
+
+def _parse_value(value):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire `ttl` seconds after they were stored."""
+
+    def __init__(self, max_size=10_000, ttl=60.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expired = self.evicted = 0
+
+    def get(self, key):
+        """Return (True, value) on a fresh hit and (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expired += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class OnlineFeatureClient:
+    """Cached, coalescing lookups of the latest online-store record per identifier."""
+
+    def __init__(self, runtime_client, feature_group_name, feature_names=None, max_size=10_000, ttl=60.0,
+                 batch_window=0.002, max_batch_size=MAX_BATCH_GET_IDENTIFIERS, max_in_flight_batches=4,
+                 max_retries=5, base_backoff=0.01, max_backoff=1.0):
+        self.runtime_client = runtime_client
+        self.feature_group_name = feature_group_name
+        self.feature_names = feature_names
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self.batch_window = batch_window
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_GET_IDENTIFIERS)
+        self._pending = OrderedDict()    # identifier -> Future, waiting to be batched
+        self._in_flight = {}             # identifier -> Future, inside a BatchGetRecord call or backing off
+        self._delayed = []               # heap of (ready_at, seq, identifier) waiting out a throttling backoff
+        self._retries = {}               # identifier -> unprocessed attempts so far
+        self._delayed_seq = 0
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Condition()
+        self._latencies = deque(maxlen=10_000)
+        self.batches = 0
+        self.batched_identifiers = 0
+        self.throttled = 0
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight_batches, thread_name_prefix="batch-get")
+        self._batcher = threading.Thread(target=self._run_batcher, name="feature-batcher", daemon=True)
+        self._batcher.start()
+
+    # ---------------- Public API ----------------
+
+    def get(self, identifier, timeout=1.0):
+        """Latest features of `identifier` as a dict, or None if the record does not exist."""
+        start = time.perf_counter()
+        identifier = str(identifier)
+        hit, value = self.cache.get(identifier)
+        if not hit:
+            value = self._future_for(identifier).result(timeout=timeout)
+        self._latencies.append(time.perf_counter() - start)
+        return value
+
+    def get_many(self, identifiers, timeout=1.0):
+        """Look up several identifiers at once; misses share batches with concurrent callers."""
+        start = time.perf_counter()
+        results, futures = {}, {}
+        for identifier in map(str, identifiers):
+            hit, value = self.cache.get(identifier)
+            if hit:
+                results[identifier] = value
+            else:
+                futures[identifier] = self._future_for(identifier)
+        for identifier, future in futures.items():
+            results[identifier] = future.result(timeout=timeout)
+        self._latencies.append(time.perf_counter() - start)
+        return results
+
+    def metrics(self):
+        lookups = self.cache.hits + self.cache.misses
+        latencies = sorted(self._latencies)
+        return {
+            "hits": self.cache.hits,
+            "misses": self.cache.misses,
+            "hit_rate": self.cache.hits / lookups if lookups else None,
+            "expired": self.cache.expired,
+            "evicted": self.cache.evicted,
+            "cached": len(self.cache),
+            "batches": self.batches,
+            "avg_batch_size": self.batched_identifiers / self.batches if self.batches else None,
+            "throttled": self.throttled,
+            "p50_ms": _percentile(latencies, 50) * 1000 if latencies else None,
+            "p99_ms": _percentile(latencies, 99) * 1000 if latencies else None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        self._batcher.join()
+        self._executor.shutdown(wait=True)
+
+    # ---------------- Coalescing and batching ----------------
+
+    def _future_for(self, identifier):
+        with self._lock:
+            future = self._pending.get(identifier) or self._in_flight.get(identifier)
+            if future is None:
+                future = Future()
+                self._pending[identifier] = future
+                self._lock.notify()
+            return future
+
+    def _requeue_ready(self):
+        """Move identifiers whose backoff is over back into `_pending`; returns seconds to the next one."""
+        now = time.monotonic()
+        while self._delayed and (self._delayed[0][0] <= now or self._closed):
+            _, _, identifier = heapq.heappop(self._delayed)
+            future = self._in_flight.pop(identifier, None)
+            if future is not None:
+                self._pending.setdefault(identifier, future)
+        return self._delayed[0][0] - now if self._delayed else None
+
+    def _run_batcher(self):
+        while True:
+            with self._lock:
+                while True:
+                    wait = self._requeue_ready()
+                    if self._pending or (self._closed and wait is None):
+                        break
+                    self._lock.wait(wait)
+                if self._closed and not self._pending:
+                    return
+                # Give concurrent callers a short window to join this batch
+                deadline = time.monotonic() + self.batch_window
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(remaining)
+                batch = {}
+                while self._pending and len(batch) < self.max_batch_size:
+                    identifier, future = self._pending.popitem(last=False)
+                    batch[identifier] = future
+                self._in_flight.update(batch)
+            self._executor.submit(self._fetch, batch)
+
+    def _fetch(self, batch):
+        identifiers = {
+            "FeatureGroupName": self.feature_group_name,
+            "RecordIdentifiersValueAsString": list(batch),
+        }
+        if self.feature_names:
+            identifiers["FeatureNames"] = list(self.feature_names)
+        try:
+            response = self.runtime_client.batch_get_record(Identifiers=[identifiers])
+        except Exception as e:
+            logger.warning(f"⚠️ BatchGetRecord failed for {len(batch)} identifiers: {e}")
+            self._complete(batch, error=e)
+            return
+        with self._lock:
+            self.batches += 1
+            self.batched_identifiers += len(batch)
+
+        results = {}
+        for record in response.get("Records", []):
+            results[record["RecordIdentifierValueAsString"]] = {
+                feature["FeatureName"]: _parse_value(feature["ValueAsString"]) for feature in record["Record"]
+            }
+        errors = {
+            error["RecordIdentifierValueAsString"]: LookupError(f"{error['ErrorCode']}: {error['ErrorMessage']}")
+            for error in response.get("Errors", [])
+        }
+        unprocessed = {
+            identifier
+            for entry in response.get("UnprocessedIdentifiers", [])
+            for identifier in entry.get("RecordIdentifiersValueAsString", [])
+        }
+        given_up = {}
+        with self._lock:
+            self.throttled += len(unprocessed)
+            for identifier in unprocessed:
+                attempts = self._retries.get(identifier, 0) + 1
+                if attempts > self.max_retries:
+                    given_up[identifier] = batch[identifier]
+                    errors[identifier] = LookupError(f"Still unprocessed after {self.max_retries} retries")
+                    continue
+                # Throttled identifiers wait out a capped, jittered backoff before the next batch takes them
+                self._retries[identifier] = attempts
+                delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1)))
+                self._delayed_seq += 1
+                heapq.heappush(self._delayed, (time.monotonic() + delay, self._delayed_seq, identifier))
+            self._lock.notify()
+        self._complete(
+            {k: v for k, v in batch.items() if k not in unprocessed or k in given_up}, results=results, errors=errors
+        )
+
+    def _complete(self, batch, results=None, errors=None, error=None):
+        for identifier, future in batch.items():
+            if error is not None or (errors and identifier in errors):
+                failure = error if error is not None else errors[identifier]
+            else:
+                failure = None
+                # Missing records are cached as None so repeated misses stay local too
+                self.cache.put(identifier, results.get(identifier))
+            with self._lock:
+                self._in_flight.pop(identifier, None)
+                self._retries.pop(identifier, None)
+            if failure is not None:
+                future.set_exception(failure)
+            else:
+                future.set_result(results.get(identifier))
@@ -3,12 +3,13 @@ Send sample predictions to the deployed endpoint using Boto3 Predictor.
 
 This script will:
 - Connect to the deployed endpoint using the Predictor class
-- Download validation.csv from S3
-- Send test samples for prediction
+- Download validation.csv and the fitted feature transformer (transformer.json) from S3
+- Encode test samples with the transformer and send them for prediction
 - Print the returned inference results
 """
 
 import os
+import sys
 import logging
 import boto3
 import pandas as pd
@@ -16,6 +17,9 @@ import sagemaker
 from sagemaker.predictor import Predictor
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.feature_transform import TRANSFORMER_FILENAME, FeatureTransformer
+
 # ----------------- Logger Setup -----------------
 logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(message)s",
@@ -29,6 +33,8 @@ endpoint_name = os.getenv("ENDPOINT_NAME")
 bucket = os.getenv("S3_BUCKET")
 validation_key = "traffic-pipeline/validation/validation.csv"
 local_path = "/tmp/validation.csv"
+transformer_key = f"traffic-pipeline/validation/{TRANSFORMER_FILENAME}"
+transformer_path = f"/tmp/{TRANSFORMER_FILENAME}"
 
 if not endpoint_name:
     logger.error("❌ ENDPOINT_NAME not found in environment variables.")
@@ -44,6 +50,8 @@ try:
     s3 = boto3.client("s3")
     s3.download_file(bucket, validation_key, local_path)
     logger.info("✅ Downloaded to %s", local_path)
+    s3.download_file(bucket, transformer_key, transformer_path)
+    logger.info("✅ Downloaded feature transformer to %s", transformer_path)
 
 except Exception as e:
     logger.exception("❌ Failed to download validation.csv from S3.")
@@ -52,7 +60,9 @@ except Exception as e:
 # ----------------- Load Sample Data -----------------
 try:
     validation_df = pd.read_csv(local_path)
-    test_sample = validation_df.iloc[:5].values
+    transformer = FeatureTransformer.load(transformer_path)
+    # Raw features -> float32 model inputs, in the column order frozen at training time
+    test_sample = transformer.transform(validation_df.iloc[:5])
     logger.info("📦 Prepared %d records for inference", len(test_sample))
 
 except Exception as e:
@@ -73,13 +83,6 @@ try:
     )
     # ----------------- Send Predictions -----------------
     try:
-        import numpy as np
-
-        # Convert NumPy array to CSV string (no header, no index)
-        csv_data = pd.DataFrame(test_sample).to_csv(header=False, index=False).encode("utf-8")
-        import numpy as np
-        test_sample = validation_df.drop(columns=["incident"]).iloc[:5].values  # Remove label column
-
         preds = predictor.predict(
             data=test_sample
         )
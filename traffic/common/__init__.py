@@ -0,0 +1,6 @@
+"""
+Helpers shared by the traffic pipeline stages.
+
+The stage scripts are run from their own folders (e.g. `cd 1_data_preparation && python feature_store_ingest.py`),
+so they put the `traffic/` folder on `sys.path` before importing from `common`.
+"""
@@ -0,0 +1,192 @@
+"""
+Athena queries that return Parquet instead of paged CSV, with a local result cache.
+
+`AthenaParquetClient.query(sql, database, table)`:
+1. Builds a cache key from the normalized query text plus the table's latest write marker.
+   The marker is the newest object in the table's latest event-time partition.
+2. Returns the cached Parquet files if that key was seen before, without running a query.
+3. Otherwise wraps the query in `UNLOAD (...) TO 's3://...' WITH (format = 'PARQUET')`,
+   downloads the result objects in parallel, caches them, and loads them with Arrow.
+
+Rows written into an older event-time partition (late-arriving data) do not move the marker;
+pass `refresh=True` after a backfill.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+from common.waiters import Waiter, WaiterError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv("ATHENA_CACHE_DIR", os.path.expanduser("~/.cache/sagemaker-mlops-lab/athena"))
+_PARTITION_PREFIX = re.compile(r"^[A-Za-z_]+=[^/]+/$")
+
+
+def normalize_query(sql):
+    """Collapse whitespace and drop a trailing semicolon so trivially different texts share a cache entry."""
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def split_s3_uri(uri):
+    bucket, _, key = uri.replace("s3://", "", 1).partition("/")
+    return bucket, key
+
+
+def latest_write_marker(s3_client, location):
+    """
+    Newest object key and timestamp in the latest hive partition under `location`.
+
+    Feature Store offline tables are partitioned by event time (year=/month=/day=/hour=), so this
+    descends a few ListObjectsV2 calls instead of listing the whole table.
+    """
+    bucket, prefix = split_s3_uri(location.rstrip("/") + "/")
+    while True:
+        response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix, Delimiter="/")
+        partitions = [p["Prefix"][len(prefix):] for p in response.get("CommonPrefixes", [])]
+        partitions = [p for p in partitions if _PARTITION_PREFIX.match(p)]
+        if not partitions:
+            break
+        prefix += max(partitions)
+    latest_key, latest_modified, count = None, None, 0
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            count += 1
+            if latest_modified is None or obj["LastModified"] > latest_modified:
+                latest_key, latest_modified = obj["Key"], obj["LastModified"]
+    return f"{latest_key}|{latest_modified}|{count}"
+
+
+class AthenaParquetClient:
+    """Runs SELECT queries through UNLOAD to Parquet and caches results on local disk."""
+
+    def __init__(self, athena_client, s3_client, glue_client, output_s3_uri, cache_dir=DEFAULT_CACHE_DIR,
+                 max_download_workers=8, workgroup=None, timeout=1800):
+        self.athena = athena_client
+        self.s3 = s3_client
+        self.glue = glue_client
+        self.output_s3_uri = output_s3_uri.rstrip("/")
+        self.cache_dir = cache_dir
+        self.max_download_workers = max_download_workers
+        self.workgroup = workgroup
+        self.timeout = timeout
+
+    # ---------------- Cache ----------------
+
+    def table_marker(self, database, table):
+        table_info = self.glue.get_table(DatabaseName=database, Name=table)["Table"]
+        location = table_info.get("StorageDescriptor", {}).get("Location")
+        if location and location.startswith("s3://"):
+            return latest_write_marker(self.s3, location)
+        return str(table_info.get("UpdateTime"))
+
+    def cache_key(self, sql, database, table=None):
+        marker = self.table_marker(database, table) if table else ""
+        text = "\n".join([database, normalize_query(sql), marker])
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _cached_path(self, key):
+        path = os.path.join(self.cache_dir, key)
+        return path if os.path.exists(os.path.join(path, "_SUCCESS")) else None
+
+    # ---------------- Query execution ----------------
+
+    def _start(self, query_string, database):
+        params = {
+            "QueryString": query_string,
+            "QueryExecutionContext": {"Database": database},
+            "ResultConfiguration": {"OutputLocation": f"{self.output_s3_uri}/results/"},
+        }
+        if self.workgroup:
+            params["WorkGroup"] = self.workgroup
+        return self.athena.start_query_execution(**params)["QueryExecutionId"]
+
+    def _wait(self, query_execution_id):
+        waiter = Waiter(
+            f"Athena query {query_execution_id}",
+            poll=lambda: self.athena.get_query_execution(QueryExecutionId=query_execution_id)["QueryExecution"],
+            status=lambda execution: execution["Status"]["State"],
+            success={"SUCCEEDED"},
+            failure={"FAILED", "CANCELLED"},
+            initial_delay=0.25,
+            max_delay=5,
+            timeout=self.timeout,
+        )
+        try:
+            return waiter.wait()
+        except WaiterError:
+            execution = self.athena.get_query_execution(QueryExecutionId=query_execution_id)["QueryExecution"]
+            reason = execution["Status"].get("StateChangeReason", "")
+            raise RuntimeError(f"❌ Athena query {query_execution_id} {execution['Status']['State']}: {reason}")
+
+    def _clear_prefix(self, bucket, prefix):
+        # UNLOAD refuses to write into a non-empty location
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            keys = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if keys:
+                self.s3.delete_objects(Bucket=bucket, Delete={"Objects": keys})
+
+    def _download(self, bucket, prefix, destination):
+        paginator = self.s3.get_paginator("list_objects_v2")
+        keys = [
+            obj["Key"]
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for obj in page.get("Contents", [])
+            if obj["Size"] > 0
+        ]
+        os.makedirs(destination, exist_ok=True)
+
+        def fetch(indexed_key):
+            index, key = indexed_key
+            self.s3.download_file(bucket, key, os.path.join(destination, f"part-{index:05d}.parquet"))
+
+        with ThreadPoolExecutor(max_workers=self.max_download_workers) as pool:
+            list(pool.map(fetch, enumerate(keys)))
+        return len(keys)
+
+    def unload(self, sql, database, key):
+        """Run `sql` as an UNLOAD to Parquet and download the result into the cache under `key`."""
+        unload_uri = f"{self.output_s3_uri}/unload/{key}/"
+        bucket, prefix = split_s3_uri(unload_uri)
+        self._clear_prefix(bucket, prefix)
+        query_string = (
+            f"UNLOAD ({normalize_query(sql)}) TO '{unload_uri}' "
+            "WITH (format = 'PARQUET', compression = 'SNAPPY')"
+        )
+        query_execution_id = self._start(query_string, database)
+        execution = self._wait(query_execution_id)
+        scanned = execution.get("Statistics", {}).get("DataScannedInBytes", 0)
+
+        staging = os.path.join(self.cache_dir, f".{key}.partial")
+        shutil.rmtree(staging, ignore_errors=True)
+        n_files = self._download(bucket, prefix, staging)
+        open(os.path.join(staging, "_SUCCESS"), "w").close()
+        destination = os.path.join(self.cache_dir, key)
+        shutil.rmtree(destination, ignore_errors=True)
+        os.replace(staging, destination)
+        logger.info(f"📥 UNLOAD {query_execution_id}: scanned {scanned / 1e6:.1f} MB, downloaded {n_files} Parquet file(s)")
+        return destination
+
+    def query(self, sql, database, table=None, refresh=False):
+        """Result of `sql` as a pandas DataFrame, served from the local cache when the table is unchanged."""
+        key = self.cache_key(sql, database, table)
+        path = None if refresh else self._cached_path(key)
+        if path:
+            logger.info(f"⚡ Athena cache hit for {key[:12]} - skipping the scan")
+        else:
+            path = self.unload(sql, database, key)
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(".parquet")
+        )
+        if not files:
+            return pd.DataFrame()
+        return ds.dataset(files, format="parquet").to_table().to_pandas()
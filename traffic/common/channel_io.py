@@ -0,0 +1,253 @@
+"""
+Training-channel readers for train_script.py: CSV, Parquet, XGBoost binary DMatrix and Pipe mode.
+
+Supported formats in File mode (the channel directory is `SM_CHANNEL_<NAME>`):
+
+| format  | files                             | loaded as                                        |
+|---------|-----------------------------------|--------------------------------------------------|
+| csv     | `*.csv`                           | DataFrame, compact dtypes applied by the parser  |
+| parquet | `*.parquet`                       | DataFrame, only label, timestamp and feature columns decoded  |
+| dmatrix | `*.buffer` + `transformer.json`   | `xgb.DMatrix` loaded straight from the binary    |
+
+`auto` picks the format from the file extensions in the channel.
+
+In Pipe mode, SageMaker streams the channel's S3 objects through the FIFO
+`/opt/ml/input/data/<channel>_<epoch>` instead of downloading them first. `iter_pipe_chunks` parses
+CSV from the FIFO chunk by chunk, so parsing overlaps the transfer. train_script.py never
+collects those chunks into one frame: `load_channel` returns ("pipe", channel) and
+external_memory.PipeIter feeds the chunks straight into QuantileDMatrix. Each pass over the data
+reads the next epoch's FIFO. `read_pipe_channel` concatenates one epoch and is only meant for
+inspecting small channels. Parquet and binary
+DMatrix files need random access and are File-mode only. Each object in the pipe should be headerless,
+or there should be a single object with a header, because headers of later objects would
+otherwise appear as data rows.
+
+Pipe mode can be simulated locally with `simulate_pipe`, which creates the FIFOs and feeds them
+from local files on a background thread. As in SageMaker, each epoch's FIFO is offered once the
+previous one has been opened. From the `traffic/` folder:
+
+    python -m common.channel_io --simulate-pipe 2_model_training/train.csv --chunk-size 100000
+"""
+
+import argparse
+import glob
+import itertools
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow.parquet as pq
+import xgboost as xgb
+
+from common.feature_transform import TRANSFORMER_FILENAME
+from common.schema import TRAINING_COLUMNS, cast_traffic_dtypes, read_traffic_csv
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_FORMATS = ("auto", "csv", "parquet", "dmatrix")
+_EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "dmatrix": ".buffer"}
+CONTENT_TYPES = {"csv": "text/csv", "parquet": "application/x-parquet", "dmatrix": "application/x-xgboost-dmatrix"}
+
+
+def channel_dir(channel="train"):
+    return os.environ.get(f"SM_CHANNEL_{channel.upper()}", f"/opt/ml/input/data/{channel}")
+
+
+def input_mode(channel="train"):
+    """TrainingInputMode of a channel ("File", "Pipe" or "FastFile") from SM_INPUT_DATA_CONFIG."""
+    config = json.loads(os.environ.get("SM_INPUT_DATA_CONFIG", "{}"))
+    return config.get(channel, {}).get("TrainingInputMode", "File")
+
+
+def _channel_files(directory, fmt):
+    return sorted(glob.glob(os.path.join(directory, "**", f"*{_EXTENSIONS[fmt]}"), recursive=True))
+
+
+def detect_format(directory):
+    for fmt in ("dmatrix", "parquet", "csv"):
+        if _channel_files(directory, fmt):
+            return fmt
+    raise FileNotFoundError(f"❌ No .buffer, .parquet or .csv files found in {directory}")
+
+
+def channel_files(channel="train", fmt="auto"):
+    """(format, sorted file paths) of a File-mode channel."""
+    directory = channel_dir(channel)
+    fmt = detect_format(directory) if fmt == "auto" else fmt
+    return fmt, _channel_files(directory, fmt)
+
+
+# ---------------- File mode ----------------
+
+def read_csv_channel(directory):
+    columns = TRAINING_COLUMNS
+    frames = [read_traffic_csv(path, usecols=columns) for path in _channel_files(directory, "csv")]
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_parquet_channel(directory):
+    columns = TRAINING_COLUMNS
+    frames = [
+        # Dictionary-decoding weather_condition keeps it categorical without materialising strings
+        pq.read_table(path, columns=columns, read_dictionary=["weather_condition"]).to_pandas()
+        for path in _channel_files(directory, "parquet")
+    ]
+    return cast_traffic_dtypes(pd.concat(frames, ignore_index=True))
+
+
+def read_dmatrix_channel(directory):
+    """Binary DMatrix of an already encoded channel, and the transformer.json it was encoded with."""
+    paths = _channel_files(directory, "dmatrix")
+    if len(paths) != 1:
+        raise ValueError(f"❌ Expected exactly one .buffer file in {directory}, found {len(paths)}")
+    transformer_path = os.path.join(directory, TRANSFORMER_FILENAME)
+    if not os.path.exists(transformer_path):
+        raise FileNotFoundError(f"❌ {TRANSFORMER_FILENAME} must be uploaded next to {os.path.basename(paths[0])}")
+    return xgb.DMatrix(paths[0]), transformer_path
+
+
+def write_dmatrix_channel(X, y, directory, transformer, feature_types=None, enable_categorical=False):
+    """Save encoded features as an XGBoost binary buffer plus transformer.json, ready to upload as a channel."""
+    os.makedirs(directory, exist_ok=True)
+    dmatrix = xgb.DMatrix(X, label=y, feature_types=feature_types, enable_categorical=enable_categorical)
+    dmatrix.save_binary(os.path.join(directory, "train.buffer"))
+    transformer.save(os.path.join(directory, TRANSFORMER_FILENAME))
+    return directory
+
+
+# ---------------- Pipe mode ----------------
+
+def pipe_path(channel="train", epoch=0, input_dir=None):
+    # The FIFO sits next to the channel directory: /opt/ml/input/data/train_0 beside .../data/train
+    input_dir = input_dir or os.path.dirname(channel_dir(channel).rstrip("/"))
+    return os.path.join(input_dir, f"{channel}_{epoch}")
+
+
+def iter_pipe_chunks(fifo_path, chunk_size=100_000):
+    """Yield DataFrame chunks (label, timestamp, features) parsed from a Pipe-mode FIFO as the bytes arrive."""
+    with open(fifo_path, "rb") as stream:
+        reader = read_traffic_csv(stream, usecols=TRAINING_COLUMNS, chunksize=chunk_size)
+        with reader:
+            for chunk in reader:
+                yield chunk
+
+
+def read_pipe_channel(channel="train", epoch=0, chunk_size=100_000, input_dir=None):
+    """One epoch of the pipe as a single DataFrame; for small channels only (training streams instead)."""
+    start = time.perf_counter()
+    chunks = []
+    for i, chunk in enumerate(iter_pipe_chunks(pipe_path(channel, epoch, input_dir), chunk_size)):
+        chunks.append(chunk)
+        if i == 0:
+            logger.info(f"⚡ First {len(chunk)} rows parsed from the pipe after {time.perf_counter() - start:.2f}s")
+    if not chunks:
+        raise ValueError(f"❌ Pipe for channel '{channel}' delivered no records.")
+    # Chunks share the declared weather categories, so the concat stays categorical
+    return pd.concat(chunks, ignore_index=True)
+
+
+@contextmanager
+def simulate_pipe(source_paths, channel="train", epoch=0, input_dir=None, block_size=1 << 20, delay=0.0):
+    """
+    Create FIFOs like SageMaker Pipe mode does and stream `source_paths` into them on a thread.
+
+    Every epoch (`<channel>_<epoch>`, `<channel>_<epoch + 1>`, ...) carries the whole data again, for
+    as many passes as the reader makes. Yields the input directory to pass as `input_dir`.
+    `delay` (seconds per block) mimics a slow download, so the reader visibly consumes data before
+    the transfer is complete.
+    """
+    owns_dir = input_dir is None
+    input_dir = input_dir or tempfile.mkdtemp(prefix="pipe-input-")
+    fifos = [pipe_path(channel, epoch, input_dir)]
+    os.mkfifo(fifos[0])
+    stop = threading.Event()
+
+    def feed():
+        for current in itertools.count(epoch):
+            # The next epoch exists before this one ends, so the reader can open it right after EOF
+            next_fifo = pipe_path(channel, current + 1, input_dir)
+            if not os.path.exists(next_fifo):
+                os.mkfifo(next_fifo)
+                fifos.append(next_fifo)
+            try:
+                with open(pipe_path(channel, current, input_dir), "wb") as pipe:
+                    if stop.is_set():
+                        return
+                    for path in source_paths:
+                        with open(path, "rb") as source:
+                            while block := source.read(block_size):
+                                pipe.write(block)
+                                if delay:
+                                    time.sleep(delay)
+            except BrokenPipeError:
+                pass  # The reader left this epoch early; the next one is still offered
+            if stop.is_set():
+                return
+
+    feeder = threading.Thread(target=feed, name="pipe-feeder", daemon=True)
+    feeder.start()
+    try:
+        yield input_dir
+    finally:
+        stop.set()
+        for _ in range(10):
+            # Opening a FIFO for reading releases a feeder blocked in open() for writing
+            for fifo in list(fifos):
+                try:
+                    os.close(os.open(fifo, os.O_RDONLY | os.O_NONBLOCK))
+                except OSError:
+                    pass
+            feeder.join(timeout=0.1)
+            if not feeder.is_alive():
+                break
+        for fifo in fifos:
+            if os.path.exists(fifo):
+                os.remove(fifo)
+        if owns_dir:
+            shutil.rmtree(input_dir, ignore_errors=True)
+
+
+# ---------------- Entry point for train_script.py ----------------
+
+def load_channel(channel="train", fmt="auto", chunk_size=100_000):
+    """
+    Load a training channel. Returns ("frame", DataFrame) for raw records,
+    ("dmatrix", (DMatrix, transformer_path)) for an already encoded binary channel, or
+    ("pipe", channel) for a Pipe-mode channel, which is streamed by external_memory.PipeIter and
+    never loaded whole.
+    """
+    if input_mode(channel) == "Pipe":
+        if fmt not in ("auto", "csv"):
+            raise ValueError(f"❌ Pipe mode streams CSV only; got --train_format {fmt}")
+        logger.info(f"🚰 Streaming channel '{channel}' from its Pipe-mode FIFO")
+        return "pipe", channel
+
+    directory = channel_dir(channel)
+    fmt = detect_format(directory) if fmt == "auto" else fmt
+    logger.info(f"📂 Reading channel '{channel}' from {directory} as {fmt}")
+    if fmt == "dmatrix":
+        return "dmatrix", read_dmatrix_channel(directory)
+    if fmt == "parquet":
+        return "frame", read_parquet_channel(directory)
+    return "frame", read_csv_channel(directory)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Read a CSV through a simulated Pipe-mode FIFO.")
+    parser.add_argument("--simulate-pipe", nargs="+", required=True, help="CSV file(s) to stream through the FIFO.")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to sleep per 1 MiB block written.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with simulate_pipe(args.simulate_pipe, delay=args.delay) as input_dir:
+        df = read_pipe_channel(chunk_size=args.chunk_size, input_dir=input_dir)
+    logger.info(f"✅ Read {len(df)} rows through the pipe in {time.perf_counter() - started:.2f}s")
+    print(df.dtypes)
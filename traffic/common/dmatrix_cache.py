@@ -0,0 +1,111 @@
+"""
+Content-addressed cache of preprocessed train/validation matrices, shared by training runs on the same data.
+
+Every tuning trial on the same channel would otherwise re-read the CSV, re-split, re-encode and
+rebuild both DMatrices. This cache does that work once. The key hashes:
+- the channel file bytes
+- the preprocessing settings (categorical mode, validation fraction, holdout cut-off, split salt)
+- `CACHE_VERSION`
+
+Any change to the data or to how it is encoded therefore gets a new entry. An entry holds:
+
+    <cache_dir>/<key>/train.buffer        XGBoost binary DMatrix (features, labels, feature types)
+    <cache_dir>/<key>/validation.buffer
+    <cache_dir>/<key>/transformer.json    FeatureTransformer the matrices were encoded with
+    <cache_dir>/<key>/validation.csv      raw validation rows, as train_script.py writes them
+    <cache_dir>/<key>/_SUCCESS
+
+Loading an entry is a binary read with no parsing or encoding. Entries are built in a staging
+directory and renamed into place, under an exclusive `flock` per key. Concurrent trials that miss
+at the same time therefore build the entry once: the others wait on the lock and then load it.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import xgboost as xgb
+
+from common.feature_transform import TRANSFORMER_FILENAME
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1  # Bump when preprocessing changes in a way the settings don't capture
+DEFAULT_CACHE_DIR = os.getenv("DMATRIX_CACHE_DIR", os.path.expanduser("~/.cache/sagemaker-mlops-lab/dmatrix"))
+
+TRAIN_BUFFER = "train.buffer"
+VALIDATION_BUFFER = "validation.buffer"
+VALIDATION_CSV = "validation.csv"
+
+
+def fingerprint_files(paths, **settings):
+    """sha256 over the names and bytes of `paths` plus the preprocessing settings."""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode("utf-8"))
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_entry(directory, X_train, y_train, X_val, y_val, transformer, validation_frame):
+    """Write encoded matrices, the transformer and the raw validation rows into `directory`."""
+    native = transformer.encoding == "native"
+    dmatrix_kwargs = {"feature_types": transformer.feature_types, "enable_categorical": True} if native else {}
+    xgb.DMatrix(X_train, label=y_train, **dmatrix_kwargs).save_binary(os.path.join(directory, TRAIN_BUFFER))
+    xgb.DMatrix(X_val, label=y_val, **dmatrix_kwargs).save_binary(os.path.join(directory, VALIDATION_BUFFER))
+    transformer.save(os.path.join(directory, TRANSFORMER_FILENAME))
+    validation_frame.to_csv(os.path.join(directory, VALIDATION_CSV), index=False)
+
+
+def load_entry(directory):
+    """(dtrain, dval, transformer_path, validation_csv_path) of a cache entry."""
+    dtrain = xgb.DMatrix(os.path.join(directory, TRAIN_BUFFER))
+    dval = xgb.DMatrix(os.path.join(directory, VALIDATION_BUFFER))
+    return dtrain, dval, os.path.join(directory, TRANSFORMER_FILENAME), os.path.join(directory, VALIDATION_CSV)
+
+
+class DMatrixCache:
+    """Directory of cache entries keyed by `fingerprint_files`."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _complete(self, key):
+        return os.path.exists(os.path.join(self.path(key), "_SUCCESS"))
+
+    def get_or_build(self, key, build):
+        """Directory of the entry for `key`, calling `build(staging_dir)` once if it doesn't exist yet."""
+        if self._complete(key):
+            logger.info(f"⚡ DMatrix cache hit for {key[:12]} - skipping load and preprocessing")
+            return self.path(key)
+
+        with open(os.path.join(self.cache_dir, f".{key}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if self._complete(key):
+                # Built by a concurrent trial while this one waited for the lock
+                logger.info(f"⚡ DMatrix cache entry {key[:12]} was built by another process")
+                return self.path(key)
+
+            staging = tempfile.mkdtemp(prefix=f".{key}.partial-", dir=self.cache_dir)
+            try:
+                build(staging)
+                open(os.path.join(staging, "_SUCCESS"), "w").close()
+                destination = self.path(key)
+                shutil.rmtree(destination, ignore_errors=True)
+                os.replace(staging, destination)
+            except BaseException:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+        logger.info(f"💾 Built DMatrix cache entry {key[:12]} in {self.cache_dir}")
+        return destination
@@ -0,0 +1,243 @@
+"""
+Fitted feature transformer shared by training, validation and inference.
+
+`FeatureTransformer` turns raw traffic records into the float32 matrix the model was trained on:
+
+    sensor_id, vehicle_count, avg_speed, weather_condition_Fog, weather_condition_Rain, weather_condition_Snow
+
+`fit` freezes the category vocabulary and the output column order. The vocabulary is the declared
+categories of the column's dtype, followed by any observed values the dtype does not cover. After
+that, `transform` writes straight into a preallocated float32 matrix. Numeric columns are copied
+in, and each categorical column is one-hot encoded from its category codes with a single
+fancy-indexed assignment. Categories never seen in training encode as all zeros. They are counted
+in `unknown_counts` and logged, and with `max_unknown_fraction` set, a frame with a larger share
+of them is rejected. `transform_record` is the online path:
+one record and a few dict lookups, with no pandas involved.
+
+With `encoding="native"` each categorical column stays one column holding its category code
+(unknown categories become NaN, i.e. missing). XGBoost then splits on it natively when the
+DMatrix is built with `feature_types=transformer.feature_types, enable_categorical=True` and
+`tree_method="hist"`. The matrix no longer grows with the number of categories.
+
+The fitted state is a small JSON document (`transformer.json`) saved next to the model, so batch
+and online inference apply exactly the encoding used in training:
+
+    transformer = FeatureTransformer().fit(train_df)
+    transformer.save(os.path.join(model_dir, TRANSFORMER_FILENAME))
+    ...
+    transformer = FeatureTransformer.load(path)
+    X = transformer.transform(df)
+"""
+
+import json
+import logging
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRANSFORMER_FILENAME = "transformer.json"
+ENCODINGS = ("onehot", "native")
+
+DEFAULT_NUMERIC_COLUMNS = ("sensor_id", "vehicle_count", "avg_speed")
+DEFAULT_CATEGORICAL_COLUMNS = ("weather_condition",)
+
+
+class FeatureTransformer:
+    """Frozen numeric pass-through plus one-hot (or native code) encoding, producing a float32 matrix."""
+
+    def __init__(self, numeric_columns=DEFAULT_NUMERIC_COLUMNS, categorical_columns=DEFAULT_CATEGORICAL_COLUMNS,
+                 drop_first=True, vocabularies=None, encoding="onehot", max_unknown_fraction=None):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"❌ Unknown encoding '{encoding}'. Expected one of {ENCODINGS}.")
+        self.encoding = encoding
+        self.numeric_columns = list(numeric_columns)
+        self.categorical_columns = list(categorical_columns)
+        # drop_first matches the pd.get_dummies(drop_first=True) layout earlier models were trained on
+        self.drop_first = drop_first
+        self.vocabularies = None
+        # Runtime policy, not part of the saved state: fail a transform whose share of unknown categories exceeds it
+        self.max_unknown_fraction = max_unknown_fraction
+        self.unknown_counts = Counter()
+        if vocabularies is not None:
+            self._freeze(vocabularies)
+
+    # ---------------- Fitting ----------------
+
+    def fit(self, df):
+        """Freeze the vocabulary of each categorical column: declared categories first, then unlisted observed values."""
+        vocabularies = {}
+        for column in self.categorical_columns:
+            series = df[column]
+            declared = [str(c) for c in series.cat.categories] if isinstance(series.dtype, pd.CategoricalDtype) else []
+            observed = sorted(set(str(v) for v in series.dropna().unique()) - set(declared))
+            if declared and observed:
+                logger.warning(f"⚠️ '{column}' has values outside its declared categories; added to the vocabulary: {observed}")
+            vocabularies[column] = declared + observed
+        self._freeze(vocabularies)
+        return self
+
+    def _freeze(self, vocabularies):
+        self.vocabularies = {column: list(vocabularies[column]) for column in self.categorical_columns}
+        self._index = {
+            column: {value: code for code, value in enumerate(vocabulary)}
+            for column, vocabulary in self.vocabularies.items()
+        }
+        # Output slots: numerics first, then one block per categorical column
+        self._blocks = []
+        offset = len(self.numeric_columns)
+        for column in self.categorical_columns:
+            if self.encoding == "native":
+                width = 1
+            else:
+                width = len(self.vocabularies[column]) - (1 if self.drop_first else 0)
+            self._blocks.append((column, offset, width))
+            offset += width
+        self.n_features = offset
+
+    def _check_fitted(self):
+        if self.vocabularies is None:
+            raise RuntimeError("❌ FeatureTransformer is not fitted. Call fit() or load() first.")
+
+    @property
+    def input_columns(self):
+        return self.numeric_columns + self.categorical_columns
+
+    @property
+    def _skip(self):
+        # One-hot drops the first category's column; native codes keep every category
+        return 1 if self.drop_first and self.encoding == "onehot" else 0
+
+    @property
+    def feature_names(self):
+        self._check_fitted()
+        names = list(self.numeric_columns)
+        if self.encoding == "native":
+            return names + list(self.categorical_columns)
+        skip = self._skip
+        for column in self.categorical_columns:
+            names += [f"{column}_{value}" for value in self.vocabularies[column][skip:]]
+        return names
+
+    @property
+    def feature_types(self):
+        """XGBoost feature types ("q" numeric, "c" categorical) matching `feature_names`."""
+        if self.encoding == "native":
+            return ["q"] * len(self.numeric_columns) + ["c"] * len(self.categorical_columns)
+        return ["q"] * len(self.feature_names)
+
+    # ---------------- Transforming ----------------
+
+    def _codes(self, series, column):
+        vocabulary = self.vocabularies[column]
+        if isinstance(series.dtype, pd.CategoricalDtype) and list(map(str, series.cat.categories)) == vocabulary:
+            codes = series.cat.codes.to_numpy()
+        else:
+            codes = pd.Categorical(series.astype(str), categories=vocabulary).codes
+        return np.asarray(codes, dtype=np.int64)
+
+    def _count_unknown(self, column, codes, present, n_rows):
+        """Record values that are present but not in the vocabulary; raise above `max_unknown_fraction`."""
+        n_unknown = int(np.count_nonzero((codes < 0) & present))
+        if not n_unknown:
+            return
+        self.unknown_counts[column] += n_unknown
+        message = f"{n_unknown} of {n_rows} '{column}' values are not in the fitted vocabulary {self.vocabularies[column]}"
+        if self.max_unknown_fraction is not None and n_unknown / n_rows > self.max_unknown_fraction:
+            raise ValueError(f"❌ {message} (over max_unknown_fraction={self.max_unknown_fraction}).")
+        logger.warning(f"⚠️ {message}; encoded as {'missing' if self.encoding == 'native' else 'all zeros'}.")
+
+    def transform(self, df, out=None):
+        """
+        Encode `df` into a float32 matrix of shape (len(df), n_features).
+
+        Pass `out` to reuse a preallocated buffer (it must have at least len(df) rows);
+        the filled view is returned.
+        """
+        self._check_fitted()
+        n_rows = len(df)
+        if out is None:
+            out = np.empty((n_rows, self.n_features), dtype=np.float32)
+        elif out.dtype != np.float32 or out.shape[1] != self.n_features or out.shape[0] < n_rows:
+            raise ValueError(f"❌ Output buffer must be float32 with shape (>= {n_rows}, {self.n_features}).")
+        matrix = out[:n_rows]
+        for i, column in enumerate(self.numeric_columns):
+            matrix[:, i] = df[column].to_numpy(dtype=np.float32, copy=False)
+
+        if self.encoding == "native":
+            for column, offset, _ in self._blocks:
+                codes = self._codes(df[column], column)
+                self._count_unknown(column, codes, df[column].notna().to_numpy(), n_rows)
+                matrix[:, offset] = codes
+                matrix[codes < 0, offset] = np.nan
+            return matrix
+
+        rows = np.arange(n_rows)
+        skip = self._skip
+        for column, offset, width in self._blocks:
+            block = matrix[:, offset:offset + width]
+            block.fill(0.0)
+            codes = self._codes(df[column], column)
+            self._count_unknown(column, codes, df[column].notna().to_numpy(), n_rows)
+            codes -= skip
+            # Unknown categories (-1) and the dropped first category encode as all zeros
+            known = codes >= 0
+            block[rows[known], codes[known]] = 1.0
+        return matrix
+
+    def transform_record(self, record, out=None):
+        """Encode one record (a mapping of column -> raw value) into a float32 vector."""
+        self._check_fitted()
+        vector = np.zeros(self.n_features, dtype=np.float32) if out is None else out
+        if out is not None:
+            vector.fill(0.0)
+        for i, column in enumerate(self.numeric_columns):
+            vector[i] = float(record[column])
+        skip = self._skip
+        for column, offset, _ in self._blocks:
+            code = self._index[column].get(str(record[column]), -1)
+            if code < 0 and record[column] is not None:
+                # Counted for the metrics; a single record is never rejected for it
+                self.unknown_counts[column] += 1
+            if self.encoding == "native":
+                vector[offset] = code if code >= 0 else np.nan
+                continue
+            code -= skip
+            if code >= 0:
+                vector[offset + code] = 1.0
+        return vector
+
+    # ---------------- Persistence ----------------
+
+    def to_dict(self):
+        self._check_fitted()
+        return {
+            "numeric_columns": self.numeric_columns,
+            "categorical_columns": self.categorical_columns,
+            "drop_first": self.drop_first,
+            "encoding": self.encoding,
+            "vocabularies": self.vocabularies,
+            "feature_names": self.feature_names,
+            "feature_types": self.feature_types,
+        }
+
+    @classmethod
+    def from_dict(cls, document):
+        return cls(
+            numeric_columns=document["numeric_columns"],
+            categorical_columns=document["categorical_columns"],
+            drop_first=document["drop_first"],
+            vocabularies=document["vocabularies"],
+            encoding=document.get("encoding", "onehot"),
+        )
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,105 @@
+"""
+Deterministic, streaming train/validation split by hashing each row's key.
+
+A row's split depends only on its own key (`sensor_id` + `timestamp` by default), never on the other
+rows. That gives three properties:
+- it can be applied chunk by chunk without materialising the dataset
+- the same record lands in the same split on every run
+- refreshing the data with new rows leaves existing assignments untouched, so validation sets stay
+  comparable run to run
+
+The key is canonicalised before hashing: `sensor_id` as int64 and `timestamp` as UTC epoch seconds.
+A raw `1/1/23 0:00`, an ISO `2023-01-01T00:00:00Z` and a parsed datetime therefore all hash the same.
+The salt selects an independent split. Stages that split data which was already split (Feature
+Store export → training job) must use different salts, or the second split comes back empty.
+
+An optional time-based holdout sends every row at or after `holdout_after` to validation, whatever
+its hash, for forward-in-time evaluation.
+
+    splitter = HashSplitter(validation_fraction=0.2, salt=VALIDATION_SALT)
+    for train_chunk, val_chunk in splitter.iter_split(chunks):
+        ...
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+HOLDOUT_SALT = "traffic-holdout-v1"        # Feature Store export: train vs held-out evaluation rows
+VALIDATION_SALT = "traffic-validation-v1"  # Training job: train vs early-stopping/validation rows
+
+DEFAULT_KEY_COLUMNS = ("sensor_id", "timestamp")
+_EPOCH = pd.Timestamp("1970-01-01", tz="UTC")
+
+
+def _to_utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _epoch_seconds(series):
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, utc=True)
+    elif series.dt.tz is None:
+        series = series.dt.tz_localize("UTC")
+    # Independent of the datetime unit (ns/us/s) the column was parsed with
+    return ((series - _EPOCH) // pd.Timedelta(seconds=1)).astype("int64")
+
+
+def canonical_keys(df, key_columns=DEFAULT_KEY_COLUMNS, time_column="timestamp"):
+    """Key columns with representation-independent dtypes (int64 ids, UTC epoch seconds)."""
+    keys = {}
+    for column in key_columns:
+        series = df[column]
+        if column == time_column:
+            keys[column] = _epoch_seconds(series)
+        elif pd.api.types.is_numeric_dtype(series):
+            keys[column] = series.astype("int64")
+        else:
+            keys[column] = series.astype(str)
+    return pd.DataFrame(keys, index=df.index)
+
+
+def hash_fraction(keys, salt):
+    """Uniform value in [0, 1) per row, from a salted SipHash of the canonical key columns."""
+    hash_key = hashlib.sha256(salt.encode("utf-8")).hexdigest()[:16]
+    hashed = pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).to_numpy(dtype=np.uint64)
+    return (hashed >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class HashSplitter:
+    """Assigns rows to train/validation by key hash, optionally holding out the latest rows."""
+
+    def __init__(self, validation_fraction=0.2, salt=VALIDATION_SALT, key_columns=DEFAULT_KEY_COLUMNS,
+                 time_column="timestamp", holdout_after=None):
+        self.validation_fraction = validation_fraction
+        self.salt = salt
+        self.key_columns = tuple(key_columns)
+        self.time_column = time_column
+        self.holdout_after = _to_utc(holdout_after) if holdout_after is not None else None
+
+    def is_validation(self, chunk):
+        """Boolean mask of the rows of `chunk` that belong to the validation split."""
+        keys = canonical_keys(chunk, self.key_columns, self.time_column)
+        mask = hash_fraction(keys, self.salt) < self.validation_fraction
+        if self.holdout_after is not None:
+            event_seconds = keys[self.time_column] if self.time_column in keys else _epoch_seconds(chunk[self.time_column])
+            mask |= event_seconds.to_numpy() >= (self.holdout_after - _EPOCH) // pd.Timedelta(seconds=1)
+        return mask
+
+    def split(self, chunk):
+        """(train, validation) parts of one chunk."""
+        mask = self.is_validation(chunk)
+        return chunk[~mask], chunk[mask]
+
+    def iter_split(self, chunks):
+        for chunk in chunks:
+            yield self.split(chunk)
+
+    def row_filter(self, validation=False):
+        """Filter for `external_memory.ShardIter`: keeps one side of the split."""
+        def keep(chunk, first_row):
+            mask = self.is_validation(chunk)
+            return mask if validation else ~mask
+        return keep
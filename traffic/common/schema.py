@@ -0,0 +1,216 @@
+"""
+Declared schema and compact dtype plan for the traffic dataset.
+
+Each stage loads `traffic_data.csv` / `train.csv` through `read_traffic_csv`, so the compact dtypes
+are applied by the CSV parser itself. Nothing is parsed into int64/float64/object first and
+converted afterwards:
+
+| column            | dtype                                          |
+|-------------------|------------------------------------------------|
+| incident          | int8                                           |
+| sensor_id         | int16                                          |
+| vehicle_count     | float32                                        |
+| avg_speed         | float32                                        |
+| weather_condition | category (Clear, Fog, Rain, Snow)              |
+| timestamp         | datetime64                                     |
+| write_time, api_invocation_time | datetime64 (offline store exports) |
+| is_deleted        | bool                                           |
+
+The category list is declared rather than inferred, so every chunk and every stage shares the
+same category codes. `weather_condition` is parsed as a plain category first and then mapped onto
+the list by `apply_categories`, which counts the values outside it. They are logged and kept as
+extra categories (or rejected with `on_unseen="raise"`), never turned into missing values. Ingest
+reads with `categories=None` and writes the values as they are in the source file.
+`memory_report` logs the working-set size of a frame at each stage.
+"""
+
+import io
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+LABEL_COLUMN = "incident"
+FEATURE_COLUMNS = ["sensor_id", "vehicle_count", "avg_speed", "weather_condition"]
+EVENT_TIME_COLUMN = "timestamp"
+METADATA_COLUMNS = ["write_time", "api_invocation_time", "is_deleted"]
+
+# Columns a training job reads: the label, the split key time and the features
+TRAINING_COLUMNS = [LABEL_COLUMN, EVENT_TIME_COLUMN] + FEATURE_COLUMNS
+
+# Column order of the offline store export (train.csv)
+OFFLINE_STORE_COLUMNS = [LABEL_COLUMN, EVENT_TIME_COLUMN] + FEATURE_COLUMNS + METADATA_COLUMNS
+
+WEATHER_CATEGORIES = ["Clear", "Fog", "Rain", "Snow"]
+WEATHER_DTYPE = pd.CategoricalDtype(WEATHER_CATEGORIES)
+
+TRAFFIC_DTYPES = {
+    "incident": "int8",
+    "sensor_id": "int16",
+    "vehicle_count": "float32",
+    "avg_speed": "float32",
+    "weather_condition": WEATHER_DTYPE,
+    "is_deleted": "bool",
+}
+# What the parser reads weather_condition as, before the declared list is applied
+PARSE_DTYPES = {**TRAFFIC_DTYPES, "weather_condition": "category"}
+CATEGORICAL_COLUMN = "weather_condition"
+UNSEEN_POLICIES = ("keep", "raise")
+DATETIME_COLUMNS = [EVENT_TIME_COLUMN, "write_time", "api_invocation_time"]
+
+# Source export format of traffic_data.csv (1/1/23 0:00); None lets pandas parse ISO 8601.
+RAW_TIMESTAMP_FORMAT = "%m/%d/%y %H:%M"
+
+# Feature Store feature types registered by the first ingest (vehicle_count is Integral there)
+FEATURE_STORE_DTYPES = {"vehicle_count": "int32", "weather_condition": "object"}
+
+
+class _ReplayStream(io.RawIOBase):
+    """Binary stream returning `head` again before the rest of `stream`, which cannot seek back (a FIFO)."""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.head:
+            n = min(len(buffer), len(self.head))
+            buffer[:n] = self.head[:n]
+            self.head = self.head[n:]
+            return n
+        data = self.stream.read1(len(buffer)) if hasattr(self.stream, "read1") else self.stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _has_header(source):
+    """(header found, source to parse). A stream is read up to its first newline, then replayed from the start."""
+    if hasattr(source, "read"):
+        # A single peek() of a FIFO may return a partial line; readline() waits for the whole one
+        first_line = source.readline()
+        source = io.BufferedReader(_ReplayStream(first_line, source))
+        first_line = first_line.decode("utf-8")
+    else:
+        with open(source) as f:
+            first_line = f.readline()
+    return first_line.split(",")[0].strip() in OFFLINE_STORE_COLUMNS, source
+
+
+def apply_categories(df, categories=WEATHER_CATEGORIES, column=CATEGORICAL_COLUMN, on_unseen="keep"):
+    """
+    Map `column` onto the declared `categories`, comparing non-null counts before and after.
+
+    Values outside the list (a new label, other casing, stray whitespace) are logged with their
+    count. With `on_unseen="keep"` they are appended as extra categories after the declared ones,
+    so declared codes stay stable; with `"raise"` the frame is rejected.
+    """
+    if on_unseen not in UNSEEN_POLICIES:
+        raise ValueError(f"❌ Unknown on_unseen '{on_unseen}'. Expected one of {UNSEEN_POLICIES}.")
+    if column not in df.columns:
+        return df
+    series = df[column]
+    cast = series.astype(pd.CategoricalDtype(categories))
+    n_unseen = int(series.notna().sum()) - int(cast.notna().sum())
+    if n_unseen:
+        unseen = sorted(set(series.dropna().astype(str)) - set(categories))
+        message = f"{n_unseen} '{column}' values outside the declared categories {list(categories)}: {unseen[:10]}"
+        if on_unseen == "raise":
+            raise ValueError(f"❌ {message}")
+        logger.warning(f"⚠️ {message}; kept as extra categories")
+        cast = series.astype(pd.CategoricalDtype(list(categories) + unseen))
+    df[column] = cast
+    return df
+
+
+class _CategoryReader:
+    """Chunk reader of `pd.read_csv` that applies the declared categories to every chunk."""
+
+    def __init__(self, reader, cast):
+        self.reader = reader
+        self.cast = cast
+
+    def __iter__(self):
+        for chunk in self.reader:
+            yield self.cast(chunk)
+
+    def close(self):
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_traffic_csv(path, usecols=None, timestamp_format=None, chunksize=None, categories=WEATHER_CATEGORIES,
+                     on_unseen="keep", **kwargs):
+    """
+    Read a traffic CSV with the compact dtypes applied at parse time.
+
+    `path` may also be a buffered binary stream such as an open FIFO. Files with or without a
+    header row are accepted; headerless files are assumed to follow the offline store column
+    order (`OFFLINE_STORE_COLUMNS`). With `chunksize` a reader of DataFrame chunks is returned,
+    as with `pd.read_csv`.
+
+    `weather_condition` is mapped onto `categories` by `apply_categories` (see `on_unseen`);
+    `categories=None` leaves it a plain category holding whatever values the file has.
+    """
+    has_header, path = _has_header(path)
+    header_kwargs = {"header": 0} if has_header else {"header": None, "names": OFFLINE_STORE_COLUMNS}
+    wanted = set(usecols) if usecols is not None else None
+    dtype = {c: t for c, t in PARSE_DTYPES.items() if wanted is None or c in wanted}
+    parse_dates = [c for c in DATETIME_COLUMNS if wanted is None or c in wanted]
+    if parse_dates:
+        kwargs["parse_dates"] = parse_dates
+        if timestamp_format is not None:
+            # Only the event time uses the export format; metadata timestamps stay ISO-like.
+            # Passed only when needed: older pandas in the training containers lacks date_format.
+            kwargs["date_format"] = {EVENT_TIME_COLUMN: timestamp_format}
+    result = pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=chunksize, **header_kwargs, **kwargs)
+    if categories is None:
+        return result
+
+    def cast(df):
+        return apply_categories(df, categories, on_unseen=on_unseen)
+
+    return _CategoryReader(result, cast) if chunksize else cast(result)
+
+
+def cast_traffic_dtypes(df):
+    """Cast a frame loaded without the CSV parser (e.g. from Parquet) to the compact dtype plan."""
+    casts = {c: t for c, t in TRAFFIC_DTYPES.items()
+             if c in df.columns and c != CATEGORICAL_COLUMN and df[c].dtype != t}
+    if casts:
+        df = df.astype(casts)
+    return apply_categories(df)
+
+
+def to_feature_store_frame(df, timestamp_format="%Y-%m-%dT%H:%M:%SZ"):
+    """Convert a compact frame to the types the feature group was registered with."""
+    casts = {c: t for c, t in FEATURE_STORE_DTYPES.items() if c in df.columns}
+    df = df.astype(casts)
+    if pd.api.types.is_datetime64_any_dtype(df[EVENT_TIME_COLUMN]):
+        df[EVENT_TIME_COLUMN] = df[EVENT_TIME_COLUMN].dt.strftime(timestamp_format)
+    return df
+
+
+def memory_report(df, stage, log=logger):
+    """Log the deep memory usage of `df` (total, per row and per column) and return the total bytes."""
+    if not hasattr(df, "memory_usage"):
+        # Encoded NumPy feature matrix
+        log.info(f"🧮 Memory at stage '{stage}': {df.nbytes / 1e6:.2f} MB for {len(df)} rows "
+                 f"({df.nbytes / max(len(df), 1):.1f} B/row) - {df.dtype} matrix with {df.shape[1]} columns")
+        return int(df.nbytes)
+    usage = df.memory_usage(deep=True, index=False)
+    total = int(usage.sum())
+    per_column = ", ".join(f"{column}[{df[column].dtype}]={usage[column] / 1e6:.2f}MB" for column in df.columns)
+    log.info(
+        f"🧮 Memory at stage '{stage}': {total / 1e6:.2f} MB for {len(df)} rows "
+        f"({total / max(len(df), 1):.1f} B/row) - {per_column}"
+    )
+    return total
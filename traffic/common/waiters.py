@@ -0,0 +1,134 @@
+"""
+Polling with jittered exponential backoff, overall deadlines and concurrent waits.
+
+A `Waiter` polls a describe call until the status it extracts reaches a success state. It
+raises `WaiterError` on a failure state and `WaiterTimeout` once the deadline passes. The first
+check comes quickly and the gap between checks then grows up to `max_delay`, so short
+operations are noticed soon after they finish and long ones don't hammer the describe API.
+`wait_all` waits on many resources at once from one asyncio event loop.
+
+`stage_timer` logs the wall-clock time of a pipeline stage and can collect the timings in a dict.
+
+    waiter = Waiter(
+        "Feature Group traffic-feature-group-local",
+        poll=feature_group.describe,
+        status=lambda d: d.get("FeatureGroupStatus"),
+        success={"Created"},
+        failure={"CreateFailed", "Deleting"},
+        timeout=900,
+    )
+    with stage_timer("create feature group"):
+        waiter.wait()
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class WaiterError(RuntimeError):
+    """The resource reached a failure state."""
+
+
+class WaiterTimeout(WaiterError, TimeoutError):
+    """The resource did not reach a success state before the deadline."""
+
+
+def backoff_delays(initial=1.0, maximum=30.0, multiplier=2.0, jitter=0.5):
+    """
+    Infinite sequence of delays growing exponentially from `initial` up to `maximum`.
+
+    Each delay is randomly shortened by up to `jitter` of its value, so many waiters started
+    together spread out their polls.
+    """
+    delay = initial
+    while True:
+        yield delay * (1 - jitter * random.random())
+        delay = min(maximum, delay * multiplier)
+
+
+class Waiter:
+    """Polls `poll()` until `status(response)` is in `success`."""
+
+    def __init__(self, name, poll, status, success, failure=(), initial_delay=1.0, max_delay=30.0,
+                 multiplier=2.0, jitter=0.5, timeout=None):
+        self.name = name
+        self.poll = poll
+        self.status = status
+        self.success = set(success)
+        self.failure = set(failure)
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+
+    def _delays(self):
+        return backoff_delays(self.initial_delay, self.max_delay, self.multiplier, self.jitter)
+
+    def _done(self, response, started):
+        state = self.status(response)
+        elapsed = time.monotonic() - started
+        if state in self.success:
+            logger.info(f"✅ {self.name}: {state} after {elapsed:.1f}s")
+            return True, state
+        if state in self.failure:
+            raise WaiterError(f"❌ {self.name} reached {state} after {elapsed:.1f}s")
+        return False, state
+
+    def _next_sleep(self, delays, state, started):
+        delay = next(delays)
+        if self.timeout is not None:
+            remaining = started + self.timeout - time.monotonic()
+            if remaining <= 0:
+                raise WaiterTimeout(f"❌ {self.name} still {state} after {self.timeout}s")
+            delay = min(delay, remaining)
+        logger.info(f"⏳ {self.name}: {state} (next check in {delay:.1f}s)")
+        return delay
+
+    def wait(self):
+        """Block until the resource succeeds; returns the last describe response."""
+        started, delays = time.monotonic(), self._delays()
+        while True:
+            response = self.poll()
+            done, state = self._done(response, started)
+            if done:
+                return response
+            time.sleep(self._next_sleep(delays, state, started))
+
+    async def wait_async(self):
+        """`wait` for use inside an event loop; the describe call runs on a worker thread."""
+        started, delays = time.monotonic(), self._delays()
+        while True:
+            response = await asyncio.to_thread(self.poll)
+            done, state = self._done(response, started)
+            if done:
+                return response
+            await asyncio.sleep(self._next_sleep(delays, state, started))
+
+
+def wait_all(waiters):
+    """Wait for every waiter concurrently from one event loop; returns their responses in order."""
+    async def gather():
+        return await asyncio.gather(*(waiter.wait_async() for waiter in waiters))
+
+    if not waiters:
+        return []
+    return asyncio.run(gather())
+
+
+@contextmanager
+def stage_timer(stage, timings=None):
+    """Log the wall-clock time of a stage, and record it in `timings` if given."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            timings[stage] = elapsed
+        logger.info(f"⏱️ Stage '{stage}' took {elapsed:.2f}s")
@@ -0,0 +1,10 @@
+"""Puts the stage directories on sys.path, as the scripts do for `common`, so tests import their modules by name."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for directory in ("", "1_data_preparation", "4_model_deployment"):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,113 @@
+"""
+Local stand-ins for the `sagemaker-featurestore-runtime` client, for tests and offline runs.
+
+They have the same method names, keyword arguments and error shape as the boto3 client, so the
+ingest and lookup code runs against them unchanged:
+
+- `FakePutRecordClient.put_record` stores records in memory, sleeps `latency` seconds per call, and
+  throws `ThrottlingException` above `capacity` concurrent calls or for chosen records
+- `FakeBatchGetRecordClient.batch_get_record` serves records from a dict, logs every call, and
+  returns chosen identifiers as `UnprocessedIdentifiers` for a number of calls (throttling)
+"""
+
+import threading
+import time
+
+
+class FakeClientError(Exception):
+    """Shaped like botocore's ClientError: the code is in `response["Error"]["Code"]`."""
+
+    def __init__(self, code, message="", operation="PutRecord"):
+        super().__init__(f"An error occurred ({code}) when calling the {operation} operation: {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+class FakePutRecordClient:
+    """
+    put_record that behaves like a throttled online store.
+
+    - `latency`: seconds every call takes
+    - `capacity`: concurrent calls served before the rest are throttled (None: unlimited)
+    - `throttle_ids`: record identifiers (`id_feature` values) that are always throttled
+    - `error_ids`: record identifier -> error code raised for it on every call
+    """
+
+    def __init__(self, latency=0.0, capacity=None, throttle_ids=(), error_ids=None, id_feature="incident"):
+        self.latency = latency
+        self.capacity = capacity
+        self.throttle_ids = set(map(str, throttle_ids))
+        self.error_ids = {str(k): v for k, v in (error_ids or {}).items()}
+        self.id_feature = id_feature
+        self.records = []
+        self.calls = 0
+        self.throttles = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def put_record(self, FeatureGroupName, Record):
+        identifier = next((f["ValueAsString"] for f in Record if f["FeatureName"] == self.id_feature), None)
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            over_capacity = self.capacity is not None and self._in_flight > self.capacity
+        try:
+            time.sleep(self.latency)
+            if identifier in self.error_ids:
+                raise FakeClientError(self.error_ids[identifier], f"Record {identifier} rejected")
+            if over_capacity or identifier in self.throttle_ids:
+                with self._lock:
+                    self.throttles += 1
+                raise FakeClientError("ThrottlingException", "Rate exceeded")
+            with self._lock:
+                self.records.append((FeatureGroupName, Record))
+            return {"ResponseMetadata": {"HTTPStatusCode": 200}}
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+class FakeBatchGetRecordClient:
+    """
+    batch_get_record over an in-memory online store.
+
+    - `records`: record identifier -> {feature name: value}; identifiers not in it are not returned
+    - `latency`: seconds every call takes
+    - `unprocessed`: record identifier -> number of calls that return it as unprocessed before serving it
+    """
+
+    def __init__(self, records, latency=0.0, unprocessed=None):
+        self.records = {str(k): v for k, v in records.items()}
+        self.latency = latency
+        self.unprocessed = {str(k): v for k, v in (unprocessed or {}).items()}
+        self.calls = []  # identifiers requested by each call, in call order
+        self._lock = threading.Lock()
+
+    def batch_get_record(self, Identifiers):
+        time.sleep(self.latency)
+        records, unprocessed = [], []
+        for entry in Identifiers:
+            requested = list(entry["RecordIdentifiersValueAsString"])
+            with self._lock:
+                self.calls.append(requested)
+            throttled = []
+            for identifier in requested:
+                with self._lock:
+                    remaining = self.unprocessed.get(identifier, 0)
+                    if remaining:
+                        self.unprocessed[identifier] = remaining - 1
+                if remaining:
+                    throttled.append(identifier)
+                elif identifier in self.records:
+                    features = self.records[identifier]
+                    names = entry.get("FeatureNames") or list(features)
+                    records.append({
+                        "FeatureGroupName": entry["FeatureGroupName"],
+                        "RecordIdentifierValueAsString": identifier,
+                        "Record": [{"FeatureName": name, "ValueAsString": str(features[name])} for name in names],
+                    })
+            if throttled:
+                unprocessed.append({"FeatureGroupName": entry["FeatureGroupName"],
+                                    "RecordIdentifiersValueAsString": throttled})
+        return {"Records": records, "Errors": [], "UnprocessedIdentifiers": unprocessed}
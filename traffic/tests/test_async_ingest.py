@@ -0,0 +1,97 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from async_ingest import AIMDLimiter, AsyncPutRecordEngine, failed_rows  # noqa: E402
+from fake_featurestore_runtime import FakePutRecordClient  # noqa: E402
+
+
+def traffic_frame(n):
+    return pd.DataFrame({
+        "incident": range(n),
+        "timestamp": ["2023-01-01T00:00:00Z"] * n,
+        "sensor_id": [i % 7 for i in range(n)],
+        "vehicle_count": [40 + i % 5 for i in range(n)],
+    })
+
+
+def ingest(client, df, **kwargs):
+    kwargs.setdefault("base_backoff", 0.001)
+    kwargs.setdefault("max_backoff", 0.01)
+    engine = AsyncPutRecordEngine(client, "traffic-feature-group", **kwargs)
+    try:
+        return engine, engine.ingest(df)
+    finally:
+        engine.close()
+
+
+# ---------------- AIMD window ----------------
+
+def test_limiter_halves_on_throttle_and_grows_additively():
+    limiter = AIMDLimiter(initial=16, maximum=64, target_latency=0.25)
+    limiter.on_throttle(latency=0.0)
+    assert limiter.window == 8
+    successes = 0
+    while limiter.window == 8:
+        limiter.on_success(latency=0.01)
+        successes += 1
+    assert limiter.window == 9
+    assert successes == 9  # about one request per window of fast successes
+
+
+def test_limiter_shrinks_when_latency_exceeds_target():
+    limiter = AIMDLimiter(initial=16, target_latency=0.05)
+    limiter.on_success(latency=0.0)
+    limiter.on_success(latency=0.2)
+    assert limiter.window == 8
+
+
+# ---------------- Engine against the stub ----------------
+
+def test_window_grows_while_latency_is_under_target():
+    client = FakePutRecordClient(latency=0.001)
+    engine, report = ingest(client, traffic_frame(300), initial_concurrency=2, max_concurrency=32,
+                            target_latency=0.25)
+    assert report.succeeded == 300
+    assert report.throttled == 0
+    assert report.window > 2
+    assert len(client.records) == 300
+
+
+def test_window_shrinks_on_throttles_and_throttled_records_are_retried():
+    client = FakePutRecordClient(latency=0.005, capacity=2)
+    engine, report = ingest(client, traffic_frame(100), initial_concurrency=32, max_concurrency=32,
+                            max_attempts=50)
+    assert report.throttled > 0
+    assert report.window < 32
+    # Every throttled write went back through the retry queue and eventually landed
+    assert report.retried == report.throttled
+    assert report.succeeded == 100 and not report.failed
+    assert len(client.records) == 100
+
+
+def test_records_still_throttled_after_max_attempts_are_reported_failed():
+    client = FakePutRecordClient(throttle_ids=[3, 11])
+    df = traffic_frame(20)
+    engine, report = ingest(client, df, max_attempts=3)
+    assert report.succeeded == 18
+    assert report.retried == 2 * 2  # two retries each before giving up
+    assert sorted(f["index"] for f in report.failed) == [3, 11]
+    assert {f["error"] for f in report.failed} == {"ThrottlingException"}
+    assert sorted(failed_rows(df, report)["incident"]) == [3, 11]
+
+
+def test_non_retryable_errors_fail_without_retry():
+    client = FakePutRecordClient(error_ids={5: "ValidationException"})
+    engine, report = ingest(client, traffic_frame(10))
+    assert report.retried == 0
+    assert [(f["index"], f["error"]) for f in report.failed] == [(5, "ValidationException")]
+
+
+def test_report_latency_percentiles():
+    client = FakePutRecordClient(latency=0.002)
+    engine, report = ingest(client, traffic_frame(50))
+    percentiles = report.percentiles()
+    assert set(percentiles) == {"p50", "p90", "p99"}
+    assert 0.002 <= percentiles["p50"] <= percentiles["p90"] <= percentiles["p99"]
+    assert "50/50 records" in report.summary()
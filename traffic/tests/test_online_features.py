@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+from fake_featurestore_runtime import FakeBatchGetRecordClient
+from online_features import OnlineFeatureClient, TTLCache
+
+SENSORS = {str(i): {"sensor_id": i, "vehicle_count": 40 + i, "avg_speed": 55.5} for i in range(20)}
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(runtime, **kwargs):
+        client = OnlineFeatureClient(runtime, "traffic-sensor-features", **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def concurrently(function, arguments):
+    """Run function(argument) on one thread each, released together; returns the results in order."""
+    barrier = threading.Barrier(len(arguments))
+    results = [None] * len(arguments)
+
+    def run(index, argument):
+        barrier.wait()
+        results[index] = function(argument)
+
+    threads = [threading.Thread(target=run, args=(i, a)) for i, a in enumerate(arguments)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+# ---------------- Coalescing ----------------
+
+def test_concurrent_misses_of_one_identifier_share_one_call(make_client):
+    runtime = FakeBatchGetRecordClient(SENSORS, latency=0.05)
+    client = make_client(runtime, batch_window=0.02)
+    results = concurrently(client.get, ["5"] * 8)
+    assert runtime.calls == [["5"]]
+    assert results == [{"sensor_id": 5, "vehicle_count": 45, "avg_speed": 55.5}] * 8
+
+
+def test_concurrent_misses_of_different_identifiers_share_one_batch(make_client):
+    runtime = FakeBatchGetRecordClient(SENSORS)
+    client = make_client(runtime, batch_window=0.05)
+    results = concurrently(client.get, ["1", "2", "3", "4", "5"])
+    assert len(runtime.calls) == 1
+    assert sorted(runtime.calls[0]) == ["1", "2", "3", "4", "5"]
+    assert [r["sensor_id"] for r in results] == [1, 2, 3, 4, 5]
+
+
+# ---------------- Cache ----------------
+
+def test_ttl_cache_expires_entries():
+    now = [0.0]
+    cache = TTLCache(max_size=10, ttl=30, clock=lambda: now[0])
+    cache.put("5", {"vehicle_count": 45})
+    now[0] = 29.0
+    assert cache.get("5") == (True, {"vehicle_count": 45})
+    now[0] = 31.0
+    assert cache.get("5") == (False, None)
+    assert cache.expired == 1 and len(cache) == 0
+
+
+def test_expired_entries_are_fetched_again(make_client):
+    runtime = FakeBatchGetRecordClient(SENSORS)
+    client = make_client(runtime, ttl=0.05, batch_window=0)
+    client.get("5")
+    client.get("5")
+    time.sleep(0.1)
+    client.get("5")
+    assert runtime.calls == [["5"], ["5"]]
+
+
+def test_lru_evicts_least_recently_used():
+    cache = TTLCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)  # a is now the most recently used
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1) and cache.get("c") == (True, 3)
+    assert cache.evicted == 1
+
+
+# ---------------- Throttling ----------------
+
+def test_unprocessed_identifiers_are_requeued(make_client):
+    runtime = FakeBatchGetRecordClient(SENSORS, unprocessed={"7": 2})
+    client = make_client(runtime, batch_window=0, base_backoff=0.001, max_backoff=0.01)
+    assert client.get("7")["sensor_id"] == 7
+    assert runtime.calls == [["7"], ["7"], ["7"]]
+    assert client.metrics()["throttled"] == 2
+
+
+def test_unprocessed_identifiers_fail_after_max_retries(make_client):
+    runtime = FakeBatchGetRecordClient(SENSORS, unprocessed={"7": 100})
+    client = make_client(runtime, batch_window=0, max_retries=2, base_backoff=0.001, max_backoff=0.01)
+    with pytest.raises(LookupError):
+        client.get("7")
+    assert len(runtime.calls) == 3
+    assert client.get("8")["sensor_id"] == 8  # other identifiers are unaffected
+
+
+# ---------------- Metrics ----------------
+
+def test_metrics_count_hits_and_misses(make_client):
+    runtime = FakeBatchGetRecordClient(SENSORS)
+    client = make_client(runtime, batch_window=0)
+    client.get("1")
+    client.get("1")
+    client.get("1")
+    assert client.get("999") is None  # no such record: cached as None
+    assert client.get("999") is None
+    metrics = client.metrics()
+    assert (metrics["hits"], metrics["misses"]) == (3, 2)
+    assert metrics["hit_rate"] == pytest.approx(0.6)
+    assert metrics["batches"] == 2 and metrics["cached"] == 2
+    assert len(runtime.calls) == 2